@@ -2,16 +2,11 @@ import streamlit as st
 import time
 import logging
 import re
-import pandas as pd
 import base64
 import os
-from rapidfuzz import process
-from core.engine import auto_generate_and_run_query
-
-try:
-    from ollama._client import ResponseError
-except ImportError:
-    ResponseError = Exception
+from config.config import DEBUG_PANEL, INTERPRET_MODEL, MODEL_WARMUP, OLLAMA_MODEL, SQL_FAST_MODEL
+from models.model_loader import get_model_manager
+from ui.typing_effect import render_stream
 
 # ============================================================================
 # CONFIGURAÇÃO DA PÁGINA (DEVE SER A PRIMEIRA CHAMADA STREAMLIT)
@@ -35,10 +30,21 @@ st.set_page_config(
 # Configuração de logging
 logging.basicConfig(filename="hubia_erros.log", level=logging.ERROR)
 
+# Modelos da cascata: rápido para SQL, principal e o de interpretação
+MODELOS = list(dict.fromkeys(m for m in (SQL_FAST_MODEL, OLLAMA_MODEL, INTERPRET_MODEL) if m))
+
 # ============================================================================
 # FUNÇÕES UTILITÁRIAS
 # ============================================================================
 
+def erro_do_ollama() -> type[Exception]:
+    """Classe de erro do cliente do Ollama, importada só quando há exceção a tratar"""
+    try:
+        from ollama._client import ResponseError
+    except ImportError:
+        return Exception
+    return ResponseError
+
 def get_base64_image(image_path: str) -> str:
     """Converte uma imagem para base64 para uso em HTML/CSS"""
     try:
@@ -64,11 +70,19 @@ def is_read_only_query(sql: str) -> bool:
     """Verifica se a consulta é apenas de leitura"""
     return sql.strip().lower().startswith("select")
 
-def consultar(pergunta: str) -> tuple:
-    """Executa consulta e retorna interpretação, SQL e dados"""
-    resultado = auto_generate_and_run_query(pergunta.strip())
+def consultar(pergunta: str, stream: bool = False, interpretar: bool = False) -> tuple:
+    """Executa consulta e retorna interpretação, SQL, dados e telemetria.
+
+    Com `stream=True`, a interpretação é um iterador de tokens do modelo.
+    Com `interpretar=True`, o resultado sempre é interpretado pelo modelo.
+    """
+    # Importado no primeiro uso: o motor traz a LangChain e o cliente do Ollama,
+    # que não precisam atrasar a primeira renderização da página
+    from core.engine import auto_generate_and_run_query
+
+    resultado = auto_generate_and_run_query(pergunta.strip(), stream=stream, interpretar=interpretar)
     sql_corrigido = corrigir_sql(resultado["sql"])
-    return resultado["interpretacao"], sql_corrigido, resultado.get("resultado", [])
+    return resultado["interpretacao"], sql_corrigido, resultado.get("resultado", []), resultado.get("telemetria")
 
 def sugerir_perguntas(pergunta: str) -> list:
     """Sugere perguntas relacionadas baseadas na pergunta atual"""
@@ -350,6 +364,10 @@ def inicializar_estado():
         st.session_state.resposta_atual = None
     if "mostrar_sobre" not in st.session_state:
         st.session_state.mostrar_sobre = False
+    if "depuracao" not in st.session_state:
+        st.session_state.depuracao = DEBUG_PANEL
+    if "interpretar" not in st.session_state:
+        st.session_state.interpretar = False
 
 # ============================================================================
 # COMPONENTES DA INTERFACE
@@ -377,6 +395,8 @@ def renderizar_sidebar():
         if st.button("Sobre o HuB-IA", use_container_width=True):
             st.session_state.mostrar_sobre = not st.session_state.mostrar_sobre
 
+        renderizar_status_modelo()
+
         st.markdown("---")
         
         # Histórico
@@ -406,6 +426,45 @@ def renderizar_sidebar():
             st.markdown("### 📊 Estatísticas")
             st.metric("Total de consultas", len(st.session_state.historico))
 
+        st.markdown("---")
+        st.session_state.interpretar = st.checkbox(
+            "🧠 Interpretação detalhada pela IA", value=st.session_state.interpretar,
+            help="Sempre pede ao modelo a interpretação, mesmo quando o resultado é simples",
+        )
+        st.session_state.depuracao = st.checkbox("🔍 Painel de depuração", value=st.session_state.depuracao)
+
+def renderizar_status_modelo():
+    """Mostra se o modelo já está carregado no Ollama"""
+    for modelo in MODELOS:
+        status = get_model_manager(modelo).status()
+        if status["estado"] == "pronto":
+            st.caption(f"🟢 Modelo {status['modelo']} pronto")
+        elif status["estado"] == "erro":
+            st.caption(f"🔴 Modelo {status['modelo']} indisponível: {status['erro']}")
+        else:
+            st.caption(f"⏳ Modelo {status['modelo']} carregando...")
+
+def renderizar_depuracao(telemetria: dict | None):
+    """Tempo por etapa, tokens e atributos da resposta atual"""
+    if not telemetria:
+        return
+    with st.expander("🔍 Depuração: tempo por etapa", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total (ms)", f"{telemetria['total_ms'] or 0:.1f}")
+        col2.metric("Origem", telemetria.get("origem", "-"))
+        col3.metric("Tokens (prompt/saída)", f"{telemetria['tokens_prompt']:.0f} / {telemetria['tokens_saida']:.0f}")
+        if telemetria["etapas"]:
+            st.bar_chart(telemetria["etapas"])
+        st.dataframe(telemetria["spans"], use_container_width=True)
+        if SQL_FAST_MODEL:
+            from core.llm_agent import cascade_stats
+
+            cascata = cascade_stats()
+            st.caption(f"Cascata de modelos: {cascata['taxa_escalada']:.0%} das SQLs escaladas")
+            st.dataframe(
+                [{"nível": nome, **nivel} for nome, nivel in cascata["niveis"].items()], use_container_width=True,
+            )
+
 def renderizar_sobre():
     """Renderiza a seção 'Sobre'"""
     st.markdown("""
@@ -435,6 +494,10 @@ def renderizar_sobre():
 # ============================================================================
 
 def main():
+    if MODEL_WARMUP:
+        # Carrega os modelos no Ollama em segundo plano, sem atrasar a página
+        for modelo in MODELOS:
+            get_model_manager(modelo).start()
     inicializar_estado()
     aplicar_estilos()
 
@@ -461,22 +524,31 @@ def main():
         # O botão de limpar foi movido para a sidebar
 
         if enviar_button and pergunta_usuario:
-            with st.spinner("Processando sua pergunta..."): # Adiciona spinner
-                try:
-                    interpretacao, sql_gerado, dados_resultado = consultar(pergunta_usuario)
-                    st.session_state.resposta_atual = {
-                        "pergunta": pergunta_usuario,
-                        "interpretacao": interpretacao,
-                        "sql": sql_gerado,
-                        "resultado": dados_resultado
-                    }
-                    st.session_state.historico.append(st.session_state.resposta_atual)
-                except ResponseError as e:
-                    st.error(f"Erro na consulta: {e.msg}")
-                    st.session_state.resposta_atual = None
-                except Exception as e:
-                    st.error(f"Ocorreu um erro inesperado: {e}")
-                    st.session_state.resposta_atual = None
+            try:
+                prontos = all(get_model_manager(m).ready for m in MODELOS)
+                aviso = "Processando sua pergunta..." if prontos else "Modelo carregando; a primeira resposta pode demorar..."
+                with st.spinner(aviso): # Adiciona spinner
+                    tokens, sql_gerado, dados_resultado, telemetria = consultar(
+                        pergunta_usuario, stream=True, interpretar=st.session_state.interpretar
+                    )
+                # A interpretação aparece à medida que o modelo gera os tokens
+                st.markdown("### ✨ Interpretação:")
+                interpretacao = render_stream(tokens)
+                st.session_state.resposta_atual = {
+                    "pergunta": pergunta_usuario,
+                    "interpretacao": interpretacao,
+                    "sql": sql_gerado,
+                    "resultado": dados_resultado,
+                    # Lido depois do streaming, quando a última etapa já terminou
+                    "telemetria": telemetria.to_dict() if telemetria else None,
+                }
+                st.session_state.historico.append(st.session_state.resposta_atual)
+            except erro_do_ollama() as e:
+                st.error(f"Erro na consulta: {e.msg}")
+                st.session_state.resposta_atual = None
+            except Exception as e:
+                st.error(f"Ocorreu um erro inesperado: {e}")
+                st.session_state.resposta_atual = None
             st.rerun()
 
         if st.session_state.resposta_atual:
@@ -487,7 +559,7 @@ def main():
             """.format(st.session_state.resposta_atual["interpretacao"]), unsafe_allow_html=True)
 
             if st.session_state.resposta_atual["resultado"]:
-                df = pd.DataFrame(st.session_state.resposta_atual["resultado"])
+                df = st.session_state.resposta_atual["resultado"].to_dataframe()
                 st.write("### 📊 Dados:")
                 st.dataframe(df, use_container_width=True)
             else:
@@ -497,6 +569,9 @@ def main():
                 </div>
             """, unsafe_allow_html=True)
 
+            if st.session_state.depuracao:
+                renderizar_depuracao(st.session_state.resposta_atual.get("telemetria"))
+
             # Sugestões de perguntas
             st.markdown("""
                 <div class="suggestions-container fade-in">
@@ -0,0 +1,58 @@
+"""Acurácia e tempo da correção de nomes: índice por tabela x difflib global.
+
+"antes" reproduz a correção antiga: `difflib.get_close_matches` contra a união
+de todas as colunas e tabelas e um `re.sub` por palavra.
+
+Uso:
+    python -m benchmarks.bench_correction
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from difflib import get_close_matches
+from pathlib import Path
+
+from core.correction import correct_sql, evaluate
+from core.utils import describe_table, list_relations
+
+CASES_PATH = Path(__file__).resolve().parent / "fixtures" / "correcoes.json"
+
+
+def legacy_correct(sql: str, unknown: list[str]) -> tuple[str, dict[str, str]]:
+    valid = set()
+    for table in list_relations():
+        valid.update(col for col, _ in describe_table(table))
+        valid.add(table)
+    fixes = {}
+    for wrong in unknown:
+        suggestion = get_close_matches(wrong, valid, n=1)
+        if suggestion:
+            sql = re.sub(rf"\b{re.escape(wrong)}\b", suggestion[0], sql)
+            fixes[wrong] = suggestion[0]
+    return sql, fixes
+
+
+def load_cases(path: str | Path = CASES_PATH) -> list[dict]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", default=str(CASES_PATH), help="arquivo JSON com os casos")
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.casos)
+    resultado = {}
+    for nome, corretor in (("antes", legacy_correct), ("depois", correct_sql)):
+        evaluate(cases[:1], corretor)  # aquece os caches de esquema
+        start = time.perf_counter()
+        resultado[nome] = evaluate(cases, corretor)
+        resultado[nome]["ms_por_caso"] = round((time.perf_counter() - start) * 1000 / len(cases), 3)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
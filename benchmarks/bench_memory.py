@@ -0,0 +1,74 @@
+"""Latência das consultas no modo arquivo e na réplica em memória.
+
+"fria" é a primeira execução numa conexão recém-aberta (no modo memória,
+inclui a carga da réplica); "quente" é a mediana das execuções seguintes.
+O cache de páginas do sistema operacional continua quente no modo arquivo.
+
+Uso:
+    python -m benchmarks.bench_memory --rodadas 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from core.connection import MemoryReplica, open_memory, open_readonly
+from core.optimizer import standard_queries
+
+
+def _ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(open_conn, queries: list[str], rounds: int) -> dict:
+    cold, hot = [], []
+    for sql in queries:
+        start = time.perf_counter()
+        conn = open_conn()
+        conn.execute(sql).fetchall()
+        cold.append((time.perf_counter() - start) * 1000)
+        hot.extend(_ms(lambda: conn.execute(sql).fetchall()) for _ in range(rounds))
+        conn.close()
+    return {
+        "fria_p50_ms": round(statistics.median(cold), 4),
+        "quente_p50_ms": round(statistics.median(hot), 4),
+        "quente_p95_ms": round(statistics.quantiles(hot, n=20)[-1], 4),
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default=os.getenv("HUBIA_DB", "fecomdb.db"))
+    parser.add_argument("--rodadas", type=int, default=50, help="execuções quentes por consulta")
+    args = parser.parse_args(argv)
+
+    probe = open_readonly(args.banco)
+    queries = [sql for _, sql in standard_queries(probe)]
+    probe.close()
+
+    carga_ms = []
+
+    def open_replica():
+        start = time.perf_counter()
+        replica = MemoryReplica(args.banco, interval=0)
+        carga_ms.append((time.perf_counter() - start) * 1000)
+        conn = open_memory(replica.current()[1])
+        replica.close()
+        return conn
+
+    resultado = {
+        "consultas": len(queries),
+        "arquivo": measure(lambda: open_readonly(args.banco), queries, args.rodadas),
+        "memoria": measure(open_replica, queries, args.rodadas),
+    }
+    resultado["memoria"]["carga_replica_p50_ms"] = round(statistics.median(carga_ms), 4)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
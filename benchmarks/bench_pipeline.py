@@ -0,0 +1,284 @@
+"""Benchmark de ponta a ponta do motor com um modelo falso que reproduz respostas gravadas.
+
+Cada pergunta do conjunto de referência passa por `auto_generate_and_run_query`
+sobre o `fecomdb.db` real. O modelo falso devolve a SQL e a interpretação
+gravadas em `fixtures/pipeline.json` após uma latência simulada (fixa + por
+token do prompt + por token da saída), sem precisar do Ollama. Caches de
+respostas e de resultados e exemplos verificados são esvaziados a cada
+pergunta, para que todas percorram o caminho completo.
+
+O relatório em JSON traz p50/p95/p99 por etapa e de ponta a ponta, vazão e
+pico de memória alocada por pergunta. Com `--comparar`, aponta as etapas cujo
+p95 piorou mais que `--tolerancia` em relação a um relatório anterior.
+
+Uso:
+    python -m benchmarks.bench_pipeline --rodadas 20 --saida bench.json
+    python -m benchmarks.bench_pipeline --ms-token-prompt 2 --comparar bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+from benchmarks.load_test import percentil
+from core import engine, llm_agent
+from core.cache import AnswerCache
+from core.examples import ExampleStore
+from core.result_cache import ResultCache
+from core.prompts import INTERPRET_SYSTEM_PROMPT
+from core.utils import estimate_tokens
+
+CASES_PATH = Path(__file__).resolve().parent / "fixtures" / "pipeline.json"
+
+# Funções cronometradas: etapa -> (módulo, atributo)
+STAGES = {
+    "intencao": (engine, "match_intent"),
+    "prompt": (llm_agent, "_sql_messages"),
+    "validacao": (engine, "prepare_sql"),
+    "execucao": (engine, "execute_sql"),
+    "narracao": (engine, "narrate"),
+}
+
+
+def load_cases(path: str | Path = CASES_PATH) -> list[dict]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+class StageTimer:
+    """Acumula a duração de cada etapa da pergunta em andamento."""
+
+    def __init__(self):
+        self.current: dict[str, float] = {}
+        self.samples: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, ms: float):
+        with self._lock:
+            self.current[stage] = self.current.get(stage, 0.0) + ms
+
+    def wrap(self, stage: str, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, (time.perf_counter() - start) * 1000)
+        return timed
+
+    def finish(self):
+        with self._lock:
+            for stage, ms in self.current.items():
+                self.samples.setdefault(stage, []).append(ms)
+            self.current = {}
+
+
+class ReplayLLM:
+    """Modelo falso: devolve as saídas gravadas para cada pergunta após uma latência simulada."""
+
+    def __init__(self, cases: list[dict], timer: StageTimer, base_ms: float = 0.0,
+                 ms_token_prompt: float = 0.0, ms_token_saida: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        self.sql = {llm_agent.normalize_question(c["pergunta"]): c["sql"] for c in cases if "sql" in c}
+        self.interpretacoes = {c["sql"]: c["interpretacao"] for c in cases if "interpretacao" in c}
+        self.timer = timer
+        self.base_ms = base_ms
+        self.ms_token_prompt = ms_token_prompt
+        self.ms_token_saida = ms_token_saida
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _reply(self, messages: list[dict]) -> tuple[str, str]:
+        if messages[0]["content"] == INTERPRET_SYSTEM_PROMPT:
+            texto = messages[-1]["content"]
+            saida = next((i for sql, i in self.interpretacoes.items() if sql in texto), "Interpretação gravada.")
+            return "llm_interpretacao", saida
+        pergunta = messages[-1]["content"].split("\n\n")[0]
+        if pergunta not in self.sql:
+            raise KeyError(f"Sem SQL gravada para a pergunta: {pergunta}")
+        return "llm_sql", self.sql[pergunta]
+
+    def _delay(self, messages: list[dict], saida: str) -> float:
+        prompt = sum(estimate_tokens(m["content"]) for m in messages)
+        ms = self.base_ms + prompt * self.ms_token_prompt + estimate_tokens(saida) * self.ms_token_saida
+        with self._lock:
+            ruido = self._random.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        return ms * ruido / 1000
+
+    def invoke(self, messages):
+        start = time.perf_counter()
+        stage, saida = self._reply(messages)
+        time.sleep(self._delay(messages, saida))
+        self.timer.add(stage, (time.perf_counter() - start) * 1000)
+        return saida
+
+    async def ainvoke(self, messages):
+        start = time.perf_counter()
+        stage, saida = self._reply(messages)
+        await asyncio.sleep(self._delay(messages, saida))
+        self.timer.add(stage, (time.perf_counter() - start) * 1000)
+        return saida
+
+    def stream(self, messages):
+        yield self.invoke(messages)
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "n": len(samples),
+        "p50": round(percentil(samples, 50), 3),
+        "p95": round(percentil(samples, 95), 3),
+        "p99": round(percentil(samples, 99), 3),
+        "media": round(statistics.fmean(samples), 3),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(cases: list[dict], rounds: int = 20, warmup: int = 1, allocations: bool = True, **latency) -> dict:
+    timer = StageTimer()
+    llm = ReplayLLM(cases, timer, **latency)
+    e2e: list[float] = []
+    picos: list[float] = []
+    origens: Counter = Counter()
+
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        cache = AnswerCache(path=Path(tmp) / "cache.db", source_path=Path(tmp) / "fonte.db")
+        store = ExampleStore(Path(tmp) / "exemplos.db")
+        results = ResultCache()
+        stack.enter_context(patch.object(llm_agent, "_LLM", llm))
+        # A resposta gravada é a do modelo principal: sem cascata nem modelo de interpretação
+        stack.enter_context(patch.object(llm_agent, "_FAST_LLM", None))
+        stack.enter_context(patch.object(llm_agent, "_INTERPRET_LLM", None))
+        stack.enter_context(patch.object(engine, "get_answer_cache", return_value=cache))
+        stack.enter_context(patch.object(engine, "get_example_store", return_value=store))
+        stack.enter_context(patch.object(engine, "get_result_cache", return_value=results))
+        stack.enter_context(patch.object(llm_agent, "get_example_store", return_value=store))
+        for stage, (module, attr) in STAGES.items():
+            stack.enter_context(patch.object(module, attr, timer.wrap(stage, getattr(module, attr))))
+
+        def ask(case: dict) -> dict:
+            cache.clear()
+            store.clear()
+            results.clear()
+            return engine.auto_generate_and_run_query(case["pergunta"])
+
+        for _ in range(warmup):
+            for case in cases:
+                ask(case)
+        timer.samples.clear()
+        timer.current = {}
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for case in cases:
+                t0 = time.perf_counter()
+                resposta = ask(case)
+                e2e.append((time.perf_counter() - t0) * 1000)
+                timer.finish()
+                origens[resposta["origem"]] += 1
+        total = time.perf_counter() - start
+
+        if allocations:
+            # Passada separada: o tracemalloc deixa tudo mais lento
+            tracemalloc.start()
+            for case in cases:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                ask(case)
+                picos.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+            tracemalloc.stop()
+            timer.current = {}
+
+    relatorio = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "perguntas": len(cases),
+        "rodadas": rounds,
+        "latencia_llm": latency,
+        "origens": dict(origens),
+        "ponta_a_ponta_ms": summarize(e2e),
+        "etapas_ms": {stage: summarize(s) for stage, s in sorted(timer.samples.items())},
+        "vazao_req_s": round(len(e2e) / total, 2),
+    }
+    if picos:
+        relatorio["alocacao_pico_kib"] = {
+            "p50": round(statistics.median(picos), 1),
+            "max": round(max(picos), 1),
+        }
+    return relatorio
+
+
+def compare(atual: dict, anterior: dict, tolerance: float) -> list[dict]:
+    """Etapas (e o total) cujo p95 piorou mais que `tolerance` em relação ao relatório anterior."""
+    pares = {"ponta_a_ponta": (atual["ponta_a_ponta_ms"], anterior.get("ponta_a_ponta_ms"))}
+    for stage, stats in atual["etapas_ms"].items():
+        pares[stage] = (stats, anterior.get("etapas_ms", {}).get(stage))
+    regressoes = []
+    for nome, (novo, velho) in pares.items():
+        if not velho or not velho["p95"]:
+            continue
+        razao = novo["p95"] / velho["p95"]
+        if razao > 1 + tolerance:
+            regressoes.append({"etapa": nome, "p95_antes": velho["p95"], "p95_depois": novo["p95"], "razao": round(razao, 2)})
+    return regressoes
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", default=str(CASES_PATH), help="conjunto de perguntas e saídas gravadas")
+    parser.add_argument("--rodadas", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=1, help="rodadas descartadas no início")
+    parser.add_argument("--latencia-base", type=float, default=0.0, help="ms fixos por chamada ao modelo")
+    parser.add_argument("--ms-token-prompt", type=float, default=0.0, help="ms por token do prompt")
+    parser.add_argument("--ms-token-saida", type=float, default=0.0, help="ms por token gerado")
+    parser.add_argument("--jitter", type=float, default=0.0, help="desvio do ruído log-normal da latência")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--sem-alocacoes", action="store_true", help="pula a passada com tracemalloc")
+    parser.add_argument("--saida", help="grava o relatório neste arquivo")
+    parser.add_argument("--comparar", help="relatório anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora relativa aceita no p95")
+    args = parser.parse_args(argv)
+
+    relatorio = run(
+        load_cases(args.casos), args.rodadas, args.aquecimento, not args.sem_alocacoes,
+        base_ms=args.latencia_base, ms_token_prompt=args.ms_token_prompt,
+        ms_token_saida=args.ms_token_saida, jitter=args.jitter, seed=args.semente,
+    )
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        relatorio["comparado_com"] = anterior.get("commit")
+        relatorio["regressoes"] = compare(relatorio, anterior, args.tolerancia)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        Path(args.saida).write_text(texto + "\n", encoding="utf-8")
+    print(texto)
+    if relatorio.get("regressoes"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark do prompt de SQL: montagem e prefill no Ollama, antes e depois.
+
+"antes" reproduz o layout antigo (esquema antes das regras, reconstruído a cada
+chamada); "depois" usa `make_system_prompt_all` memorizado com prefixo estável.
+
+Uso:
+    python -m benchmarks.bench_prompt                # só tempo de montagem
+    python -m benchmarks.bench_prompt --ollama       # inclui prefill no Ollama
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+
+from config.config import OLLAMA_MODEL
+from core.llm_agent import enrich_question, normalize_question
+from core.prompts import (
+    SQL_SYSTEM_PROMPT_PREFIX,
+    SQL_SYSTEM_PROMPT_SUFFIX,
+    TABLE_ALIASES_PATH,
+    _load_table_aliases,
+    _table_section,
+    make_system_prompt_all,
+)
+from core.retrieval import select_tables
+from core.utils import list_tables
+
+QUESTIONS = [
+    "Qual o IPCA acumulado em Recife em 2024?",
+    "Variação do volume de serviços no RN",
+    "Taxa de desocupação no Ceará no segundo trimestre",
+    "Qual a bandeira de cartão com mais emissão?",
+    "Vendas de combustíveis e lubrificantes no comércio",
+    "Qual a inflação no Brasil em 12 meses?",
+]
+
+
+def legacy_prompt(tables: list[str] | None) -> str:
+    aliases = _load_table_aliases.__wrapped__(str(TABLE_ALIASES_PATH), "")
+    sections = [
+        _table_section(t, aliases.get(t, "Sem descrição disponível"))
+        for t in (tables or list_tables())
+    ]
+    head, rules = SQL_SYSTEM_PROMPT_PREFIX.split("Regras de geração:")
+    return "\n\n".join([head.strip(), *sections, "Regras de geração:" + rules, SQL_SYSTEM_PROMPT_SUFFIX])
+
+
+def build_times(builder, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for q in QUESTIONS:
+            tables = select_tables(enrich_question(normalize_question(q)))
+            start = time.perf_counter()
+            builder(tables)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def prefill_times(builder, model: str) -> list[float]:
+    import ollama
+
+    samples = []
+    for q in QUESTIONS:
+        enriched = enrich_question(normalize_question(q))
+        messages = [
+            {"role": "system", "content": builder(select_tables(enriched))},
+            {"role": "user", "content": enriched},
+        ]
+        resp = ollama.chat(model=model, messages=messages, options={"num_predict": 1})
+        samples.append(resp["prompt_eval_duration"] / 1e6)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "media_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--ollama", action="store_true", help="mede o prefill no Ollama")
+    parser.add_argument("--model", default=OLLAMA_MODEL)
+    args = parser.parse_args()
+
+    report = {
+        "montagem": {
+            "antes": summarize(build_times(legacy_prompt, args.rounds)),
+            "depois": summarize(build_times(make_system_prompt_all, args.rounds)),
+        }
+    }
+    if args.ollama:
+        report["prefill"] = {
+            "antes": summarize(prefill_times(legacy_prompt, args.model)),
+            "depois": summarize(prefill_times(make_system_prompt_all, args.model)),
+        }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Tempo de importação dos módulos de entrada, medido com `python -X importtime`.
+
+Cada medição roda num interpretador novo, como num reinício do container. O
+relatório traz o tempo total de cada módulo, os módulos mais caros da árvore
+de importação e as bibliotecas pesadas que acabaram carregadas. Com
+`--orcamento`, o comando sai com erro se algum módulo passar do limite.
+
+Uso:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --modulo core.engine --orcamento 400
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = ("core.engine", "services.ask")
+
+# Bibliotecas que só devem ser carregadas no primeiro uso
+HEAVY = ("langchain_ollama", "langchain_community", "langchain_core", "sqlalchemy", "ollama", "pandas", "matplotlib")
+
+# Limite (ms) para importar cada módulo de entrada
+BUDGET_MS = float(os.getenv("HUBIA_IMPORT_BUDGET_MS", "500"))
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportRecord:
+    modulo: str
+    proprio_ms: float
+    acumulado_ms: float
+    nivel: int
+
+
+def _python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+
+
+def import_profile(module: str) -> list[ImportRecord]:
+    """Árvore de importação de `module` num interpretador novo."""
+    out = _python(f"import {module}", "-X", "importtime")
+    if out.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{out.stderr}")
+    records = []
+    for line in out.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            records.append(ImportRecord(m[4], int(m[1]) / 1000, int(m[2]) / 1000, (len(m[3]) - 1) // 2))
+    return records
+
+
+def import_ms(module: str, runs: int = 3) -> float:
+    """Menor tempo total de importação de `module` em `runs` execuções."""
+    tempos = []
+    for _ in range(runs):
+        records = import_profile(module)
+        tempos.append(next(r.acumulado_ms for r in records if r.modulo == module and r.nivel == 0))
+    return min(tempos)
+
+
+def heavy_loaded(module: str) -> list[str]:
+    """Bibliotecas de `HEAVY` presentes em `sys.modules` depois de importar `module`."""
+    out = _python(f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))")
+    if out.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{out.stderr}")
+    return [m for m in out.stdout.strip().split(",") if m]
+
+
+def report(modules: tuple[str, ...] = MODULES, runs: int = 3, top: int = 10) -> dict:
+    relatorio = {}
+    for module in modules:
+        records = import_profile(module)
+        relatorio[module] = {
+            "total_ms": round(import_ms(module, runs), 1),
+            "pesadas": heavy_loaded(module),
+            "mais_caros": [
+                {**asdict(r), "proprio_ms": round(r.proprio_ms, 1), "acumulado_ms": round(r.acumulado_ms, 1)}
+                for r in sorted(records, key=lambda r: r.proprio_ms, reverse=True)[:top]
+            ],
+        }
+    return relatorio
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulo", action="append", help="módulo a medir (padrão: core.engine e services.ask)")
+    parser.add_argument("--execucoes", type=int, default=3, help="o total é o menor tempo entre as execuções")
+    parser.add_argument("--top", type=int, default=10, help="módulos mais caros listados")
+    parser.add_argument("--orcamento", type=float, default=None, help="limite em ms por módulo")
+    args = parser.parse_args(argv)
+
+    relatorio = report(tuple(args.modulo or MODULES), args.execucoes, args.top)
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    if args.orcamento is not None:
+        estourados = [m for m, r in relatorio.items() if r["total_ms"] > args.orcamento]
+        if estourados:
+            print(f"Acima do orçamento de {args.orcamento:g} ms: {', '.join(estourados)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Teste de carga do motor com sessões simultâneas e um modelo simulado.
+
+O modelo falso reproduz um servidor Ollama em CPU: acima de `--capacidade`
+gerações simultâneas, cada geração fica mais lenta (disputa por CPU e memória).
+O teste compara o motor sem limite de concorrência com o limite configurado.
+
+Uso:
+    python -m benchmarks.load_test --sessoes 20 --limite 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from core import engine, llm_agent
+from core.cache import AnswerCache
+from core.examples import ExampleStore
+from core.llm_cache import LLMCache
+from core.result_cache import ResultCache
+
+SQL = "SELECT nomeBandeira, SUM(qtdCartoesEmitidos) FROM transacaoCartao GROUP BY nomeBandeira"
+
+
+class ContendedLLM:
+    """Modelo simulado cuja latência cresce com o número de gerações ativas."""
+
+    def __init__(self, latencia: float, capacidade: int, expoente: float):
+        self.latencia = latencia
+        self.capacidade = capacidade
+        self.expoente = expoente
+        self.ativos = 0
+        self._lock = threading.Lock()
+
+    def _duracao(self) -> float:
+        carga = max(1.0, self.ativos / self.capacidade)
+        return self.latencia * carga ** self.expoente
+
+    async def ainvoke(self, messages):
+        with self._lock:
+            self.ativos += 1
+        try:
+            await asyncio.sleep(self._duracao())
+        finally:
+            with self._lock:
+                self.ativos -= 1
+        return SQL if "HuB-IA" in messages[0]["content"] else "Interpretação simulada."
+
+
+def percentil(amostras: list[float], p: float) -> float:
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+def rodar(sessoes: int, perguntas: int, limite: int, llm: ContendedLLM) -> dict:
+    latencias: list[float] = []
+    lock = threading.Lock()
+
+    def sessao(i: int):
+        for j in range(perguntas):
+            inicio = time.perf_counter()
+            engine.auto_generate_and_run_query(f"Emissão de cartões por bandeira {i}-{j}")
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnswerCache(path=Path(tmp) / "cache.db", source_path=Path(tmp) / "fonte.db")
+        # Exemplos, resultados e respostas do LLM isolados por rodada: nada
+        # gravado por uma rodada (ou por uso real) poupa chamadas na seguinte
+        store = ExampleStore(Path(tmp) / "exemplos.db")
+        with patch.object(llm_agent, "_LLM", llm), \
+             patch.object(llm_agent, "_FAST_LLM", None), \
+             patch.object(llm_agent, "_INTERPRET_LLM", None), \
+             patch.object(llm_agent, "_LLM_SLOTS", threading.BoundedSemaphore(limite)), \
+             patch.object(llm_agent, "get_llm_cache", return_value=LLMCache(Path(tmp) / "llm.db", mode="off")), \
+             patch.object(llm_agent, "get_example_store", return_value=store), \
+             patch.object(engine, "get_answer_cache", return_value=cache), \
+             patch.object(engine, "get_example_store", return_value=store), \
+             patch.object(engine, "get_result_cache", return_value=ResultCache()), \
+             patch.object(engine, "FAST_NARRATION", False):
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessoes) as pool:
+                list(pool.map(sessao, range(sessoes)))
+            total = time.perf_counter() - inicio
+
+    return {
+        "limite": limite,
+        "requisicoes": len(latencias),
+        "p50_s": round(statistics.median(latencias), 3),
+        "p95_s": round(percentil(latencias, 95), 3),
+        "max_s": round(max(latencias), 3),
+        "vazao_req_s": round(len(latencias) / total, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=20)
+    parser.add_argument("--perguntas", type=int, default=3, help="perguntas por sessão")
+    parser.add_argument("--limite", type=int, default=2, help="HUBIA_LLM_CONCURRENCY a testar")
+    parser.add_argument("--latencia", type=float, default=0.2, help="segundos por geração sem disputa")
+    parser.add_argument("--capacidade", type=int, default=2, help="gerações paralelas sem degradação")
+    parser.add_argument("--expoente", type=float, default=1.5, help="penalidade de disputa acima da capacidade")
+    args = parser.parse_args()
+
+    relatorio = [
+        rodar(args.sessoes, args.perguntas, limite,
+              ContendedLLM(args.latencia, args.capacidade, args.expoente))
+        for limite in (args.sessoes, args.limite)
+    ]
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,3 +5,73 @@ load_dotenv()
 
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi4-mini")
 DB_PATH = os.getenv("DB_PATH", "fecomdb.db")
+
+# Cache de respostas (core/cache.py)
+ANSWER_CACHE_PATH = os.getenv("HUBIA_CACHE_DB", ".hubia_cache.db")
+ANSWER_CACHE_TTL = int(os.getenv("HUBIA_CACHE_TTL", str(24 * 60 * 60)))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("HUBIA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ANSWER_CACHE_MEMORY_ITEMS = int(os.getenv("HUBIA_CACHE_MEMORY_ITEMS", "256"))
+
+# Seleção de tabelas para o prompt de SQL (core/retrieval.py)
+SCHEMA_TOP_K = int(os.getenv("HUBIA_SCHEMA_TOP_K", "4"))
+SCHEMA_MIN_SCORE = float(os.getenv("HUBIA_SCHEMA_MIN_SCORE", "0.12"))
+
+# Narração por regras para resultados pequenos (core/narrator.py)
+FAST_NARRATION = os.getenv("HUBIA_FAST_NARRATION", "1") == "1"
+NARRATION_MAX_ROWS = int(os.getenv("HUBIA_NARRATION_MAX_ROWS", "24"))
+
+# Concorrência do motor de consultas (core/engine.py, core/llm_agent.py)
+LLM_CONCURRENCY = int(os.getenv("HUBIA_LLM_CONCURRENCY", "2"))
+DB_WORKERS = int(os.getenv("HUBIA_DB_WORKERS", "4"))
+
+# Conexões somente leitura com o banco (core/connection.py)
+DB_MMAP_SIZE = int(os.getenv("HUBIA_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE = int(os.getenv("HUBIA_DB_CACHE_SIZE", "-65536"))  # negativo = KiB
+DB_IMMUTABLE = os.getenv("HUBIA_DB_IMMUTABLE", "0") == "1"
+
+# Proteções na execução das consultas (core/guard.py)
+QUERY_TIMEOUT = float(os.getenv("HUBIA_QUERY_TIMEOUT", "5"))  # segundos; 0 desativa
+QUERY_MAX_ROWS = int(os.getenv("HUBIA_QUERY_MAX_ROWS", "1000"))  # 0 desativa
+PLAN_MAX_COST = float(os.getenv("HUBIA_PLAN_MAX_COST", "1e7"))
+PLAN_POLICY = os.getenv("HUBIA_PLAN_POLICY", "rejeitar")  # "rejeitar" ou "avisar"
+
+# Réplica do banco em memória (core/connection.py)
+DB_MEMORY = os.getenv("HUBIA_DB_MEMORY", "0") == "1"
+DB_RELOAD_INTERVAL = float(os.getenv("HUBIA_DB_RELOAD_S", "5"))  # 0 desativa a verificação
+
+# Respostas por intenção, sem o modelo (core/intents.py)
+INTENTS_ENABLED = os.getenv("HUBIA_INTENTS", "1") == "1"
+INTENT_MIN_CONFIDENCE = float(os.getenv("HUBIA_INTENT_MIN_CONFIDENCE", "0.8"))
+
+# Exemplos verificados de pergunta → SQL (core/examples.py)
+EXAMPLES_ENABLED = os.getenv("HUBIA_EXAMPLES", "1") == "1"
+EXAMPLES_PATH = os.getenv("HUBIA_EXAMPLES_DB", ".hubia_exemplos.db")
+EXAMPLE_REUSE_SCORE = float(os.getenv("HUBIA_EXAMPLE_REUSE_SCORE", "0.9"))
+EXAMPLES_MIN_SCORE = float(os.getenv("HUBIA_EXAMPLES_MIN_SCORE", "0.3"))
+EXAMPLES_FEW_SHOT = int(os.getenv("HUBIA_EXAMPLES_FEW_SHOT", "3"))
+
+# Rastreamento das etapas de cada requisição (core/tracing.py)
+TRACE_LOG = os.getenv("HUBIA_TRACE_LOG", "1") == "1"  # linha de log estruturada por requisição
+DEBUG_PANEL = os.getenv("HUBIA_DEBUG_PANEL", "0") == "1"  # painel de depuração aberto por padrão no app
+
+# Cache das respostas do modelo, endereçado pelo conteúdo (core/llm_cache.py)
+LLM_CACHE_MODE = os.getenv("HUBIA_LLM_CACHE", "off")  # off, on, record ou replay
+LLM_CACHE_PATH = os.getenv("HUBIA_LLM_CACHE_DB", ".hubia_llm_cache.db")
+LLM_CACHE_MAX_BYTES = int(os.getenv("HUBIA_LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Cache de resultados por SQL canônica (core/result_cache.py)
+RESULT_CACHE_ENABLED = os.getenv("HUBIA_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_MAX_BYTES = int(os.getenv("HUBIA_RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Modelo no Ollama: opções, aquecimento e prontidão (models/model_loader.py)
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "")  # vazio = http://localhost:11434
+MODEL_KEEP_ALIVE = os.getenv("HUBIA_MODEL_KEEP_ALIVE", "30m")  # duração ou segundos; -1 mantém sempre
+MODEL_NUM_CTX = int(os.getenv("HUBIA_MODEL_NUM_CTX", "0"))  # 0 = dimensionado pelo prompt de SQL
+MODEL_NUM_THREAD = int(os.getenv("HUBIA_MODEL_NUM_THREAD", "0"))  # 0 = padrão do Ollama
+MODEL_NUM_PREDICT = int(os.getenv("HUBIA_MODEL_NUM_PREDICT", "512"))  # 0 = sem limite
+MODEL_WARMUP = os.getenv("HUBIA_MODEL_WARMUP", "1") == "1"
+MODEL_WARMUP_INTERVAL = float(os.getenv("HUBIA_MODEL_WARMUP_S", "240"))  # 0 = só na inicialização
+
+# Cascata de modelos (core/llm_agent.py)
+SQL_FAST_MODEL = os.getenv("HUBIA_SQL_FAST_MODEL", "")  # vazio = só o OLLAMA_MODEL gera SQL
+INTERPRET_MODEL = os.getenv("HUBIA_INTERPRET_MODEL", "")  # vazio = OLLAMA_MODEL interpreta
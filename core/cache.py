@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from config.config import (
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_MEMORY_ITEMS,
+)
+from core.utils import DB_PATH, data_version
+
+logger = logging.getLogger(__name__)
+
+# Mudar quando o formato das respostas armazenadas mudar
+CACHE_FORMAT = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    expires REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access);
+"""
+
+
+def make_key(question: str) -> str:
+    """Chave do cache: pergunta normalizada, sem diferença de caixa ou espaços."""
+    from core.llm_agent import normalize_question
+
+    normalized = " ".join(normalize_question(question).lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Cache em dois níveis (LRU em memória + SQLite em disco) para respostas completas.
+
+    O nível em disco é compartilhado entre os workers do Streamlit. Toda entrada
+    guarda a versão do banco de dados de origem e é descartada quando ele muda.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ANSWER_CACHE_PATH,
+        source_path: str | Path = DB_PATH,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+        memory_items: int = ANSWER_CACHE_MEMORY_ITEMS,
+    ):
+        self.path = Path(path)
+        self.source_path = Path(source_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[str, float, int, Any]] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.executescript(_SCHEMA)
+        self._version = None
+
+    def _current_version(self) -> str:
+        version = f"{CACHE_FORMAT}:{data_version(self.source_path)}"
+        if version != self._version:
+            if self._version is not None:
+                logger.info("[CACHE] Banco de dados alterado; invalidando respostas antigas.")
+            self._version = version
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._conn.execute("DELETE FROM answers WHERE version != ?", (version,))
+            self._conn.commit()
+        return version
+
+    def _remember(self, key: str, version: str, expires: float, size: int, value: Any):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[key] = (version, expires, size, value)
+        self._memory_bytes += size
+        while self._memory and (
+            len(self._memory) > self.memory_items or self._memory_bytes > self.max_bytes
+        ):
+            _, (_, _, evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def get(self, question: str) -> dict | None:
+        key = make_key(question)
+        now = time.time()
+        with self._lock:
+            version = self._current_version()
+
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] == version and entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return pickle.loads(entry[3])
+                self._memory_bytes -= self._memory.pop(key)[2]
+
+            row = self._conn.execute(
+                "SELECT version, expires, size, payload FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] != version or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row[0], row[1], row[2], row[3])
+            self.hits += 1
+            return pickle.loads(row[3])
+
+    def set(self, question: str, answer: dict):
+        key = make_key(question)
+        payload = pickle.dumps(answer, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(payload)
+        if size > self.max_bytes:
+            logger.info("[CACHE] Resposta maior que o limite do cache; não armazenada.")
+            return
+        now = time.time()
+        expires = now + self.ttl
+        with self._lock:
+            version = self._current_version()
+            self._remember(key, version, expires, size, payload)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, version, expires, last_access, size, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, version, expires, now, size, payload),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM answers WHERE expires <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM answers").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM answers ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._conn.execute("DELETE FROM answers;")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM answers"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entradas_memoria": len(self._memory),
+            "entradas_disco": entries,
+            "bytes_disco": total,
+        }
+
+
+_cache_inst: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache_inst
+    if _cache_inst is None:
+        _cache_inst = AnswerCache()
+    return _cache_inst
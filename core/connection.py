@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from urllib.parse import quote
+
+from config.config import DB_CACHE_SIZE, DB_IMMUTABLE, DB_MEMORY, DB_MMAP_SIZE, DB_RELOAD_INTERVAL
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Conexões por thread; somem junto com a thread que as criou
+_local = threading.local()
+
+# Réplicas em memória por arquivo (modo HUBIA_DB_MEMORY)
+_replicas: dict[str, MemoryReplica] = {}
+_replicas_lock = threading.Lock()
+
+
+def readonly_uri(path: str | Path, immutable: bool = DB_IMMUTABLE) -> str:
+    uri = f"file:{quote(str(Path(path).resolve()))}?mode=ro"
+    return uri + "&immutable=1" if immutable else uri
+
+
+def open_readonly(path: str | Path) -> sqlite3.Connection:
+    """Abre uma conexão somente leitura já configurada com os pragmas de leitura."""
+    conn = sqlite3.connect(readonly_uri(path), uri=True)
+    metrics.incr("db_conexoes_abertas_total")
+    conn.execute("PRAGMA query_only = 1;")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)};")
+    conn.execute(f"PRAGMA cache_size = {int(DB_CACHE_SIZE)};")
+    return conn
+
+
+def open_memory(uri: str) -> sqlite3.Connection:
+    """Abre uma conexão somente leitura com uma réplica em memória compartilhada."""
+    conn = sqlite3.connect(uri, uri=True)
+    metrics.incr("db_conexoes_abertas_total")
+    conn.execute("PRAGMA query_only = 1;")
+    return conn
+
+
+class MemoryReplica:
+    """Cópia do banco numa base SQLite em memória compartilhada.
+
+    A cópia é feita com a API de backup. Uma thread de fundo confere o arquivo
+    a cada `interval` segundos e, se ele mudou, carrega uma nova geração; as
+    conexões das threads migram para ela na próxima chamada a `get_connection`.
+    """
+
+    def __init__(self, path: str | Path, interval: float = DB_RELOAD_INTERVAL):
+        self.path = str(path)
+        self.generation = 0
+        self._anchor: sqlite3.Connection | None = None
+        # A geração anterior fica aberta por um ciclo, para que uma thread que
+        # acabou de ler o URI antigo não conecte numa base vazia
+        self._retired: sqlite3.Connection | None = None
+        self._uri = ""
+        self._identity = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.load()
+        if interval > 0:
+            threading.Thread(
+                target=self._watch, args=(interval,), name="hubia-db-replica", daemon=True
+            ).start()
+
+    def _stat(self) -> tuple[int, int, int]:
+        st = os.stat(self.path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def load(self):
+        identity = self._stat()
+        generation = self.generation + 1
+        uri = f"file:hubia_replica_{id(self)}_{generation}?mode=memory&cache=shared"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(readonly_uri(self.path, immutable=False), uri=True)
+        try:
+            source.backup(anchor)
+        finally:
+            source.close()
+        with self._lock:
+            if self._retired is not None:
+                self._retired.close()
+            self._retired, self._anchor = self._anchor, anchor
+            self._uri, self.generation, self._identity = uri, generation, identity
+        metrics.incr("db_replica_cargas_total")
+        logger.info(f"[DB] Réplica em memória de {self.path} carregada (geração {generation}).")
+
+    def current(self) -> tuple[int, str]:
+        with self._lock:
+            return self.generation, self._uri
+
+    def changed(self) -> bool:
+        try:
+            return self._stat() != self._identity
+        except OSError:
+            return False
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                if self.changed():
+                    self.load()
+            except Exception as e:
+                logger.warning(f"[DB] Falha ao recarregar a réplica de {self.path}: {e}")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for conn in (self._anchor, self._retired):
+                if conn is not None:
+                    conn.close()
+            self._anchor = self._retired = None
+
+
+def get_replica(path: str | Path) -> MemoryReplica:
+    key = str(path)
+    with _replicas_lock:
+        replica = _replicas.get(key)
+        if replica is None:
+            replica = _replicas[key] = MemoryReplica(key)
+        return replica
+
+
+def close_replicas():
+    with _replicas_lock:
+        for replica in _replicas.values():
+            replica.close()
+        _replicas.clear()
+
+
+def _file_identity(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns if DB_IMMUTABLE else 0
+
+
+def get_connection(path: str | Path) -> sqlite3.Connection:
+    """Conexão somente leitura reaproveitada pela thread atual.
+
+    Cada thread mantém uma conexão por arquivo; ela é reaberta se o arquivo
+    for substituído (ou alterado, no modo `immutable`). Com `HUBIA_DB_MEMORY=1`,
+    a conexão aponta para a réplica em memória e acompanha suas gerações.
+    """
+    key = str(path)
+    try:
+        if DB_MEMORY:
+            generation, uri = get_replica(key).current()
+            identity = ("memoria", generation)
+        else:
+            identity = _file_identity(key)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Banco de dados não encontrado em: {Path(key).resolve()}\n"
+            f"Dica: defina a variável de ambiente HUBIA_DB com o caminho correto."
+        ) from None
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    cached = conns.get(key)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+    if cached is not None:
+        logger.info(f"[DB] Arquivo {key} mudou; reabrindo a conexão.")
+        cached[1].close()
+
+    conn = open_memory(uri) if DB_MEMORY else open_readonly(key)
+    conns[key] = (identity, conn)
+    return conn
+
+
+def close_thread_connections():
+    for _, conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
+
+from core.guard import relation_aliases
+from core.retrieval import fold
+from core.utils import DB_PATH, data_version, describe_table, list_relations
+
+logger = logging.getLogger(__name__)
+
+# Pontuação mínima (0-100) do rapidfuzz para aceitar uma sugestão
+SCORE_CUTOFF = 75
+
+# Nomes que designam a mesma dimensão em famílias diferentes de tabelas
+SYNONYMS = {
+    "localidade": ("estado",),
+    "estado": ("localidade",),
+    "atividade": ("categoria",),
+    "categoria": ("atividade",),
+    "periodo": ("trimestre",),
+    "trimestre": ("periodo",),
+}
+
+# Literais entre aspas simples (preservados) ou identificadores
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\w+")
+
+
+def fold_key(name: str) -> str:
+    """Chave de comparação: sem acentos, sem caixa e só com letras e dígitos."""
+    return re.sub(r"[^a-z0-9]", "", fold(name))
+
+
+@dataclass(frozen=True)
+class CorrectionIndex:
+    """Colunas de cada relação e nomes das relações, por chave normalizada."""
+
+    columns: dict[str, dict[str, str]]
+    relations: dict[str, str]
+
+    @classmethod
+    def build(cls, relations: list[str]) -> CorrectionIndex:
+        columns = {t: {fold_key(col): col for col, _ in describe_table(t)} for t in relations}
+        return cls(columns, {fold_key(t): t for t in relations})
+
+    def _match(self, name: str, keys: dict[str, str]) -> str | None:
+        key = fold_key(name)
+        if key in keys:
+            return keys[key]
+        for synonym in SYNONYMS.get(key, ()):
+            if synonym in keys:
+                return keys[synonym]
+        best = process.extractOne(key, list(keys), scorer=fuzz.ratio, score_cutoff=SCORE_CUTOFF)
+        return keys[best[0]] if best else None
+
+    def suggest_column(self, name: str, tables: list[str]) -> str | None:
+        keys = {}
+        for table in tables or self.columns:
+            keys.update(self.columns.get(table, {}))
+        return self._match(name, keys)
+
+    def suggest_relation(self, name: str) -> str | None:
+        return self._match(name, self.relations)
+
+
+@lru_cache(maxsize=4)
+def _build_index(db_path: str, version: str) -> CorrectionIndex:
+    index = CorrectionIndex.build(list_relations())
+    logger.info(f"[CORREÇÃO] Índice criado com {len(index.relations)} relações.")
+    return index
+
+
+def get_correction_index() -> CorrectionIndex:
+    return _build_index(str(DB_PATH), data_version(DB_PATH))
+
+
+def _is_relation_position(sql: str, name: str) -> bool:
+    return re.search(rf"\b(?:from|join)\s+[\"`\[]?{re.escape(name)}\b", sql, re.I) is not None
+
+
+def correct_sql(sql: str, unknown: list[str], index: CorrectionIndex | None = None) -> tuple[str, dict[str, str]]:
+    """Troca os nomes desconhecidos pelas sugestões do índice numa única passada.
+
+    Colunas são procuradas só nas tabelas citadas em FROM/JOIN; literais entre
+    aspas simples não são alterados. Retorna a SQL e as substituições feitas.
+    """
+    index = index or get_correction_index()
+    cited = [t for t in relation_aliases(sql).values() if t in index.columns]
+    fixes = {}
+    for name in unknown:
+        if _is_relation_position(sql, name):
+            suggestion = index.suggest_relation(name)
+        else:
+            suggestion = index.suggest_column(name, cited)
+        if suggestion and suggestion != name:
+            fixes[name] = suggestion
+    if not fixes:
+        return sql, {}
+
+    def replace(m: re.Match) -> str:
+        return fixes.get(m.group(0), m.group(0))
+
+    return _TOKEN.sub(replace, sql), fixes
+
+
+def evaluate(cases: list[dict], correct=correct_sql, rounds: int = 3) -> dict:
+    """Acurácia da correção em casos {"sql", "esperado"}, validando como o motor faz."""
+    from core.validation import validate_sql
+
+    hits = 0
+    for case in cases:
+        sql = case["sql"]
+        for _ in range(rounds):
+            result = validate_sql(sql)
+            if result.ok or not result.unknown_names:
+                break
+            sql, _ = correct(sql, result.unknown_names)
+        hits += sql == case["esperado"]
+    return {"casos": len(cases), "acertos": hits, "acuracia": round(hits / len(cases), 3) if cases else 0.0}
@@ -1,19 +1,82 @@
 from __future__ import annotations
 
-from langchain_community.utilities import SQLDatabase
-from core.utils import DB_PATH, list_tables as _list_tables
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Iterator
 
-_DB_URI = f"sqlite:///{DB_PATH}"
-_db_inst: SQLDatabase | None = None
+from core.connection import get_connection
+from core.guard import CancelToken, guarded_execute
+from core.utils import DB_PATH, data_version, list_tables as _list_tables
 
-def get_db() -> SQLDatabase:
-    global _db_inst
-    if _db_inst is None:
-        _db_inst = SQLDatabase.from_uri(_DB_URI, sample_rows_in_table_info=0)
-    return _db_inst
+# Classes de armazenamento do SQLite para os tipos retornados pelo cursor
+_STORAGE_CLASSES = {int: "INTEGER", float: "REAL", str: "TEXT", bytes: "BLOB"}
 
-def run_query(sql: str):
-    return get_db().run(sql)
+@dataclass
+class QueryResult:
+    """Resultado de uma consulta: nomes e tipos das colunas e as linhas do cursor."""
+
+    columns: list[str]
+    types: list[str]
+    rows: list[tuple] = field(repr=False)
+    truncated: bool = False
+
+    @classmethod
+    def from_cursor(cls, cursor: sqlite3.Cursor) -> QueryResult:
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description or []]
+        return cls(columns, _infer_types(rows, len(columns)), rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __bool__(self) -> bool:
+        return bool(self.rows)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.rows)
+
+    def column(self, name: str) -> list[Any]:
+        idx = self.columns.index(name)
+        return [row[idx] for row in self.rows]
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self.rows, columns=self.columns, coerce_float=False)
+
+    def to_dict(self) -> dict:
+        data = {"colunas": self.columns, "tipos": self.types, "linhas": [list(r) for r in self.rows]}
+        if self.truncated:
+            data["truncado"] = True
+        return data
+
+    def to_prompt_text(self, max_rows: int = 20, max_chars: int = 2000) -> str:
+        """Tabela em texto para prompts, limitada em linhas e caracteres."""
+        lines = [" | ".join(self.columns)]
+        lines += [" | ".join("" if v is None else str(v) for v in row) for row in self.rows[:max_rows]]
+        text = "\n".join(lines)
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit("\n", 1)[0]
+        shown = text.count("\n")
+        if shown < len(self.rows):
+            text += f"\n... ({len(self.rows)} linhas no total, {shown} exibidas)"
+        if self.truncated:
+            text += f"\n(resultado truncado em {len(self.rows)} linhas)"
+        return text
+
+    def __str__(self) -> str:
+        return self.to_prompt_text()
+
+def _infer_types(rows: list[tuple], width: int) -> list[str]:
+    types = []
+    for i in range(width):
+        value = next((row[i] for row in rows if row[i] is not None), None)
+        types.append(_STORAGE_CLASSES.get(type(value), "NULL"))
+    return types
+
+def run_query(sql: str, cancel: CancelToken | None = None) -> QueryResult:
+    """Executa a SQL com orçamento de tempo, limite de linhas e inspeção do plano."""
+    return guarded_execute(get_connection(DB_PATH), sql, str(DB_PATH), data_version(DB_PATH), cancel=cancel)
 
 def list_tables() -> list[str]:
     return _list_tables()
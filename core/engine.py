@@ -1,9 +1,24 @@
-from core.llm_agent import generate_sql_with_memory, interpret
+from core.llm_agent import agenerate_sql_with_memory, ainterpret, interpret_stream
 from core.database import run_query
-from core.utils import list_tables, describe_table
-import re
+from core.guard import CancelToken, QueryCancelled, QueryRejected
+from core.cache import get_answer_cache
+from core.result_cache import get_result_cache
+from core.narrator import narrate
+from core import metrics
+from config.config import (
+    DB_WORKERS, EXAMPLES_ENABLED, FAST_NARRATION, INTENTS_ENABLED, INTENT_MIN_CONFIDENCE, RESULT_CACHE_ENABLED,
+)
+from core.examples import get_example_store
+from core.intents import match_intent
+from core.validation import clean_query_output, is_valid_sql_structure, validate_sql
+from core.correction import correct_sql
+from core.tracing import Trace, finish_trace, span, start_trace
+import asyncio
+import contextvars
 import logging
-from difflib import get_close_matches
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,63 +30,30 @@ def is_interpretative(question: str) -> bool:
     ]
     return any(k in question.lower() for k in keywords)
 
-def clean_query_output(sql: str) -> str:
-    lines = sql.strip().splitlines()
-    cleaned = [line for line in lines if not line.lower().startswith(("ai:", "resposta:", "sql:"))]
-    return "\n".join(cleaned).strip()
-
-def extract_identifiers(sql: str) -> list[str]:
-    sql = re.sub(r"\s+AS\s+\w+", "", sql, flags=re.IGNORECASE)
-    sql = re.sub(r"'[^']*'", "", sql)
-    sql = re.sub(r'"[^"]*"', "", sql)
-    return re.findall(r"\b\w+\b", sql)
-
-def extract_aliases(sql: str) -> set[str]:
-    return set(re.findall(r"\bAS\s+(\w+)", sql, flags=re.IGNORECASE))
-
-def validate_columns_in_query(sql: str) -> tuple[list[str], set[str]]:
-    identifiers = extract_identifiers(sql)
-    aliases = extract_aliases(sql)
-    sql_keywords = {
-        "select", "from", "where", "group", "by", "order", "limit", "as",
-        "and", "or", "not", "desc", "asc", "having", "between",
-        "sum", "avg", "max", "min", "count", "distinct", "inner", "join", "on"
-    }
-    tables = list_tables()
-    valid_columns = set()
-    for table in tables:
-        cols = describe_table(table)
-        valid_columns.update({col for col, _ in cols})
-        valid_columns.add(table)
-    invalid = []
-    for word in identifiers:
-        if word.lower() in sql_keywords or word in valid_columns or word in aliases:
-            continue
-        if word.isdigit() or len(word) <= 2:
-            continue
-        if any(word.lower() == col.lower() for col in valid_columns):
-            continue
-        invalid.append(word)
-    return invalid, valid_columns
-
-def auto_correct_sql(sql: str, invalid_cols: list[str], valid_cols: set[str]) -> str:
-    corrected_sql = sql
-    for wrong in invalid_cols:
-        suggestion = get_close_matches(wrong, valid_cols, n=1)
-        if suggestion:
-            corrected_sql = re.sub(rf"\b{re.escape(wrong)}\b", suggestion[0], corrected_sql)
-            logger.info(f"[CORREÇÃO] Substituído: '{wrong}' → '{suggestion[0]}'")
+def auto_correct_sql(sql: str, invalid_cols: list[str]) -> str:
+    corrected_sql, fixes = correct_sql(sql, invalid_cols)
+    for wrong, suggestion in fixes.items():
+        logger.info(f"[CORREÇÃO] Substituído: '{wrong}' → '{suggestion}'")
     return corrected_sql
 
-def is_valid_sql_structure(sql: str) -> bool:
-    sql = sql.strip().lower()
-    return sql.startswith("select") or sql.startswith("with")
+def _stream_and_cache(
+    cache, question: str, resposta: dict, tokens: Iterator[str], trace: Trace, origem: str
+) -> Iterator[str]:
+    parts = []
+    for token in tokens:
+        parts.append(token)
+        yield token
+    interpretacao = "".join(parts)
+    cache.set(question, {**resposta, "interpretacao": interpretacao})
+    if RESULT_CACHE_ENABLED:
+        get_result_cache().set_interpretation(resposta["sql"], interpretacao)
+    finish_trace(trace, origem=origem)
 
-def auto_generate_and_run_query(question: str):
-    if is_interpretative(question):
-        raise RuntimeError("Não há contexto anterior suficiente para interpretar essa pergunta.")
+# Cada rodada corrige o primeiro erro apontado pelo SQLite
+MAX_CORRECTION_ROUNDS = 3
 
-    sql = generate_sql_with_memory(question)
+def prepare_sql(sql: str) -> str:
+    """Limpa a saída do modelo, valida a consulta no banco e corrige nomes desconhecidos."""
     sql = clean_query_output(sql)
 
     if not is_valid_sql_structure(sql):
@@ -81,33 +63,188 @@ def auto_generate_and_run_query(question: str):
             f"Saída recebida:\n{sql}"
         )
 
-    col_invalidas, col_validas = validate_columns_in_query(sql)
-
-    if col_invalidas:
-        logger.warning(f"[COLUNAS INVÁLIDAS] {col_invalidas}")
-        sql_corrigido = auto_correct_sql(sql, col_invalidas, col_validas)
-
-        col_invalidas_corrigidas, _ = validate_columns_in_query(sql_corrigido)
-        if col_invalidas_corrigidas:
+    for rodada in range(MAX_CORRECTION_ROUNDS + 1):
+        result = validate_sql(sql)
+        if result.ok:
+            return sql
+        if result.denied:
             raise RuntimeError(
-                f"Não foi possível corrigir automaticamente as colunas inválidas: {', '.join(col_invalidas_corrigidas)}.\n"
-                f"Query original:\n{sql}"
+                f"A consulta gerada tenta uma operação não permitida ({', '.join(result.denied)}). "
+                f"Apenas leituras são aceitas.\n\nSQL:\n{sql}"
             )
-        else:
-            logger.info("[SQL CORRIGIDA] Correção automática bem-sucedida.")
-            sql = sql_corrigido
+        if not result.unknown_names:
+            raise RuntimeError(f"A consulta gerada é inválida: {result.error}\n\nSQL:\n{sql}")
+        if rodada == MAX_CORRECTION_ROUNDS:
+            break
+
+        logger.warning(f"[COLUNAS INVÁLIDAS] {result.unknown_names}")
+        sql_corrigido = auto_correct_sql(sql, result.unknown_names)
+        if sql_corrigido == sql:
+            break
+        sql = sql_corrigido
+
+    raise RuntimeError(
+        f"Não foi possível corrigir automaticamente a consulta: {result.error}.\n"
+        f"SQL:\n{sql}"
+    )
 
+def execute_sql(sql: str, cancel: CancelToken | None = None):
     try:
-        result = run_query(sql)
+        result = run_query(sql, cancel)
         logger.info(f"[EXEC SQL OK] {sql}")
-        return {
-            "sql": sql,
-            "resultado": result,
-            "interpretacao": interpret(sql, result),
-            "tabela": "Detectada automaticamente"
-        }
+        return result
+    except (QueryCancelled, QueryRejected):
+        raise
     except Exception as e:
         logger.error(f"[EXEC SQL ERRO] {sql} — {e}")
         raise RuntimeError(
             f"Erro ao executar a query (mesmo após tentativa de correção).\n\nSQL:\n{sql}\n\nDetalhes:\n{e}"
         )
+
+# Acesso ao banco e ao cache em disco roda neste pool, fora do event loop
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="hubia-db")
+
+# Event loop de fundo usado pela API síncrona. Um único loop de vida longa
+# mantém válidos os clientes HTTP assíncronos do Ollama entre as chamadas.
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+def _engine_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="hubia-engine", daemon=True).start()
+    return _loop
+
+async def _blocking(fn, *args):
+    # Leva o contexto (rastreamento da requisição) para a thread do pool
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_DB_EXECUTOR, ctx.run, fn, *args)
+
+async def auto_generate_and_run_query_async(question: str, stream: bool = False, interpretar: bool = False):
+    """Gera, valida e executa a SQL da pergunta e interpreta o resultado.
+
+    As chamadas ao modelo são assíncronas e limitadas por `HUBIA_LLM_CONCURRENCY`;
+    banco e cache rodam no pool de threads. Perguntas reconhecidas por
+    `core.intents` usam a SQL do modelo de intenção (origem "intencao") sem
+    passar pelo LLM; perguntas quase idênticas a um exemplo verificado reusam
+    a SQL dele (origem "exemplo"). SQL equivalente a uma já executada sobre
+    o mesmo banco reusa o resultado e a interpretação (`core.result_cache`).
+    Com `stream=True`, "interpretacao" é um iterador de tokens entregues à
+    medida que o modelo os gera; a resposta só entra no cache ao final.
+    Com `interpretar=True`, o resultado sempre vai ao modelo para ser
+    interpretado: a narração por regras e a resposta em cache são ignoradas.
+    "telemetria" traz o `Trace` com a duração de cada etapa.
+    """
+    trace = start_trace(question)
+    try:
+        resposta, pendente = await _answer(question, stream, trace, interpretar)
+    except Exception as e:
+        finish_trace(trace, origem="erro", erro=type(e).__name__)
+        raise
+    if not pendente:
+        finish_trace(trace, origem=resposta["origem"])
+    return {**resposta, "telemetria": trace}
+
+async def _answer(question: str, stream: bool, trace: Trace, interpretar: bool = False) -> tuple[dict, bool]:
+    """Resposta do motor e se o rastreamento só termina junto com o streaming."""
+    if is_interpretative(question):
+        raise RuntimeError("Não há contexto anterior suficiente para interpretar essa pergunta.")
+
+    cache = get_answer_cache()
+    with span("cache") as attrs:
+        # A resposta guardada pode ser uma narração por regras
+        cached = None if interpretar else await _blocking(cache.get, question)
+        attrs["acerto"] = cached is not None
+    if cached is not None:
+        logger.info(f"[CACHE HIT] {question}")
+        if stream:
+            cached["interpretacao"] = iter([cached["interpretacao"]])
+        return {**cached, "origem": "cache"}, False
+
+    with span("intencao") as attrs:
+        intent = await _blocking(match_intent, question) if INTENTS_ENABLED else None
+        attrs["confianca"] = intent.confianca if intent else 0.0
+    if intent is not None and intent.confianca >= INTENT_MIN_CONFIDENCE:
+        # SQL montada a partir de modelo conhecido: dispensa o LLM e a validação
+        logger.info(f"[INTENÇÃO] {intent.indicador}/{intent.variante} → {intent.tabela} (confiança {intent.confianca})")
+        metrics.incr("intencao_total")
+        sql, origem = intent.sql, "intencao"
+    else:
+        with span("exemplo") as attrs:
+            exemplo = await _blocking(get_example_store().reusable, question) if EXAMPLES_ENABLED else None
+            attrs["acerto"] = exemplo is not None
+        if exemplo is not None:
+            logger.info(f"[EXEMPLOS] Reaproveitando a SQL de: {exemplo.question}")
+            metrics.incr("exemplo_reuso_total")
+            sql, origem = exemplo.sql, "exemplo"
+        else:
+            sql, origem = await agenerate_sql_with_memory(question), "llm"
+        with span("validacao"):
+            sql = await _blocking(prepare_sql, sql)
+    results = get_result_cache() if RESULT_CACHE_ENABLED else None
+    token = CancelToken()
+    try:
+        with span("execucao") as attrs:
+            result = await _blocking(results.get, sql) if results is not None else None
+            attrs["cache_resultado"] = result is not None
+            if result is None:
+                result = await _blocking(execute_sql, sql, token)
+                if results is not None:
+                    await _blocking(results.set, sql, result)
+            attrs["linhas"] = len(result.rows)
+    except asyncio.CancelledError:
+        # Interrompe a consulta no SQLite em vez de deixá-la ocupando o pool
+        token.cancel()
+        raise
+    # Só resultados não vazios contam como exemplo verificado
+    if origem == "llm" and EXAMPLES_ENABLED and result.rows:
+        await _blocking(get_example_store().add, question, sql, result.columns, len(result.rows))
+
+    resposta = {
+        "sql": sql,
+        "resultado": result,
+        "tabela": intent.tabela if origem == "intencao" else "Detectada automaticamente"
+    }
+
+    narrativa = None
+    if FAST_NARRATION and not interpretar:
+        with span("narracao"):
+            # Pode consultar o esquema (describe_table) para nomear as colunas
+            narrativa = await _blocking(narrate, sql, result)
+    if narrativa is not None:
+        metrics.incr("narracao_regra_total")
+        resposta["interpretacao"] = narrativa
+        await _blocking(cache.set, question, resposta)
+        if stream:
+            return {**resposta, "interpretacao": iter([narrativa]), "origem": origem}, False
+        return {**resposta, "origem": origem}, False
+    # Mesma consulta sobre o mesmo banco: a interpretação já gerada continua valendo
+    reuso = await _blocking(results.interpretation, sql) if results is not None else None
+    if reuso is not None:
+        logger.info("[CACHE RESULTADOS] Reaproveitando a interpretação do mesmo resultado.")
+        metrics.incr("interpretacao_reuso_total")
+        resposta["interpretacao"] = reuso
+        await _blocking(cache.set, question, resposta)
+        if stream:
+            return {**resposta, "interpretacao": iter([reuso]), "origem": origem}, False
+        return {**resposta, "origem": origem}, False
+    metrics.incr("narracao_llm_total")
+
+    if stream:
+        tokens = _stream_and_cache(cache, question, resposta, interpret_stream(sql, result), trace, origem)
+        return {**resposta, "interpretacao": tokens, "origem": origem}, True
+
+    resposta["interpretacao"] = await ainterpret(sql, result)
+    if results is not None:
+        await _blocking(results.set_interpretation, sql, resposta["interpretacao"])
+    await _blocking(cache.set, question, resposta)
+    return {**resposta, "origem": origem}, False
+
+def auto_generate_and_run_query(question: str, stream: bool = False, interpretar: bool = False):
+    """Versão síncrona de `auto_generate_and_run_query_async`."""
+    future = asyncio.run_coroutine_threadsafe(
+        auto_generate_and_run_query_async(question, stream, interpretar), _engine_loop()
+    )
+    return future.result()
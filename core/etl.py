@@ -0,0 +1,285 @@
+"""Carrega as séries do banco original num modelo normalizado (fato + dimensões).
+
+As tabelas quase idênticas (`pmc_8881_RNm1`, `ipca_7060_brasil`, ...) viram
+linhas de `fato_indicador`, com o período como inteiro AAAAMM, e dimensões
+de série, variante, localidade e categoria. Cada tabela original ganha uma
+view com o mesmo nome e as mesmas colunas, então SQL antiga continua válida.
+O modelo vê só a view `indicadores`, `dim_serie` e as tabelas copiadas como
+estão (ex.: `transacaoCartao`).
+
+Uso:
+    python -m core.etl --saida fecomdb.normalizado.db
+    HUBIA_DB=fecomdb.normalizado.db streamlit run app.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from core.connection import readonly_uri
+from core.optimizer import column_roles, create_indexes
+from core.prompts import load_table_aliases
+from core.utils import HIDDEN_RELATIONS_TABLE, ascii_name, column_names, table_names
+
+logger = logging.getLogger(__name__)
+
+_SERIES_NAME = re.compile(r"^(?P<pesquisa>[a-z]+)_(?P<codigo>\d+)_(?P<sufixo>\w+)$")
+_PERIOD = re.compile(r"^(\d{4})-(\d{2})(-\d{2})?")
+_HIERARCHY = ("grupo", "subgrupo", "item", "subitem")
+
+VARIANTES = {
+    "m1": "Mensal",
+    "m12": "Acumulado em 12 meses",
+    "acm1": "Variação mensal",
+    "acm12": "Variação acumulada em 12 meses",
+    "tri": "Trimestral",
+    "ac": "Acumulado no ano",
+    "ac12": "Acumulado em 12 meses",
+}
+
+SCHEMA = f"""
+CREATE TABLE dim_variante (
+    id INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL UNIQUE,
+    descricao TEXT NOT NULL
+);
+CREATE TABLE dim_serie (
+    id INTEGER PRIMARY KEY,
+    tabela TEXT NOT NULL UNIQUE,
+    pesquisa TEXT NOT NULL,
+    codigo_ibge TEXT,
+    variante_id INTEGER NOT NULL REFERENCES dim_variante(id),
+    descricao TEXT,
+    formato_periodo TEXT NOT NULL
+);
+CREATE TABLE dim_localidade (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE dim_categoria (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    grupo TEXT,
+    subgrupo TEXT,
+    item TEXT,
+    subitem TEXT
+);
+CREATE TABLE fato_indicador (
+    serie_id INTEGER NOT NULL REFERENCES dim_serie(id),
+    localidade_id INTEGER REFERENCES dim_localidade(id),
+    categoria_id INTEGER REFERENCES dim_categoria(id),
+    periodo INTEGER NOT NULL,
+    valor REAL
+);
+CREATE TABLE {HIDDEN_RELATIONS_TABLE} (nome TEXT PRIMARY KEY);
+CREATE INDEX idx_fato_serie_periodo ON fato_indicador (serie_id, periodo);
+CREATE INDEX idx_fato_localidade_periodo ON fato_indicador (localidade_id, periodo);
+CREATE INDEX idx_fato_categoria_periodo ON fato_indicador (categoria_id, periodo);
+CREATE INDEX idx_fato_periodo ON fato_indicador (periodo);
+CREATE VIEW indicadores AS
+SELECT
+    s.pesquisa, s.tabela AS serie, s.descricao, v.descricao AS variante,
+    l.nome AS localidade, c.nome AS categoria, c.grupo, c.subgrupo, c.item, c.subitem,
+    f.periodo, f.periodo / 100 AS ano, f.periodo % 100 AS mes, f.valor
+FROM fato_indicador f
+JOIN dim_serie s ON s.id = f.serie_id
+JOIN dim_variante v ON v.id = s.variante_id
+LEFT JOIN dim_localidade l ON l.id = f.localidade_id
+LEFT JOIN dim_categoria c ON c.id = f.categoria_id;
+"""
+
+# Relações de apoio que não entram no prompt
+HIDDEN = ("dim_variante", "dim_localidade", "dim_categoria", "fato_indicador")
+
+
+def period_key(text: str) -> int:
+    """'2024-03' ou '2024-03-01' -> 202403."""
+    m = _PERIOD.match(str(text))
+    if not m:
+        raise ValueError(f"Período em formato inesperado: {text!r}")
+    return int(m.group(1)) * 100 + int(m.group(2))
+
+
+def variant_code(pesquisa: str, sufixo: str) -> str:
+    """Variante da medida a partir do sufixo do nome da tabela."""
+    if pesquisa == "pnadc":
+        return "tri"
+    if pesquisa == "ipca":
+        return {"ac": "ac", "ac12": "ac12"}.get(re.sub(r"brasil|recife", "", sufixo.lower()), "m1")
+    return re.sub(r"RN|Atv|Loc", "", sufixo).lower()
+
+
+@dataclass
+class SeriesLayout:
+    """Papel de cada coluna de uma tabela no formato longo."""
+
+    period: str
+    value: str
+    location: str | None
+    categories: list[str]
+
+
+def series_layout(columns: list[str]) -> SeriesLayout | None:
+    """Layout da tabela, ou None se ela não estiver no formato longo (é copiada como está)."""
+    roles = column_roles(columns)
+    value = [c for c in columns if ascii_name(c) == "valor"]
+    period = roles.get("periodo", [])
+    location = roles.get("localidade", [])
+    categories = roles.get("atividade", []) + roles.get("categoria", [])
+    if len(value) != 1 or len(period) != 1 or len(location) > 1:
+        return None
+    if len(columns) != 2 + len(location) + len(categories):
+        return None
+    return SeriesLayout(period[0], value[0], location[0] if location else None, categories)
+
+
+class _Dimension:
+    """Atribui ids às chaves de uma dimensão à medida que aparecem."""
+
+    def __init__(self):
+        self.ids: dict[tuple, int] = {}
+
+    def id_for(self, key: tuple) -> int:
+        return self.ids.setdefault(key, len(self.ids) + 1)
+
+
+def _category_key(layout: SeriesLayout, row: dict) -> tuple | None:
+    if not layout.categories:
+        return None
+    values = {ascii_name(c): row[c] for c in layout.categories}
+    if set(values) <= set(_HIERARCHY):
+        hierarchy = tuple(values.get(level) for level in _HIERARCHY)
+        nome = next(v for v in reversed(hierarchy) if v is not None)
+        return ("ipca", nome, *hierarchy)
+    (tipo, nome), = values.items()
+    return (tipo, nome, None, None, None, None)
+
+
+def _compat_view(table: str, serie_id: int, columns: list[str], layout: SeriesLayout, fmt: str) -> str:
+    period = "printf('%04d-%02d', f.periodo / 100, f.periodo % 100)"
+    if fmt == "AAAA-MM-DD":
+        period += " || '-01'"
+    exprs = []
+    for col in columns:
+        if col == layout.period:
+            expr = period
+        elif col == layout.value:
+            expr = "f.valor"
+        elif col == layout.location:
+            expr = "l.nome"
+        elif ascii_name(col) in _HIERARCHY:
+            expr = f"c.{ascii_name(col)}"
+        else:
+            expr = "c.nome"
+        exprs.append(f'{expr} AS "{col}"')
+    return (
+        f'CREATE VIEW "{table}" AS SELECT {", ".join(exprs)} FROM fato_indicador f '
+        "LEFT JOIN dim_localidade l ON l.id = f.localidade_id "
+        "LEFT JOIN dim_categoria c ON c.id = f.categoria_id "
+        f"WHERE f.serie_id = {serie_id}"
+    )
+
+
+def build(source: str | Path, output: str | Path) -> dict:
+    """Escreve em `output` o banco normalizado montado a partir de `source`.
+
+    Retorna um resumo com as séries carregadas, as tabelas copiadas e o total de fatos.
+    """
+    source, output = Path(source), Path(output)
+    if source.resolve() == output.resolve():
+        raise ValueError("O arquivo de saída precisa ser diferente do banco de origem.")
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    aliases = load_table_aliases()
+    src = sqlite3.connect(readonly_uri(source, immutable=False), uri=True)
+    src.row_factory = sqlite3.Row
+    dst = sqlite3.connect(tmp)
+    locations, categories = _Dimension(), _Dimension()
+    resumo = {"series": [], "copiadas": [], "fatos": 0}
+    try:
+        dst.executescript(SCHEMA)
+        dst.executemany("INSERT INTO dim_variante VALUES (?, ?, ?)",
+                        [(i, code, desc) for i, (code, desc) in enumerate(VARIANTES.items(), 1)])
+        variant_ids = {code: i for i, code in enumerate(VARIANTES, 1)}
+        views = []
+
+        for table in table_names(src):
+            columns = column_names(src, table)
+            layout = series_layout(columns)
+            name = _SERIES_NAME.match(table)
+            variant = variant_code(name["pesquisa"], name["sufixo"]) if name else None
+            if layout is None or variant not in variant_ids:
+                ddl = src.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+                dst.execute(ddl)
+                placeholders = ", ".join("?" * len(columns))
+                dst.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})',
+                                map(tuple, src.execute(f'SELECT * FROM "{table}"')))
+                create_indexes(dst, table)
+                resumo["copiadas"].append(table)
+                continue
+
+            rows = src.execute(f'SELECT * FROM "{table}"').fetchall()
+            fmt = "AAAA-MM" if rows and len(str(rows[0][layout.period])) == 7 else "AAAA-MM-DD"
+            serie_id = len(resumo["series"]) + 1
+            dst.execute(
+                "INSERT INTO dim_serie VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (serie_id, table, name["pesquisa"], name["codigo"], variant_ids[variant], aliases.get(table), fmt),
+            )
+            facts = []
+            for row in rows:
+                loc = locations.id_for((row[layout.location],)) if layout.location else None
+                cat_key = _category_key(layout, row)
+                cat = categories.id_for(cat_key) if cat_key else None
+                facts.append((serie_id, loc, cat, period_key(row[layout.period]), row[layout.value]))
+            dst.executemany("INSERT INTO fato_indicador VALUES (?, ?, ?, ?, ?)", facts)
+            views.append(_compat_view(table, serie_id, columns, layout, fmt))
+            resumo["series"].append(table)
+            resumo["fatos"] += len(facts)
+
+        dst.executemany("INSERT INTO dim_localidade VALUES (?, ?)",
+                        [(i, key[0]) for key, i in locations.ids.items()])
+        dst.executemany("INSERT INTO dim_categoria VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(i, *key) for key, i in categories.ids.items()])
+        for view in views:
+            dst.execute(view)
+        dst.executemany(f"INSERT INTO {HIDDEN_RELATIONS_TABLE} VALUES (?)",
+                        [(n,) for n in (*HIDDEN, *resumo["series"])])
+        dst.commit()
+        dst.execute("ANALYZE")
+        dst.commit()
+        dst.execute("VACUUM")
+    finally:
+        src.close()
+        dst.close()
+
+    os.replace(tmp, output)
+    logger.info(
+        f"[ETL] {len(resumo['series'])} séries ({resumo['fatos']} fatos) e "
+        f"{len(resumo['copiadas'])} tabelas copiadas em {output}."
+    )
+    return resumo
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Gera o banco normalizado (fato + dimensões) com views compatíveis.")
+    parser.add_argument("--origem", default=os.getenv("HUBIA_DB", "fecomdb.db"), help="banco original")
+    parser.add_argument("--saida", default=None, help="banco normalizado (padrão: <origem>.normalizado.db)")
+    args = parser.parse_args(argv)
+
+    origem = Path(args.origem)
+    saida = Path(args.saida) if args.saida else origem.with_suffix(".normalizado.db")
+    resumo = build(origem, saida)
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
+    print(f"\nPara usar: HUBIA_DB={saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from config.config import EXAMPLE_REUSE_SCORE, EXAMPLES_MIN_SCORE, EXAMPLES_PATH
+from core.retrieval import TfidfIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS examples (
+    key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+"""
+
+
+# Palavras de comparação e negação que mudam a SQL: "mais" e "menos" invertem a ordenação
+_COMPARISON_WORDS = frozenset({
+    "mais", "menos", "entre", "sobre", "nao", "sem", "exceto", "acima", "abaixo",
+    "maior", "menor", "maiores", "menores", "primeiro", "ultimo", "crescente", "decrescente",
+})
+
+
+def _tokenize(text: str) -> list[str]:
+    return tokenize(text, keep=_COMPARISON_WORDS)
+
+
+def normalize(question: str) -> str:
+    """Pergunta normalizada como no cache de respostas: sinônimos, caixa e espaços."""
+    from core.llm_agent import normalize_question
+
+    return " ".join(normalize_question(question).lower().split())
+
+
+def signature(question: str) -> str:
+    """Valores concretos da pergunta (slots, números e comparações) que a SQL reaproveitada precisa repetir."""
+    from core.intents import parse_slots
+
+    slots = parse_slots(question)
+    values = [slots.indicador, slots.localidade, slots.ano, slots.mes, slots.trimestre, slots.variante]
+    tokens = _tokenize(question)
+    numbers = sorted(t for t in tokens if t.isdigit())
+    comparisons = sorted({t for t in tokens if t in _COMPARISON_WORDS})
+    return json.dumps([values, numbers, comparisons], ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class Example:
+    question: str
+    sql: str
+    columns: tuple[str, ...]
+    rows: int
+    signature: str
+
+
+class ExampleStore:
+    """Pares pergunta → SQL que já executaram com sucesso, com busca por vizinhos TF-IDF.
+
+    O índice é refeito sob demanda quando outro processo ou esta instância
+    grava um exemplo novo.
+    """
+
+    def __init__(self, path: str | Path = EXAMPLES_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.executescript(_SCHEMA)
+        self._examples: dict[str, Example] = {}
+        self._index: TfidfIndex | None = None
+        self._loaded = None
+
+    def _refresh(self):
+        state = self._conn.execute("SELECT COUNT(*), MAX(created) FROM examples").fetchone()
+        if state == self._loaded:
+            return
+        rows = self._conn.execute(
+            "SELECT key, question, normalized, sql, columns, rows, signature FROM examples"
+        ).fetchall()
+        self._examples = {
+            key: Example(question, sql, tuple(json.loads(cols)), n, sig)
+            for key, question, _, sql, cols, n, sig in rows
+        }
+        # Um filtro a mais na pergunta ("de crédito", "exceto Visa") não pode passar por reuso
+        self._index = TfidfIndex(
+            {key: normalized for key, _, normalized, *_ in rows}, unknown_terms=True, tokenizer=_tokenize
+        ) if rows else None
+        self._loaded = state
+
+    def add(self, question: str, sql: str, columns: list[str], rows: int):
+        normalized = normalize(question)
+        key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO examples (key, question, normalized, sql, columns, rows, signature, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, question, normalized, sql, json.dumps(list(columns), ensure_ascii=False), rows,
+                 signature(question), time.time()),
+            )
+            self._conn.commit()
+        logger.info(f"[EXEMPLOS] Exemplo gravado: {question}")
+
+    def nearest(self, question: str, k: int = 3, min_score: float = EXAMPLES_MIN_SCORE) -> list[tuple[Example, float]]:
+        with self._lock:
+            self._refresh()
+            if self._index is None:
+                return []
+            ranked = self._index.rank(normalize(question))
+            return [(self._examples[key], score) for key, score in ranked[:k] if score >= min_score]
+
+    def reusable(self, question: str, min_score: float = EXAMPLE_REUSE_SCORE) -> Example | None:
+        """Exemplo quase idêntico à pergunta e com os mesmos valores concretos, se houver."""
+        found = self.nearest(question, k=1, min_score=min_score)
+        if not found or found[0][0].signature != signature(question):
+            return None
+        example = found[0][0]
+        with self._lock:
+            self._conn.execute("UPDATE examples SET uses = uses + 1 WHERE question = ?", (example.question,))
+            self._conn.commit()
+        return example
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM examples;")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, uses = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(uses), 0) FROM examples").fetchone()
+        return {"exemplos": entries, "reusos": uses}
+
+
+_store_inst: ExampleStore | None = None
+
+
+def get_example_store() -> ExampleStore:
+    global _store_inst
+    if _store_inst is None:
+        _store_inst = ExampleStore()
+    return _store_inst
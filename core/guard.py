@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from config.config import PLAN_MAX_COST, PLAN_POLICY, QUERY_MAX_ROWS, QUERY_TIMEOUT
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Frequência (em instruções da VM do SQLite) da checagem de tempo e cancelamento
+PROGRESS_STEPS = 10_000
+
+# Linhas assumidas quando o plano não permite estimar a origem
+DEFAULT_ROWS = 1_000
+
+# Custo de uma busca por índice em relação a uma linha varrida
+INDEX_LOOKUP_COST = 10
+
+_FROM_ALIAS = re.compile(
+    r'(?:\b(?:from|join)\s+|,\s*)["`\[]?(\w+)["`\]]?(?:\s+(?:as\s+)?(?!(?:where|on|join|inner|left|right|full|outer|cross|group|order|limit|natural|using|from|union|having|except|intersect)\b)(\w+))?',
+    re.I,
+)
+# LIMIT final nas formas `LIMIT n`, `LIMIT n OFFSET m` e `LIMIT m, n`
+_LIMIT = re.compile(r"\blimit\s+(\d+)(?:\s+offset\s+(\d+)|\s*,\s*(\d+))?\s*$", re.I)
+# Textos, identificadores entre aspas, parênteses e a palavra LIMIT
+_LIMIT_SCAN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|[()]|\blimit\b""", re.I)
+# Comentários, preservando o conteúdo dos textos entre aspas
+_COMMENT = re.compile(r"('(?:[^']|'')*')|--[^\n]*|/\*.*?\*/", re.S)
+
+
+class QueryRejected(RuntimeError):
+    """Consulta recusada pela inspeção do plano de execução."""
+
+
+class QueryCancelled(RuntimeError):
+    """Consulta interrompida por tempo esgotado ou cancelamento."""
+
+
+class CancelToken:
+    """Permite cancelar uma consulta em andamento a partir de outra thread."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+@dataclass
+class PlanReport:
+    cost: float
+    nested_scans: list[list[str]] = field(default_factory=list)
+    details: list[str] = field(default_factory=list)
+
+    @property
+    def risky(self) -> bool:
+        return bool(self.nested_scans) and self.cost > PLAN_MAX_COST
+
+
+@lru_cache(maxsize=256)
+def _table_rows(db_path: str, version: str, table: str) -> int:
+    from core.connection import get_connection
+
+    try:
+        return get_connection(db_path).execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    except sqlite3.Error:
+        return DEFAULT_ROWS
+
+
+def relation_aliases(sql: str) -> dict[str, str]:
+    """Mapeia apelidos (e os próprios nomes) para as tabelas citadas em FROM/JOIN."""
+    mapping = {}
+    for table, alias in _FROM_ALIAS.findall(sql):
+        mapping[table] = table
+        if alias:
+            mapping[alias] = table
+    return mapping
+
+
+def inspect_plan(conn: sqlite3.Connection, sql: str, db_path: str, version: str) -> PlanReport:
+    """Estima o custo da consulta a partir do EXPLAIN QUERY PLAN.
+
+    Varreduras no mesmo nível do plano são laços aninhados: o custo do nível é o
+    produto das linhas de cada varredura (buscas por índice contam pouco).
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    aliases = relation_aliases(sql)
+    children: dict[int, list[tuple[int, str]]] = {}
+    for node_id, parent, _, detail in plan:
+        children.setdefault(parent, []).append((node_id, detail))
+
+    materialized: dict[str, float] = {}
+    nested: list[list[str]] = []
+
+    def rows_of(name: str) -> float:
+        if name in materialized:
+            return materialized[name]
+        table = aliases.get(name, name)
+        return _table_rows(db_path, version, table)
+
+    def level(parent: int) -> tuple[float, float]:
+        """Retorna (linhas produzidas, custo) do nível."""
+        produced, cost, scans = 1.0, 0.0, []
+        for node_id, detail in children.get(parent, []):
+            words = detail.split()
+            sub_rows, sub_cost = level(node_id)
+            cost += sub_cost
+            if words[0] in ("MATERIALIZE", "CO-ROUTINE"):
+                materialized[words[1]] = sub_rows
+            elif words[0] == "SCAN" and len(words) > 1 and words[1] not in ("CONSTANT", "SUBQUERY"):
+                covered = "INDEX" in words
+                n = INDEX_LOOKUP_COST if covered else rows_of(words[1])
+                produced *= max(n, 1)
+                if not covered:
+                    scans.append(words[1])
+            elif words[0] == "SEARCH":
+                produced *= INDEX_LOOKUP_COST
+        if len(scans) > 1:
+            nested.append(scans)
+        return produced, cost + produced
+
+    _, total = level(0)
+    return PlanReport(cost=total, nested_scans=nested, details=[p[3] for p in plan])
+
+
+def _has_outer_limit(sql: str) -> bool:
+    depth = 0
+    for m in _LIMIT_SCAN.finditer(sql):
+        token = m.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.lower() == "limit":
+            return True
+    return False
+
+
+def apply_row_cap(sql: str, max_rows: int) -> str:
+    """Garante um LIMIT de no máximo `max_rows + 1` (a linha extra detecta truncamento).
+
+    Comentários são removidos para o LIMIT final ser encontrado. Um LIMIT que
+    não é número literal faz a consulta ser envolvida numa subconsulta.
+    """
+    sql = _COMMENT.sub(lambda m: m.group(1) or " ", sql).strip().rstrip(";").rstrip()
+    m = _LIMIT.search(sql)
+    if m:
+        if m.group(3) is not None:
+            offset, count = m.group(1), int(m.group(3))
+        else:
+            offset, count = m.group(2), int(m.group(1))
+        if count <= max_rows:
+            return sql
+        return sql[: m.start()] + f"LIMIT {max_rows + 1}" + (f" OFFSET {offset}" if offset else "")
+    if _has_outer_limit(sql):
+        return f"SELECT * FROM (\n{sql}\n)\nLIMIT {max_rows + 1}"
+    return f"{sql}\nLIMIT {max_rows + 1}"
+
+
+def guarded_execute(
+    conn: sqlite3.Connection,
+    sql: str,
+    db_path: str,
+    version: str,
+    timeout: float = QUERY_TIMEOUT,
+    max_rows: int = QUERY_MAX_ROWS,
+    cancel: CancelToken | None = None,
+):
+    """Executa a consulta com inspeção do plano, orçamento de tempo e limite de linhas."""
+    from core.database import QueryResult
+
+    metrics.incr("guard_consultas_total")
+    report = inspect_plan(conn, sql, db_path, version)
+    if report.risky:
+        msg = (
+            f"Plano com varreduras aninhadas sem índice ({report.nested_scans}) "
+            f"e custo estimado de {report.cost:,.0f} linhas."
+        )
+        if PLAN_POLICY == "rejeitar":
+            metrics.incr("guard_plano_rejeitado_total")
+            logger.warning(f"[GUARD] Consulta rejeitada. {msg}")
+            raise QueryRejected(f"Consulta rejeitada para proteger o servidor. {msg}")
+        metrics.incr("guard_plano_alerta_total")
+        logger.warning(f"[GUARD] {msg}")
+
+    if max_rows > 0:
+        sql = apply_row_cap(sql, max_rows)
+
+    deadline = time.monotonic() + timeout if timeout > 0 else math.inf
+    motivo = []
+
+    def progress() -> int:
+        if cancel is not None and cancel.cancelled:
+            motivo.append("cancelada")
+            return 1
+        if time.monotonic() > deadline:
+            motivo.append("tempo")
+            return 1
+        return 0
+
+    conn.set_progress_handler(progress, PROGRESS_STEPS)
+    try:
+        result = QueryResult.from_cursor(conn.execute(sql))
+    except sqlite3.OperationalError as e:
+        if motivo == ["tempo"]:
+            metrics.incr("guard_timeout_total")
+            logger.warning(f"[GUARD] Tempo limite de {timeout}s excedido.")
+            raise QueryCancelled(f"A consulta excedeu o tempo limite de {timeout}s.") from e
+        if motivo == ["cancelada"]:
+            metrics.incr("guard_cancelada_total")
+            logger.info("[GUARD] Consulta cancelada.")
+            raise QueryCancelled("A consulta foi cancelada.") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+    if max_rows > 0 and len(result.rows) > max_rows:
+        del result.rows[max_rows:]
+        result.truncated = True
+        metrics.incr("guard_truncadas_total")
+        logger.info(f"[GUARD] Resultado truncado em {max_rows} linhas.")
+    return result
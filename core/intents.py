@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from core.connection import get_connection
+from core.optimizer import column_roles
+from core.retrieval import _STOPWORDS, fold, tokenize
+from core.utils import DB_PATH, data_version, describe_table, list_relations
+
+logger = logging.getLogger(__name__)
+
+# Indicadores reconhecidos, na ordem de verificação (sobre o texto sem acentos)
+INDICATORS = {
+    "desocupacao": re.compile(r"desocupa|desemprego"),
+    "informalidade": re.compile(r"informal"),
+    "ocupacao": re.compile(r"(?<!des)ocupa"),
+    "ipca": re.compile(r"\bipca\b|inflac"),
+    "pms": re.compile(r"\bpms\b|servico"),
+    "pmc": re.compile(r"\bpmc\b|comercio|varejo|vendas"),
+}
+
+# Tabelas candidatas por indicador e variante da medida, em ordem de preferência
+TEMPLATES = {
+    "ipca": {
+        "mensal": ("ipca_7060_brasil", "ipca_7060_recife"),
+        "ano": ("ipca_7060_AcBrasil",),
+        "12m": ("ipca_7060_Ac12Brasil",),
+    },
+    "pmc": {
+        "mensal": ("pmc_8881_RNm1",),
+        "12m": ("pmc_8881_RNm12",),
+        "var_mensal": ("pmc_8881_RNAcM1",),
+        "var_12m": ("pmc_8881_RNAcM12",),
+    },
+    "pms": {
+        "mensal": ("pms_8688_RNm1", "pms_8693_RNLocm1"),
+        "12m": ("pms_8688_RNm12", "pms_8693_RNLocm12"),
+        "var_mensal": ("pms_8688_RNAcM1", "pms_8693_RNAcLocm1"),
+        "var_12m": ("pms_8688_RNAcM12", "pms_8693_RNAcLocm12"),
+    },
+    "ocupacao": {"trimestral": ("pnadc_4093_ocupacaoTri",)},
+    "desocupacao": {"trimestral": ("pnadc_4093_desocupacaoTri",)},
+    "informalidade": {"trimestral": ("pnadc_4093_informalidadeTri",)},
+}
+
+LABELS = {
+    "ipca": "IPCA",
+    "pmc": "receita do comércio",
+    "pms": "volume de serviços",
+    "ocupacao": "taxa de ocupação",
+    "desocupacao": "taxa de desocupação",
+    "informalidade": "taxa de informalidade",
+}
+
+VARIANT_LABELS = {
+    "mensal": "mensal",
+    "ano": "acumulado no ano",
+    "12m": "acumulado em 12 meses",
+    "var_mensal": "variação mensal",
+    "var_12m": "variação acumulada em 12 meses",
+    "trimestral": "trimestral",
+}
+
+# Variantes acumuladas: com só o ano na pergunta, responde com o último mês
+CUMULATIVE = {"ano", "12m", "var_12m"}
+
+# Tabelas sem coluna de localidade cobrem um único lugar
+IMPLIED_LOCALITY = {"pms_8688_": "Rio Grande do Norte"}
+
+DEFAULT_LOCALITY = "Brasil"
+
+# Linha de total de cada coluna de categoria
+CATEGORY_TOTALS = {"grupo": "Índice Geral", "categoria": "Total"}
+
+UF = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia",
+    "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás",
+    "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais",
+    "PA": "Pará", "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí",
+    "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul",
+    "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina", "SP": "São Paulo",
+    "SE": "Sergipe", "TO": "Tocantins",
+}
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+ORDINALS = {"primeiro": 1, "segundo": 2, "terceiro": 3, "quarto": 4}
+
+# Palavras que descrevem a medida sem acrescentar filtros
+FILLER = {
+    "ipca", "inflacao", "pmc", "pms", "comercio", "varejista", "varejo", "vendas",
+    "servicos", "volume", "receita", "taxa", "indice", "geral", "ocupacao", "desocupacao",
+    "desemprego", "informalidade", "ocupados", "variacao", "acumulado", "acumulada",
+    "acumulados", "meses", "mes", "mensal", "ano", "trimestre", "trimestral", "valor",
+    "ficou", "esta", "estava", "pais", "nacional", "estado", "pesquisa",
+}
+
+# Perguntas que pedem detalhamento, ranking, comparação ou agregação ficam com o LLM
+_BREAKDOWN = re.compile(
+    r"\bpor\s+(?:categoria|atividade|setor|grupo|item|estado|localidade|regiao)\b"
+    r"|\bcada\b|\branking\b|\bmaior(?:es)?\b|\bmenor(?:es)?\b|\bcompar|\bentre\b"
+    r"|\bmedi[ao]s?\b|\bmediana\b|\bsoma|\btotal|\bmaxim[ao]s?\b|\bminim[ao]s?\b"
+    r"|\bpico\b|\bacima\b|\babaixo\b|\bsuperior|\binferior|\bquant[oa]s\b|\bcontar\b"
+)
+
+_YEAR = re.compile(r"\b(20\d{2})\b")
+_MONTH_NAME = re.compile(r"\b(" + "|".join(MONTHS) + r")\b")
+_MONTH_NUM = re.compile(r"\b(\d{1,2})/(20\d{2})\b")
+_QUARTER = re.compile(
+    r"\b(?:([1-4])\s*(?:o|º|°)?\s*trimestre|(primeiro|segundo|terceiro|quarto)\s+trimestre|trimestre\s+([1-4])|t([1-4]))\b"
+)
+_UF = re.compile(r"\b(" + "|".join(UF) + r")\b")
+
+
+@dataclass
+class Slots:
+    """O que a pergunta informa: indicador, localidade, período e variante da medida."""
+
+    indicador: str | None = None
+    localidade: str | None = None
+    ano: int | None = None
+    mes: int | None = None
+    trimestre: int | None = None
+    variante: str = "mensal"
+    consumidos: set[str] = field(default_factory=set)
+
+
+@dataclass
+class Intent:
+    indicador: str
+    variante: str
+    tabela: str
+    localidade: str | None
+    sql: str
+    confianca: float
+
+
+@dataclass(frozen=True)
+class _Layout:
+    periodo: str
+    localidade: str | None
+    filtros: tuple[tuple[str, str], ...]
+    valor: str
+    localidades: frozenset[str]
+
+
+@lru_cache(maxsize=4)
+def _layouts(db_path: str, version: str) -> dict[str, _Layout]:
+    existing = set(list_relations())
+    conn = get_connection(db_path)
+    layouts = {}
+    for variants in TEMPLATES.values():
+        for table in (t for tables in variants.values() for t in tables):
+            if table not in existing:
+                continue
+            cols = [col for col, _ in describe_table(table)]
+            roles = column_roles(cols)
+            loc = roles.get("localidade", [None])[0]
+            filtros = tuple(
+                (col, CATEGORY_TOTALS[fold(col)]) for col in roles.get("categoria", [])
+                if fold(col) in CATEGORY_TOTALS
+            )
+            valor = next(col for col in cols if fold(col) == "valor")
+            lugares = frozenset(r[0] for r in conn.execute(f'SELECT DISTINCT "{loc}" FROM "{table}"')) if loc else frozenset()
+            layouts[table] = _Layout(roles["periodo"][0], loc, filtros, valor, lugares)
+    return layouts
+
+
+def get_layouts() -> dict[str, _Layout]:
+    return _layouts(str(DB_PATH), data_version(DB_PATH))
+
+
+@lru_cache(maxsize=4)
+def _place_keys(db_path: str, version: str) -> tuple[tuple[str, str], ...]:
+    """Pares (chave sem acentos, localidade), das chaves mais longas às mais curtas."""
+    keys = {}
+    for layout in _layouts(db_path, version).values():
+        for place in layout.localidades:
+            keys[fold(place)] = place
+            keys[fold(re.sub(r"\s*\(.*\)", "", place))] = place
+    for place in IMPLIED_LOCALITY.values():
+        keys.setdefault(fold(place), place)
+    return tuple(sorted(keys.items(), key=lambda kv: -len(kv[0])))
+
+
+def _find_locality(question: str, folded: str) -> tuple[str | None, str]:
+    for key, place in _place_keys(str(DB_PATH), data_version(DB_PATH)):
+        if not re.search(rf"\b{re.escape(key)}\b", folded):
+            continue
+        # "para" é preposição; o estado só conta quando escrito com acento
+        if key in _STOPWORDS and not re.search(rf"\b{re.escape(place.lower())}\b", question.lower()):
+            continue
+        return place, key
+    if m := _UF.search(question):
+        return UF[m.group(1)], m.group(1).lower()
+    return None, ""
+
+
+def parse_slots(question: str) -> Slots:
+    folded = fold(question)
+    slots = Slots()
+
+    found = [name for name, pattern in INDICATORS.items() if pattern.search(folded)]
+    if len(found) == 1:
+        slots.indicador = found[0]
+
+    slots.localidade, key = _find_locality(question, folded)
+    slots.consumidos.update(tokenize(key) + tokenize(slots.localidade or ""))
+
+    if m := _MONTH_NUM.search(folded):
+        slots.mes, slots.ano = int(m.group(1)), int(m.group(2))
+        slots.consumidos.update((m.group(1), m.group(2)))
+    else:
+        if m := _MONTH_NAME.search(folded):
+            slots.mes = MONTHS[m.group(1)]
+            slots.consumidos.add(m.group(1))
+        if m := _YEAR.search(folded):
+            slots.ano = int(m.group(1))
+            slots.consumidos.add(m.group(1))
+    if m := _QUARTER.search(folded):
+        numero = m.group(1) or m.group(3) or m.group(4)
+        slots.trimestre = int(numero) if numero else ORDINALS[m.group(2)]
+        slots.consumidos.update(tokenize(m.group(0)))
+    if slots.mes and not 1 <= slots.mes <= 12:
+        slots.mes = None
+
+    doze = re.search(r"\b12\s+meses\b|\bdoze\s+meses\b", folded) is not None
+    if doze:
+        slots.consumidos.update(("12", "doze"))
+    if slots.indicador == "ipca":
+        slots.variante = "12m" if doze else "ano" if "acumulad" in folded else "mensal"
+    elif slots.indicador in ("pmc", "pms"):
+        slots.variante = ("var_" if "variac" in folded else "") + ("12m" if doze else "mensal")
+    elif slots.indicador is not None:
+        slots.variante = "trimestral"
+    return slots
+
+
+def confidence(question: str, slots: Slots) -> float:
+    """Fração das palavras relevantes da pergunta explicada pelos slots."""
+    tokens = tokenize(question)
+    if not tokens:
+        return 0.0
+    sobras = [t for t in tokens if t not in FILLER and t not in slots.consumidos and t not in MONTHS]
+    return 1 - len(sobras) / len(tokens)
+
+
+def _period_range(slots: Slots) -> tuple[str, str] | None:
+    """Intervalo [início, fim) em texto, válido para 'AAAA-MM' e 'AAAA-MM-DD'."""
+    if slots.ano is None:
+        return None
+    if slots.mes:
+        inicio, fim = slots.mes, slots.mes + 1
+    elif slots.trimestre:
+        inicio, fim = 3 * (slots.trimestre - 1) + 1, 3 * slots.trimestre + 1
+    else:
+        return f"{slots.ano}", f"{slots.ano + 1}"
+    ano_fim = slots.ano + (fim > 12)
+    return f"{slots.ano}-{inicio:02d}", f"{ano_fim}-{(fim - 1) % 12 + 1:02d}"
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def build_sql(table: str, layout: _Layout, slots: Slots, localidade: str | None) -> str:
+    label = f"{LABELS[slots.indicador]} {VARIANT_LABELS[slots.variante]}"
+    where = []
+    if layout.localidade:
+        where.append(f'"{layout.localidade}" = {_quote(localidade)}')
+    where += [f'"{col}" = {_quote(val)}' for col, val in layout.filtros]
+    intervalo = _period_range(slots)
+    if intervalo:
+        where.append(f'"{layout.periodo}" >= {_quote(intervalo[0])} AND "{layout.periodo}" < {_quote(intervalo[1])}')
+    sql = f'SELECT "{layout.periodo}" AS periodo, "{layout.valor}" AS "{label}" FROM "{table}"'
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    so_ano = slots.ano is not None and not slots.mes and not slots.trimestre
+    if slots.variante in CUMULATIVE and so_ano:
+        return sql + f' ORDER BY "{layout.periodo}" DESC LIMIT 1'
+    return sql + f' ORDER BY "{layout.periodo}"'
+
+
+def _choose_table(slots: Slots, layouts: dict[str, _Layout]) -> tuple[str, str | None] | None:
+    for table in TEMPLATES[slots.indicador].get(slots.variante, ()):
+        layout = layouts.get(table)
+        if layout is None:
+            continue
+        if layout.localidade is None:
+            implied = next((p for prefix, p in IMPLIED_LOCALITY.items() if table.startswith(prefix)), None)
+            if slots.localidade in (None, implied):
+                return table, None
+            continue
+        lugar = slots.localidade or DEFAULT_LOCALITY
+        if lugar in layout.localidades:
+            return table, lugar
+    return None
+
+
+def match_intent(question: str) -> Intent | None:
+    """Reconhece perguntas frequentes e monta a SQL sem o modelo.
+
+    Retorna None quando a pergunta pede detalhamento ou comparação, quando
+    falta o indicador, quando nenhuma tabela cobre a combinação de variante e
+    localidade ou quando o período não é um mês, trimestre ou ano.
+    """
+    if _BREAKDOWN.search(fold(question)):
+        return None
+    slots = parse_slots(question)
+    if slots.indicador is None:
+        return None
+    if (slots.mes or slots.trimestre) and slots.ano is None:
+        return None
+    layouts = get_layouts()
+    escolha = _choose_table(slots, layouts)
+    if escolha is None:
+        return None
+    table, localidade = escolha
+    return Intent(
+        indicador=slots.indicador,
+        variante=slots.variante,
+        tabela=table,
+        localidade=localidade or slots.localidade,
+        sql=build_sql(table, layouts[table], slots, localidade),
+        confianca=round(confidence(question, slots), 3),
+    )
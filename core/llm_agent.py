@@ -1,20 +1,113 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
+import threading
+import time
 from functools import lru_cache
-from typing import Any
+from typing import Any, Iterator
 
-from langchain_ollama import OllamaLLM
+from config.config import (
+    EXAMPLES_ENABLED, EXAMPLES_FEW_SHOT, INTERPRET_MODEL, LLM_CONCURRENCY, OLLAMA_MODEL, SQL_FAST_MODEL,
+)
 
+from core import metrics
+from core.examples import get_example_store
+from core.llm_cache import get_llm_cache, llm_options
 from core.prompts import make_system_prompt, make_system_prompt_all, INTERPRET_SYSTEM_PROMPT
-from core.utils import strip_sql_markup
+from core.retrieval import select_tables
+from core.tracing import current_trace, span
+from core.utils import estimate_tokens, strip_sql_markup
+from core.validation import clean_query_output, is_valid_sql_structure, validate_sql
+from models.model_loader import LazyLLM, get_model_manager
 
 # Configuração do logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-_LLM = OllamaLLM(model="phi4-mini")
+# Cliente criado no primeiro uso, com as opções de config/config.py
+_LLM = LazyLLM(OLLAMA_MODEL)
+_MODEL = get_model_manager(OLLAMA_MODEL)
+
+# Cascata: o modelo rápido tenta a SQL primeiro e só escala para `_LLM` se a
+# saída não passar na validação; a interpretação pode ir para outro modelo.
+# `None` usa `_LLM`.
+_FAST_LLM = LazyLLM(SQL_FAST_MODEL) if SQL_FAST_MODEL and SQL_FAST_MODEL != OLLAMA_MODEL else None
+_INTERPRET_LLM = LazyLLM(INTERPRET_MODEL) if INTERPRET_MODEL and INTERPRET_MODEL != OLLAMA_MODEL else None
+
+# Limita as gerações simultâneas no modelo, compartilhado por todas as sessões.
+# É um semáforo de threads para valer tanto no caminho síncrono quanto no
+# assíncrono, qualquer que seja o event loop de quem chama.
+_LLM_SLOTS = threading.BoundedSemaphore(LLM_CONCURRENCY)
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def _model_name(llm) -> str:
+    return str(getattr(llm, "model", ""))
+
+
+def _mark_used(llm):
+    (_MODEL if llm is _LLM else get_model_manager(_model_name(llm))).mark_used()
+
+
+def _observe(etapa: str, llm, inicio: float):
+    # Só chamadas que chegaram ao modelo, para as médias por nível não contarem o cache
+    metrics.observe("llm_ms", (time.perf_counter() - inicio) * 1000, etapa=etapa, modelo=_model_name(llm))
+
+
+def _cache_call(messages: list[dict], llm) -> tuple[str, dict, list[dict]]:
+    """Modelo, opções e mensagens que identificam a chamada no cache do LLM."""
+    return _model_name(llm), llm_options(llm), messages
+
+
+def _invoke(messages: list[dict], etapa: str = "llm", llm=None) -> str:
+    llm = _LLM if llm is None else llm
+    with span(etapa, tokens_prompt=_prompt_tokens(messages)) as attrs:
+        cache = get_llm_cache()
+        call = _cache_call(messages, llm)
+        saida = cache.get(*call)
+        attrs["cache_llm"] = saida is not None
+        if saida is None:
+            inicio = time.perf_counter()
+            with _LLM_SLOTS:
+                chamada = time.perf_counter()
+                attrs["espera_ms"] = round((chamada - inicio) * 1000, 3)
+                saida = llm.invoke(messages)
+            _observe(etapa, llm, chamada)
+            _mark_used(llm)
+            cache.set(*call, saida)
+        attrs["tokens_saida"] = estimate_tokens(saida)
+        return saida
+
+
+async def _ainvoke(messages: list[dict], etapa: str = "llm", llm=None) -> str:
+    llm = _LLM if llm is None else llm
+    with span(etapa, tokens_prompt=_prompt_tokens(messages)) as attrs:
+        cache = get_llm_cache()
+        call = _cache_call(messages, llm)
+        saida = await asyncio.to_thread(cache.get, *call) if cache.reads else None
+        attrs["cache_llm"] = saida is not None
+        if saida is None:
+            inicio = time.perf_counter()
+            # Espera sem bloquear o loop e sem vazar a vaga se a tarefa for cancelada
+            while not _LLM_SLOTS.acquire(blocking=False):
+                await asyncio.sleep(0.01)
+            chamada = time.perf_counter()
+            attrs["espera_ms"] = round((chamada - inicio) * 1000, 3)
+            try:
+                saida = await llm.ainvoke(messages)
+            finally:
+                _LLM_SLOTS.release()
+            _observe(etapa, llm, chamada)
+            _mark_used(llm)
+            if cache.writes:
+                await asyncio.to_thread(cache.set, *call, saida)
+        attrs["tokens_saida"] = estimate_tokens(saida)
+        return saida
 
 
 def normalize_question(q: str) -> str:
@@ -52,30 +145,81 @@ def generate_sql(question: str, table: str) -> str:
         {"role": "system", "content": make_system_prompt(table)},
         {"role": "user", "content": question},
     ]
-    raw = _LLM.invoke(messages)
+    raw = _invoke(messages)
     return strip_sql_markup(raw)
 
-def interpret(sql: str, db_result: Any) -> str:
+def _interpret_messages(sql: str, db_result: Any) -> list[dict]:
     resumo_prompt = (
         f"Resultado da consulta SQL: {db_result}\n"
         f"Query executada: {sql}\n\n"
         "Explique o resultado de forma clara e formal, sem redundância."
     )
-    messages = [
+    return [
         {"role": "system", "content": INTERPRET_SYSTEM_PROMPT},
         {"role": "user", "content": resumo_prompt},
     ]
-    return _LLM.invoke(messages)
 
+def interpret(sql: str, db_result: Any) -> str:
+    return _invoke(_interpret_messages(sql, db_result), "llm_interpretacao", _INTERPRET_LLM)
 
-def generate_sql_with_memory(question: str) -> str:
+async def ainterpret(sql: str, db_result: Any) -> str:
+    return await _ainvoke(_interpret_messages(sql, db_result), "llm_interpretacao", _INTERPRET_LLM)
+
+def interpret_stream(sql: str, db_result: Any) -> Iterator[str]:
+    """Mesma interpretação de `interpret`, entregue token a token pelo modelo.
+
+    O rastreamento é capturado aqui, pois os tokens são consumidos em outra thread.
+    """
+    return _stream(_interpret_messages(sql, db_result), current_trace(), _INTERPRET_LLM)
+
+def _stream(messages: list[dict], trace, llm=None) -> Iterator[str]:
+    llm = _LLM if llm is None else llm
+    with span("llm_interpretacao", trace, tokens_prompt=_prompt_tokens(messages)) as attrs:
+        cache = get_llm_cache()
+        call = _cache_call(messages, llm)
+        cached = cache.get(*call)
+        attrs["cache_llm"] = cached is not None
+        if cached is not None:
+            attrs["tokens_saida"] = estimate_tokens(cached)
+            yield cached
+            return
+        inicio = time.perf_counter()
+        parts = []
+        with _LLM_SLOTS:
+            chamada = time.perf_counter()
+            for token in llm.stream(messages):
+                if not parts:
+                    # Tempo até o primeiro token: espera pela vaga + prefill
+                    attrs["primeiro_token_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+                parts.append(token)
+                yield token
+        _observe("llm_interpretacao", llm, chamada)
+        _mark_used(llm)
+        attrs["tokens_saida"] = len(parts)
+        cache.set(*call, "".join(parts))
+
+
+def _sql_messages(question: str) -> tuple[str, list[dict]]:
     cleaned = normalize_question(question)
     enriched = enrich_question(cleaned)
 
-    messages = [{"role": "system", "content": make_system_prompt_all()}]
+    with span("prompt") as attrs:
+        tables = select_tables(enriched)
+        examples = []
+        if EXAMPLES_ENABLED and EXAMPLES_FEW_SHOT > 0:
+            examples = [(ex.question, ex.sql) for ex, _ in get_example_store().nearest(cleaned, k=EXAMPLES_FEW_SHOT)]
+        system_prompt = make_system_prompt_all(tables, examples)
+        attrs.update(tabelas=len(tables) if tables else 0, exemplos=len(examples))
+    logger.info(
+        f"[PROMPT] {len(tables) if tables else 'todas as'} tabelas, {len(examples)} exemplos, "
+        f"~{estimate_tokens(system_prompt)} tokens"
+    )
+
+    messages = [{"role": "system", "content": system_prompt}]
     messages.append({"role": "user", "content": enriched})
+    return enriched, messages
 
-    raw = _LLM.invoke(messages)
+def _parse_sql(question: str, enriched: str, raw: str) -> str:
     sql = strip_sql_markup(raw)
 
     logger.info(f"[Pergunta original] {question}")
@@ -83,3 +227,71 @@ def generate_sql_with_memory(question: str) -> str:
     logger.info(f"[SQL gerada] {sql}")
 
     return sql
+
+def fast_sql_ok(raw: str) -> bool:
+    """Se a SQL do modelo rápido pode seguir sem o modelo principal.
+
+    Mesmos critérios de `prepare_sql`: começa com SELECT/WITH e prepara no
+    banco sem nomes desconhecidos nem operações negadas. Uma saída que
+    dependeria da correção automática escala.
+    """
+    with span("validacao_rapida") as attrs:
+        sql = clean_query_output(strip_sql_markup(raw))
+        ok = is_valid_sql_structure(sql) and validate_sql(sql).ok
+        attrs["aceita"] = ok
+    if ok:
+        metrics.incr("cascata_aceita_total")
+    else:
+        metrics.incr("cascata_escalada_total")
+        logger.info(f"[CASCATA] SQL de {_model_name(_FAST_LLM)} rejeitada; escalando para {_model_name(_LLM)}: {sql}")
+    return ok
+
+def generate_sql_with_memory(question: str) -> str:
+    enriched, messages = _sql_messages(question)
+    if _FAST_LLM is not None:
+        raw = _invoke(messages, "llm_sql_rapido", _FAST_LLM)
+        if fast_sql_ok(raw):
+            return _parse_sql(question, enriched, raw)
+    return _parse_sql(question, enriched, _invoke(messages, "llm_sql"))
+
+async def agenerate_sql_with_memory(question: str) -> str:
+    # Seleção de tabelas e busca de exemplos leem o banco: ficam fora do event loop
+    enriched, messages = await asyncio.to_thread(_sql_messages, question)
+    if _FAST_LLM is not None:
+        raw = await _ainvoke(messages, "llm_sql_rapido", _FAST_LLM)
+        # A validação prepara a consulta no banco; fica fora do event loop
+        if await asyncio.to_thread(fast_sql_ok, raw):
+            return _parse_sql(question, enriched, raw)
+    return _parse_sql(question, enriched, await _ainvoke(messages, "llm_sql"))
+
+
+def _mean_ms(etapa: str, llm) -> tuple[int, float | None]:
+    hist = metrics.get_histogram("llm_ms", etapa=etapa, modelo=_model_name(llm))
+    if not hist or not hist["contagem"]:
+        return 0, None
+    return hist["contagem"], round(hist["soma"] / hist["contagem"], 3)
+
+
+def cascade_stats() -> dict:
+    """Taxa de escalada e latência por nível da cascata.
+
+    A economia do nível rápido compara cada SQL aceita com a média medida do
+    modelo principal e desconta o tempo gasto nas tentativas que escalaram.
+    Só chamadas que chegaram ao modelo entram nas médias.
+    """
+    aceitas = metrics.get_counter("cascata_aceita_total")
+    escaladas = metrics.get_counter("cascata_escalada_total")
+    chamadas_forte, media_forte = _mean_ms("llm_sql", _LLM)
+    niveis = {"forte": {"modelo": _model_name(_LLM), "chamadas": chamadas_forte, "media_ms": media_forte}}
+    if _FAST_LLM is not None:
+        chamadas, media = _mean_ms("llm_sql_rapido", _FAST_LLM)
+        economia = None
+        if media is not None and media_forte is not None:
+            economia = round(aceitas * (media_forte - media) - escaladas * media, 3)
+        niveis["rapido"] = {
+            "modelo": _model_name(_FAST_LLM), "chamadas": chamadas, "media_ms": media,
+            "aceitas": int(aceitas), "escaladas": int(escaladas), "economia_ms": economia,
+        }
+    chamadas, media = _mean_ms("llm_interpretacao", _INTERPRET_LLM or _LLM)
+    niveis["interpretacao"] = {"modelo": _model_name(_INTERPRET_LLM or _LLM), "chamadas": chamadas, "media_ms": media}
+    return {"taxa_escalada": metrics.ratio("cascata_escalada_total", "cascata_aceita_total"), "niveis": niveis}
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from config.config import LLM_CACHE_MAX_BYTES, LLM_CACHE_MODE, LLM_CACHE_PATH
+from core import metrics
+from core.connection import readonly_uri
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "on", "record", "replay")
+
+# Parâmetros do modelo que mudam a saída e entram na chave
+OPTION_FIELDS = (
+    "temperature", "top_k", "top_p", "seed", "num_ctx", "num_predict",
+    "repeat_penalty", "mirostat", "stop", "format",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    response TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access);
+"""
+
+
+class LLMCacheMiss(RuntimeError):
+    """Resposta ausente do cache no modo replay."""
+
+
+def llm_options(llm: Any) -> dict:
+    """Parâmetros de geração do cliente do modelo que influenciam a resposta."""
+    options = {}
+    for name in OPTION_FIELDS:
+        value = getattr(llm, name, None)
+        if isinstance(value, (str, int, float, bool, list, tuple)):
+            options[name] = value
+    return options
+
+
+def make_key(model: str, options: dict, messages: list[dict]) -> str:
+    """Hash do modelo, das opções e da lista exata de mensagens."""
+    payload = json.dumps(
+        {"modelo": model, "opcoes": options, "mensagens": messages},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Respostas do modelo em SQLite, endereçadas pelo conteúdo da chamada.
+
+    Modos: "off" (desligado), "on" (lê e grava), "record" (sempre chama o
+    modelo e grava) e "replay" (só lê; uma ausência levanta `LLMCacheMiss`).
+    No replay o arquivo é aberto somente leitura e pode vir versionado.
+    """
+
+    def __init__(self, path: str | Path = LLM_CACHE_PATH, mode: str = LLM_CACHE_MODE,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Modo de cache do LLM inválido: {mode} (use {', '.join(MODES)})")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"Cache do LLM para replay não encontrado: {self.path}")
+            self._conn = sqlite3.connect(
+                readonly_uri(self.path, immutable=False), uri=True, check_same_thread=False
+            )
+        elif mode != "off":
+            self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.executescript(_SCHEMA)
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("on", "replay")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("on", "record")
+
+    def get(self, model: str, options: dict, messages: list[dict]) -> str | None:
+        if not self.reads:
+            return None
+        key = make_key(model, options, messages)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.mode == "on":
+                self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if row is None:
+            metrics.incr("llm_cache_falha_total")
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"Chamada ao modelo {model} sem resposta gravada (chave {key[:12]}).")
+            return None
+        metrics.incr("llm_cache_acerto_total")
+        return row[0]
+
+    def set(self, model: str, options: dict, messages: list[dict], response: str):
+        if not self.writes:
+            return
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = make_key(model, options, messages)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, created, last_access, size, response) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, size, response),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM llm_responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        if self._conn is None:
+            return {"modo": self.mode, "entradas": 0, "bytes": 0}
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        return {"modo": self.mode, "entradas": entries, "bytes": total}
+
+
+_llm_cache_inst: LLMCache | None = None
+
+
+def get_llm_cache() -> LLMCache:
+    global _llm_cache_inst
+    if _llm_cache_inst is None:
+        _llm_cache_inst = LLMCache()
+        if _llm_cache_inst.mode != "off":
+            logger.info(f"[LLM CACHE] Modo {_llm_cache_inst.mode} em {_llm_cache_inst.path}")
+    return _llm_cache_inst
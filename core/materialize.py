@@ -0,0 +1,290 @@
+"""Mantém tabelas de resumo pré-calculadas para as agregações mais pedidas.
+
+Em vez de o modelo recalcular a cada pergunta o IPCA acumulado, as janelas
+de 12 meses, as médias anuais de PMC/PMS ou os totais trimestrais de
+cartões a partir das linhas brutas, este módulo grava esses resultados em
+tabelas `resumo_*` pequenas e indexadas, dentro do próprio banco. Elas
+entram no esquema do prompt com descrição própria (`table_aliases.yaml`).
+
+A atualização é incremental: para cada par (resumo, tabela de origem) fica
+registrada em `hubia_materializacao` a marca (maior período já processado)
+e o número de linhas de origem até ela. Chegando períodos novos, só o ano,
+trimestre ou mês afetado é recalculado. Se as linhas antigas mudarem, o
+par é refeito por completo.
+
+Uso:
+    python -m core.materialize                  # atualiza o banco de HUBIA_DB
+    python -m core.materialize --banco b.db --completo
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from core.etl import SeriesLayout, series_layout
+from core.optimizer import column_roles
+from core.utils import HIDDEN_RELATIONS_TABLE, column_names
+
+logger = logging.getLogger(__name__)
+
+CONTROL_TABLE = "hubia_materializacao"
+
+_CONTROL_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {CONTROL_TABLE} (
+    resumo TEXT NOT NULL,
+    fonte TEXT NOT NULL,
+    marca TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    atualizado REAL NOT NULL,
+    PRIMARY KEY (resumo, fonte)
+);
+CREATE TABLE IF NOT EXISTS {HIDDEN_RELATIONS_TABLE} (nome TEXT PRIMARY KEY);
+INSERT OR IGNORE INTO {HIDDEN_RELATIONS_TABLE} VALUES ('{CONTROL_TABLE}');
+"""
+
+# Produto das variações mensais (em %) de uma série
+_COMPOUND = "ROUND((exp(SUM(ln(1 + {v} / 100.0))) - 1) * 100, 4)"
+
+
+@dataclass(frozen=True)
+class Summary:
+    """Tabela de resumo: DDL, fontes aceitas e a consulta que a preenche.
+
+    `insert(fonte, layout)` devolve o SELECT com o parâmetro `:desde`, que
+    limita o recálculo aos períodos a partir da marca. `granularity` diz
+    como a marca vira esse limite: "ano" (recalcula o ano inteiro) ou
+    "periodo" (a partir do próprio período).
+    """
+
+    name: str
+    ddl: str
+    indexes: tuple[str, ...]
+    sources: re.Pattern
+    insert: Callable[[str, SeriesLayout], str]
+    granularity: str
+
+    @property
+    def period_column(self) -> str:
+        return "ano" if self.granularity == "ano" else "periodo"
+
+    def since(self, marca: str) -> str:
+        return marca[:4] if self.granularity == "ano" else marca
+
+
+def _q(col: str | None) -> str:
+    return f'"{col}"' if col else "NULL"
+
+
+def _ipca_levels(layout: SeriesLayout) -> str:
+    return ", ".join(_q(c) for c in layout.categories)
+
+
+def _ipca_acumulado_ano(fonte: str, layout: SeriesLayout) -> str:
+    p, v = _q(layout.period), _q(layout.value)
+    return (
+        f"SELECT :fonte, {_q(layout.location)}, {_ipca_levels(layout)}, "
+        f"CAST(substr({p}, 1, 4) AS INTEGER), {_COMPOUND.format(v=v)}, COUNT(*), MAX({p}) "
+        f'FROM "{fonte}" WHERE {v} IS NOT NULL AND substr({p}, 1, 4) >= :desde '
+        f"GROUP BY 2, 3, 4, 5, 6, 7"
+    )
+
+
+def _ipca_12_meses(fonte: str, layout: SeriesLayout) -> str:
+    p, v = _q(layout.period), _q(layout.value)
+    partition = ", ".join(_q(c) for c in [layout.location, *layout.categories])
+    # Só meses com a janela completa e contígua (o primeiro mês é 11 meses antes)
+    return (
+        f"SELECT fonte, localidade, grupo, subgrupo, item, subitem, periodo, acumulado FROM ("
+        f"SELECT :fonte AS fonte, {_q(layout.location)} AS localidade, "
+        f"{_q(layout.categories[0])} AS grupo, {_q(layout.categories[1])} AS subgrupo, "
+        f"{_q(layout.categories[2])} AS item, {_q(layout.categories[3])} AS subitem, {p} AS periodo, "
+        f"COUNT(*) OVER w AS meses, MIN({p}) OVER w AS inicio, "
+        f"ROUND((exp(SUM(ln(1 + {v} / 100.0)) OVER w) - 1) * 100, 4) AS acumulado "
+        f'FROM "{fonte}" WHERE {v} IS NOT NULL '
+        f"WINDOW w AS (PARTITION BY {partition} ORDER BY {p} ROWS BETWEEN 11 PRECEDING AND CURRENT ROW)"
+        f") WHERE meses = 12 AND periodo >= :desde "
+        f"AND substr(inicio, 1, 7) = substr(date(substr(periodo, 1, 7) || '-01', '-11 months'), 1, 7)"
+    )
+
+
+def _media_anual(fonte: str, layout: SeriesLayout) -> str:
+    p, v = _q(layout.period), _q(layout.value)
+    categoria = _q(layout.categories[0] if layout.categories else None)
+    return (
+        f"SELECT :fonte, {_q(layout.location)}, {categoria}, CAST(substr({p}, 1, 4) AS INTEGER), "
+        f"ROUND(AVG({v}), 4), MIN({v}), MAX({v}), COUNT({v}) "
+        f'FROM "{fonte}" WHERE substr({p}, 1, 4) >= :desde GROUP BY 2, 3, 4'
+    )
+
+
+_CARTAO_MEASURES = (
+    "qtdCartoesEmitidos", "qtdCartoesAtivos", "qtdTransacoesNacionais", "valorTransacoesNacionais",
+    "qtdTransacoesInternacionais", "valorTransacoesInternacionais",
+)
+
+
+def _cartao_trimestral(fonte: str, layout: SeriesLayout) -> str:
+    sums = ", ".join(f'ROUND(SUM("{c}"), 2)' for c in _CARTAO_MEASURES)
+    return (
+        f'SELECT :fonte, trimestre, nomeBandeira, nomeFuncao, {sums} '
+        f'FROM "{fonte}" WHERE trimestre >= :desde GROUP BY 2, 3, 4'
+    )
+
+
+SUMMARIES = (
+    Summary(
+        "resumo_ipca_acumulado_ano",
+        "CREATE TABLE IF NOT EXISTS resumo_ipca_acumulado_ano (fonte TEXT, localidade TEXT, "
+        "grupo TEXT, subgrupo TEXT, item TEXT, subitem TEXT, ano INTEGER, "
+        "acumulado REAL, meses INTEGER, ultimo_periodo TEXT)",
+        ("localidade, grupo, subgrupo, ano", "ano"),
+        re.compile(r"^ipca_7060_(brasil|recife)$"),
+        _ipca_acumulado_ano,
+        "ano",
+    ),
+    Summary(
+        "resumo_ipca_12_meses",
+        "CREATE TABLE IF NOT EXISTS resumo_ipca_12_meses (fonte TEXT, localidade TEXT, "
+        "grupo TEXT, subgrupo TEXT, item TEXT, subitem TEXT, periodo TEXT, acumulado REAL)",
+        ("localidade, grupo, subgrupo, periodo", "periodo"),
+        re.compile(r"^ipca_7060_(brasil|recife)$"),
+        _ipca_12_meses,
+        "periodo",
+    ),
+    Summary(
+        "resumo_media_anual",
+        "CREATE TABLE IF NOT EXISTS resumo_media_anual (fonte TEXT, localidade TEXT, "
+        "categoria TEXT, ano INTEGER, media REAL, minimo REAL, maximo REAL, meses INTEGER)",
+        ("fonte, localidade, categoria, ano", "ano"),
+        re.compile(r"^(pmc|pms)_\d+_\w+$"),
+        _media_anual,
+        "ano",
+    ),
+    Summary(
+        "resumo_cartao_trimestral",
+        "CREATE TABLE IF NOT EXISTS resumo_cartao_trimestral (fonte TEXT, periodo TEXT, "
+        "nomeBandeira TEXT, nomeFuncao TEXT, "
+        + ", ".join(f"{c} REAL" for c in _CARTAO_MEASURES) + ")",
+        ("nomeBandeira, nomeFuncao, periodo", "periodo"),
+        re.compile(r"^transacaoCartao$"),
+        _cartao_trimestral,
+        "periodo",
+    ),
+)
+
+
+def _sources(conn: sqlite3.Connection, summary: Summary) -> list[tuple[str, SeriesLayout]]:
+    """Tabelas (ou views, no banco normalizado) que alimentam o resumo, com seu layout."""
+    found = []
+    for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY rowid"
+    ):
+        if not summary.sources.match(name):
+            continue
+        columns = column_names(conn, name)
+        layout = series_layout(columns)
+        if layout is None:
+            period = column_roles(columns).get("periodo", [])
+            if len(period) != 1:
+                continue
+            layout = SeriesLayout(period[0], "", None, [])
+        if summary.name.startswith("resumo_ipca") and len(layout.categories) != 4:
+            continue
+        found.append((name, layout))
+    return found
+
+
+def _state(conn: sqlite3.Connection, fonte: str, period: str, marca: str | None) -> tuple[str | None, int]:
+    """(maior período da origem, linhas até `marca`)."""
+    maximo = conn.execute(f'SELECT MAX("{period}") FROM "{fonte}"').fetchone()[0]
+    linhas = 0
+    if marca is not None:
+        linhas = conn.execute(f'SELECT COUNT(*) FROM "{fonte}" WHERE "{period}" <= ?', (marca,)).fetchone()[0]
+    return maximo, linhas
+
+
+def _create(conn: sqlite3.Connection, summary: Summary):
+    conn.execute(summary.ddl)
+    for cols in summary.indexes:
+        name = f"idx_{summary.name}_{'_'.join(c.strip() for c in cols.split(','))}"
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON {summary.name} ({cols})')
+
+
+def refresh(db_path: str | Path, full: bool = False) -> dict[str, dict[str, str]]:
+    """Atualiza os resumos do banco em `db_path`.
+
+    Retorna, por resumo e fonte, o que foi feito: "completo", "incremental
+    desde <período>" ou "em dia".
+    """
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    report: dict[str, dict[str, str]] = {}
+    try:
+        conn.executescript(_CONTROL_SCHEMA)
+        marcas = {(r, f): (m, n) for r, f, m, n in conn.execute(
+            f"SELECT resumo, fonte, marca, linhas FROM {CONTROL_TABLE}"
+        )}
+        for summary in SUMMARIES:
+            _create(conn, summary)
+            report[summary.name] = {}
+            for fonte, layout in _sources(conn, summary):
+                marca, linhas = marcas.get((summary.name, fonte), (None, 0))
+                maximo, atuais = _state(conn, fonte, layout.period, marca)
+                if maximo is None:
+                    continue
+                if full or marca is None or atuais != linhas:
+                    desde, acao = "", "completo"
+                elif maximo > marca:
+                    desde = summary.since(marca)
+                    acao = f"incremental desde {desde}"
+                else:
+                    report[summary.name][fonte] = "em dia"
+                    continue
+
+                with conn:
+                    if desde:
+                        param = int(desde) if summary.granularity == "ano" else desde
+                        conn.execute(
+                            f"DELETE FROM {summary.name} WHERE fonte = ? AND {summary.period_column} >= ?",
+                            (fonte, param),
+                        )
+                    else:
+                        conn.execute(f"DELETE FROM {summary.name} WHERE fonte = ?", (fonte,))
+                    conn.execute(f"INSERT INTO {summary.name} {summary.insert(fonte, layout)}",
+                                 {"fonte": fonte, "desde": desde})
+                    _, total = _state(conn, fonte, layout.period, maximo)
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {CONTROL_TABLE} VALUES (?, ?, ?, ?, ?)",
+                        (summary.name, fonte, maximo, total, time.time()),
+                    )
+                report[summary.name][fonte] = acao
+            if any(a != "em dia" for a in report[summary.name].values()):
+                conn.execute(f"ANALYZE {summary.name}")
+        conn.commit()
+    finally:
+        conn.close()
+
+    feitos = sum(a != "em dia" for r in report.values() for a in r.values())
+    logger.info(f"[MATERIALIZAÇÃO] {feitos} pares (resumo, fonte) atualizados em {db_path}.")
+    return report
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Cria ou atualiza as tabelas de resumo pré-calculadas.")
+    parser.add_argument("--banco", default=os.getenv("HUBIA_DB", "fecomdb.db"), help="banco a atualizar")
+    parser.add_argument("--completo", action="store_true", help="recalcula tudo, ignorando as marcas")
+    args = parser.parse_args(argv)
+
+    report = refresh(Path(args.banco), full=args.completo)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
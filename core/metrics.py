@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import bisect
+import json
+import re
+import threading
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+
+# Limites superiores (ms) dos baldes dos histogramas; o último balde é +Inf
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# (nome, rótulos) -> [contagem por balde..., contagem em +Inf, soma]
+_histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def get_counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def ratio(part: str, *others: str) -> float:
+    """Fração de `part` no total de `part` + `others` (0.0 se não houver eventos)."""
+    with _lock:
+        hits = _counters.get(part, 0)
+        total = hits + sum(_counters.get(o, 0) for o in others)
+    return hits / total if total else 0.0
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Registra uma observação (em ms) no histograma `name` com os rótulos dados."""
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0.0] * (len(BUCKETS_MS) + 2)
+        hist[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        hist[-1] += value
+
+
+def _hist_dict(hist: list[float]) -> dict:
+    counts = hist[:-1]
+    acumulado, baldes = 0, {}
+    for bound, count in zip([*BUCKETS_MS, "+Inf"], counts):
+        acumulado += count
+        baldes[str(bound)] = int(acumulado)
+    return {"contagem": int(sum(counts)), "soma": round(hist[-1], 3), "baldes": baldes}
+
+
+def get_histogram(name: str, **labels: str) -> dict | None:
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        return _hist_dict(hist) if hist is not None else None
+
+
+def snapshot() -> dict[str, float]:
+    with _lock:
+        return dict(_counters)
+
+
+def export_json() -> str:
+    """Contadores e histogramas em JSON."""
+    with _lock:
+        data = {
+            "contadores": dict(_counters),
+            "histogramas": [
+                {"nome": name, "rotulos": dict(labels), **_hist_dict(hist)}
+                for (name, labels), hist in sorted(_histograms.items())
+            ],
+        }
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _metric_name(prefix: str, name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
+
+
+def _labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def export_prometheus(prefix: str = "hubia") -> str:
+    """Contadores e histogramas no formato de texto do Prometheus."""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric = _metric_name(prefix, name)
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        declared = set()
+        for (name, labels), hist in sorted(_histograms.items()):
+            metric = _metric_name(prefix, name)
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            data = _hist_dict(hist)
+            for bound, count in data["baldes"].items():
+                le = f'le="{bound}"'
+                lines.append(f"{metric}_bucket{_labels(labels, le)} {count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {data['soma']:g}")
+            lines.append(f"{metric}_count{_labels(labels)} {data['contagem']}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
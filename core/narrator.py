@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import ast
+import re
+from typing import Any
+
+from config.config import NARRATION_MAX_ROWS
+
+_SELECT_LIST = re.compile(r"^\s*select\s+(?:distinct\s+)?(.*?)\s+from\s+(.*)$", re.I | re.S)
+_SINGLE_TABLE = re.compile(r'^\s*["`\[]?(\w+)["`\]]?\s*(?:where\b|group\b|order\b|limit\b|;|$)', re.I)
+_AGGREGATE = re.compile(r"^(sum|avg|max|min|count)\s*\((.*)\)$", re.I | re.S)
+_ALIAS = re.compile(r"\s+as\s+[\"'`\[]?([\w\sÀ-ú]+?)[\"'`\]]?\s*$", re.I)
+_FILTER = re.compile(r"[\"`\[]?([\wÀ-ú]+)[\"`\]]?\s*=\s*'([^']*)'")
+_PERIOD_LABEL = re.compile(r"per[ií]odo|trimestre|\bano\b|\bm[eê]s\b|data", re.I)
+
+_AGGREGATE_PHRASES = {
+    "sum": "o total de {}",
+    "avg": "a média de {}",
+    "max": "o valor máximo de {}",
+    "min": "o valor mínimo de {}",
+    "count": "a contagem de {}",
+}
+
+
+def format_number(value: Any) -> str:
+    """Formata números no padrão brasileiro (1.234,56)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, float) and not value.is_integer():
+        text = f"{value:,.2f}".rstrip("0").rstrip(".")
+    else:
+        text = f"{int(value):,}"
+    return text.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _split_top_level(text: str) -> list[str]:
+    parts, depth, quote, current = [], 0, None, ""
+    for ch in text:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        current += ch
+    parts.append(current.strip())
+    return parts
+
+
+def _identifier(expr: str) -> str:
+    return expr.split(".")[-1].strip().strip('"`[]')
+
+
+def describe_expression(expr: str) -> str:
+    """Rótulo legível de uma expressão do SELECT."""
+    alias = _ALIAS.search(expr)
+    if alias:
+        return alias.group(1).strip()
+    agg = _AGGREGATE.match(expr.strip())
+    if agg:
+        func, inner = agg.group(1).lower(), agg.group(2).strip()
+        if func == "count" and inner == "*":
+            return "o número de registros"
+        return _AGGREGATE_PHRASES[func].format(_identifier(inner))
+    return _identifier(expr)
+
+
+def result_columns(sql: str, width: int) -> list[str]:
+    """Rótulos das colunas do resultado, deduzidos da lista do SELECT."""
+    m = _SELECT_LIST.match(sql)
+    if m:
+        exprs = _split_top_level(m.group(1))
+        if exprs == ["*"]:
+            table = _SINGLE_TABLE.match(m.group(2))
+            if table:
+                from core.utils import describe_table
+
+                cols = [col for col, _ in describe_table(table.group(1))]
+                if len(cols) == width:
+                    return cols
+        elif len(exprs) == width:
+            return [describe_expression(e) for e in exprs]
+    return [f"coluna {i + 1}" for i in range(width)]
+
+
+def _filters(sql: str) -> str:
+    where = re.split(r"\bwhere\b", sql, maxsplit=1, flags=re.I)
+    if len(where) < 2:
+        return ""
+    found = _FILTER.findall(where[1])
+    if not found:
+        return ""
+    return ", considerando " + " e ".join(f"{col} = {val}" for col, val in found)
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def parse_rows(result: Any) -> list[tuple] | None:
+    if hasattr(result, "rows"):
+        return list(result.rows)
+    if isinstance(result, str):
+        if not result.strip():
+            return []
+        try:
+            result = ast.literal_eval(result)
+        except (ValueError, SyntaxError):
+            return None
+    if not isinstance(result, (list, tuple)) or not all(isinstance(r, tuple) for r in result):
+        return None
+    return list(result)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _narrate_series(labels: list[str], rows: list[tuple], filtros: str) -> str | None:
+    period_idx = [i for i, lbl in enumerate(labels) if _PERIOD_LABEL.search(lbl)]
+    value_idx = [i for i in range(len(labels)) if all(_is_number(r[i]) for r in rows)]
+    if len(period_idx) != 1 or len(value_idx) != 1:
+        return None
+    p, v = period_idx[0], value_idx[0]
+    others = [i for i in range(len(labels)) if i not in (p, v)]
+    if any(len({r[i] for r in rows}) > 1 for i in others):
+        return None
+
+    serie = sorted(rows, key=lambda r: str(r[p]))
+    first, last = serie[0], serie[-1]
+    hi = max(serie, key=lambda r: r[v])
+    lo = min(serie, key=lambda r: r[v])
+    if last[v] > first[v]:
+        tendencia = "alta"
+    elif last[v] < first[v]:
+        tendencia = "queda"
+    else:
+        tendencia = "estabilidade"
+    contexto = "".join(f", {labels[i]} {first[i]}" for i in others)
+    return (
+        f"Entre {first[p]} e {last[p]}{contexto}, {labels[v]} passou de "
+        f"{format_number(first[v])} para {format_number(last[v])}, indicando {tendencia} "
+        f"no período{filtros}. O maior valor foi {format_number(hi[v])} ({hi[p]}) e o menor, "
+        f"{format_number(lo[v])} ({lo[p]}), em {len(serie)} observações."
+    )
+
+
+def narrate(sql: str, result: Any, max_rows: int = NARRATION_MAX_ROWS) -> str | None:
+    """Descreve resultados pequenos sem chamar o modelo.
+
+    Cobre resultados vazios, escalares, registros únicos e séries temporais
+    curtas. Retorna None quando o resultado precisa da interpretação do LLM.
+    """
+    rows = parse_rows(result)
+    if rows is None or len(rows) > max_rows:
+        return None
+    filtros = _filters(sql)
+    if not rows:
+        return f"A consulta não retornou registros{filtros}."
+
+    width = len(rows[0])
+    if any(len(r) != width for r in rows):
+        return None
+    if hasattr(result, "columns"):
+        labels = [describe_expression(c) for c in result.columns]
+    else:
+        labels = result_columns(sql, width)
+
+    if len(rows) == 1 and width == 1:
+        label = labels[0] if labels[0].startswith(("o ", "a ")) else f"o valor de {labels[0]}"
+        if rows[0][0] is None:
+            # Agregação sobre nenhuma linha (AVG, SUM, MAX... devolvem NULL)
+            return f"Não há dados para calcular {label}{filtros}."
+        return f"{_capitalize(label)} é {format_number(rows[0][0])}{filtros}."
+    if len(rows) == 1:
+        if all(val is None for val in rows[0]):
+            return f"A consulta não encontrou dados{filtros}."
+        if any(val is None for val in rows[0]):
+            return None
+        campos = "; ".join(f"{lbl}: {format_number(val)}" for lbl, val in zip(labels, rows[0]))
+        return f"A consulta retornou um único registro{filtros}: {campos}."
+    return _narrate_series(labels, rows, filtros)
@@ -0,0 +1,221 @@
+"""Gera uma cópia otimizada do banco: índices, estatísticas e páginas compactadas.
+
+O banco original não é alterado. Para usar a cópia, aponte `HUBIA_DB` para ela.
+
+Uso:
+    python -m core.optimizer                                  # fecomdb.db -> fecomdb.otimizado.db
+    python -m core.optimizer --origem a.db --saida b.db --relatorio relatorio.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from core.connection import open_readonly, readonly_uri
+from core.utils import ascii_name, column_names, table_names
+
+logger = logging.getLogger(__name__)
+
+# Papel de cada coluna filtrável, pelo nome (sem acento e sem caixa)
+COLUMN_ROLES = {
+    "periodo": re.compile(r"^(periodo|trimestre)$"),
+    "localidade": re.compile(r"^(localidade|estado)$"),
+    "categoria": re.compile(r"^(categoria|grupo|subgrupo|item|subitem)$"),
+    "atividade": re.compile(r"^atividade$"),
+}
+
+# Execuções de cada consulta do relatório
+REPORT_RUNS = 20
+
+
+def column_roles(columns: list[str]) -> dict[str, list[str]]:
+    """Agrupa as colunas da tabela por papel (período, localidade, categoria, atividade)."""
+    roles: dict[str, list[str]] = {}
+    for col in columns:
+        for role, pattern in COLUMN_ROLES.items():
+            if pattern.match(ascii_name(col)):
+                roles.setdefault(role, []).append(col)
+    return roles
+
+
+def _distinct(conn: sqlite3.Connection, table: str, col: str) -> int:
+    return conn.execute(f'SELECT COUNT(DISTINCT "{col}") FROM "{table}"').fetchone()[0]
+
+
+def plan_indexes(conn: sqlite3.Connection, table: str) -> list[tuple[str, list[str]]]:
+    """Índices da tabela como (nome, colunas).
+
+    Um índice composto cobre as dimensões (mais seletivas primeiro) seguidas do
+    período, atendendo `WHERE dimensão = ... AND período ...`. As demais colunas
+    filtráveis ganham índices simples.
+    """
+    roles = column_roles(column_names(conn, table))
+    period = roles.get("periodo", [])[:1]
+    dims = [c for role in ("localidade", "atividade", "categoria") for c in roles.get(role, [])]
+    dims.sort(key=lambda c: _distinct(conn, table, c), reverse=True)
+
+    indexes = []
+    if dims:
+        indexes.append(dims + period)
+        indexes += [[c] for c in dims[1:]]
+    if period:
+        indexes.append(period)
+    return [(f"idx_{ascii_name(table)}_{'_'.join(ascii_name(c) for c in cols)}", cols) for cols in indexes]
+
+
+def create_indexes(conn: sqlite3.Connection, table: str) -> list[str]:
+    """Cria os índices de `plan_indexes` e retorna seus nomes."""
+    names = []
+    for name, cols in plan_indexes(conn, table):
+        cols_sql = ", ".join(f'"{c}"' for c in cols)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({cols_sql})')
+        names.append(name)
+    return names
+
+
+def optimize(source: str | Path, output: str | Path) -> dict[str, list[str]]:
+    """Escreve em `output` uma cópia indexada, analisada e compactada de `source`.
+
+    Retorna os índices criados por tabela. A cópia é montada num arquivo
+    temporário e só substitui `output` ao final.
+    """
+    source, output = Path(source), Path(output)
+    if source.resolve() == output.resolve():
+        raise ValueError("O arquivo de saída precisa ser diferente do banco de origem.")
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    src = sqlite3.connect(readonly_uri(source, immutable=False), uri=True)
+    try:
+        src.execute("VACUUM INTO ?", (str(tmp),))
+    finally:
+        src.close()
+
+    created: dict[str, list[str]] = {}
+    conn = sqlite3.connect(tmp)
+    try:
+        for table in table_names(conn):
+            created[table] = create_indexes(conn, table)
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp, output)
+    logger.info(f"[OTIMIZADOR] {sum(map(len, created.values()))} índices criados em {output}.")
+    return created
+
+
+def standard_queries(conn: sqlite3.Connection) -> list[tuple[str, str]]:
+    """Consultas típicas geradas pelo app, montadas com valores reais de cada tabela."""
+    queries = []
+    for table in table_names(conn):
+        roles = column_roles(column_names(conn, table))
+        period = roles.get("periodo", [None])[0]
+        dims = [c for role in ("localidade", "atividade", "categoria") for c in roles.get(role, [])]
+        if period:
+            last = conn.execute(f'SELECT MAX("{period}") FROM "{table}"').fetchone()[0]
+            queries.append((table, f"SELECT * FROM \"{table}\" WHERE \"{period}\" = '{last}'"))
+        for dim in dims:
+            value = conn.execute(
+                f'SELECT "{dim}" FROM "{table}" GROUP BY "{dim}" ORDER BY COUNT(*) LIMIT 1'
+            ).fetchone()[0]
+            value = str(value).replace("'", "''")
+            sql = f"SELECT * FROM \"{table}\" WHERE \"{dim}\" = '{value}'"
+            if period:
+                sql += f" AND \"{period}\" >= '{last}'"
+            queries.append((table, sql))
+    return queries
+
+
+@dataclass
+class PlanComparison:
+    tabela: str
+    sql: str
+    plano_antes: str
+    plano_depois: str
+    ms_antes: float
+    ms_depois: float
+
+
+def _plan(conn: sqlite3.Connection, sql: str) -> str:
+    return "; ".join(r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def _time_ms(conn: sqlite3.Connection, sql: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def compare_plans(source: str | Path, output: str | Path, runs: int = REPORT_RUNS) -> list[PlanComparison]:
+    """Plano e tempo mediano de cada consulta padrão no banco original e na cópia."""
+    before, after = open_readonly(source), open_readonly(output)
+    try:
+        return [
+            PlanComparison(
+                table, sql,
+                _plan(before, sql), _plan(after, sql),
+                _time_ms(before, sql, runs), _time_ms(after, sql, runs),
+            )
+            for table, sql in standard_queries(before)
+        ]
+    finally:
+        before.close()
+        after.close()
+
+
+def format_report(rows: list[PlanComparison]) -> str:
+    scans_before = sum("SCAN" in r.plano_antes for r in rows)
+    scans_after = sum("SCAN" in r.plano_depois for r in rows)
+    total_before = sum(r.ms_antes for r in rows)
+    total_after = sum(r.ms_depois for r in rows)
+    lines = [f"{'tabela':<28} {'antes':<8} {'depois':<8} {'ms antes':>9} {'ms depois':>9}"]
+    for r in rows:
+        antes = "SCAN" if "SCAN" in r.plano_antes else "INDEX"
+        depois = "SCAN" if "SCAN" in r.plano_depois else "INDEX"
+        lines.append(f"{r.tabela:<28} {antes:<8} {depois:<8} {r.ms_antes:>9.3f} {r.ms_depois:>9.3f}")
+    lines.append(
+        f"\n{len(rows)} consultas: varreduras completas {scans_before} -> {scans_after}; "
+        f"tempo somado {total_before:.2f} ms -> {total_after:.2f} ms"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Gera uma cópia indexada e analisada do banco.")
+    parser.add_argument("--origem", default=os.getenv("HUBIA_DB", "fecomdb.db"), help="banco original")
+    parser.add_argument("--saida", default=None, help="banco otimizado (padrão: <origem>.otimizado.db)")
+    parser.add_argument("--relatorio", default=None, help="grava o relatório completo em JSON")
+    parser.add_argument("--execucoes", type=int, default=REPORT_RUNS, help="execuções por consulta")
+    args = parser.parse_args(argv)
+
+    origem = Path(args.origem)
+    saida = Path(args.saida) if args.saida else origem.with_suffix(".otimizado.db")
+    indices = optimize(origem, saida)
+    print(f"{sum(map(len, indices.values()))} índices criados em {saida}\n")
+
+    rows = compare_plans(origem, saida, args.execucoes)
+    print(format_report(rows))
+    if args.relatorio:
+        Path(args.relatorio).write_text(
+            json.dumps([asdict(r) for r in rows], indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+    print(f"\nPara usar: HUBIA_DB={saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import re
 import yaml
+from functools import lru_cache
 from textwrap import indent
 from pathlib import Path
 
-from core.utils import describe_table, DB_PATH, list_tables
+from core.utils import describe_table, DB_PATH, data_version, list_tables
 
-def load_table_aliases(path="table_aliases.yaml") -> dict:
+TABLE_ALIASES_PATH = Path(__file__).resolve().parent.parent / "config" / "table_aliases.yaml"
+
+@lru_cache(maxsize=8)
+def _load_table_aliases(path: str, version: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        aliases = yaml.safe_load(f) or {}
+    return {table: str(desc).rstrip(",").strip() for table, desc in aliases.items()}
+
+def load_table_aliases(path=TABLE_ALIASES_PATH) -> dict:
     yaml_path = Path(path)
     if not yaml_path.exists():
         return {}
-    with yaml_path.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return dict(_load_table_aliases(str(yaml_path), data_version(yaml_path)))
 
 def make_system_prompt(table: str) -> str:
     cols_fmt = "\n".join(
@@ -34,27 +43,16 @@ REGRAS:
 5. Não explique nem justifique a resposta. Apenas retorne a query SQL.
 """.strip()
 
-def make_system_prompt_all() -> str:
-    aliases = load_table_aliases()
-
-    prompt = f"""
+# Parte fixa do prompt de SQL. Vem antes do esquema para que requisições
+# consecutivas compartilhem um prefixo idêntico e o Ollama reaproveite o
+# contexto já avaliado (KV cache), mesmo quando as tabelas selecionadas mudam.
+SQL_SYSTEM_PROMPT_PREFIX = """
 Você é a HuB-IA, uma inteligência artificial treinada para responder perguntas com base em um banco de dados público da Fecomércio.
 
 Seu papel é transformar perguntas em linguagem natural em consultas SQL válidas e eficientes, usando o conhecimento sobre os dados disponíveis.
 
 As informações estão organizadas em tabelas, cada uma representando um conjunto de estatísticas econômicas específicas.
 
-Veja abaixo as tabelas disponíveis, com uma breve descrição de cada uma:
-"""
-
-    for table in list_tables():
-        desc = aliases.get(table, "Sem descrição disponível")
-        cols = describe_table(table)
-        cols_fmt = "\n".join(f"- {col} ({ctype})" for col, ctype in cols)
-        prompt += f"\n\n Tabela: `{table}`\n📘 Descrição: {desc}\n Colunas:\n{indent(cols_fmt, '  ')}"
-
-    prompt += """
-
 Regras de geração:
 1. Gere apenas a consulta SQL.
 2. Nunca modifique os dados — apenas selecione, filtre ou agregue.
@@ -72,10 +70,85 @@ Exemplo de pergunta:
 Resposta esperada:
 - SELECT * FROM ipca_7060_recife WHERE ...
 
-Responda apenas com a query SQL. Nada mais.
-"""
+Veja abaixo as tabelas disponíveis, com uma breve descrição de cada uma:
+""".strip()
+
+# Versão curta das regras, usada quando há exemplos verificados no prompt
+SQL_SYSTEM_PROMPT_FEW_SHOT_PREFIX = """
+Você é a HuB-IA, uma inteligência artificial que transforma perguntas sobre os dados públicos da Fecomércio em consultas SQL.
+
+Regras:
+1. Gere apenas a consulta SQL, começando com SELECT ou WITH.
+2. Nunca modifique os dados.
+3. Use somente as tabelas e colunas listadas abaixo.
+
+Veja abaixo as tabelas disponíveis, com uma breve descrição de cada uma:
+""".strip()
+
+SQL_SYSTEM_PROMPT_SUFFIX = "Responda apenas com a query SQL. Nada mais."
+
+# Regra acrescentada só quando o banco tem as tabelas de core/materialize.py
+SUMMARY_RULE = (
+    "Para IPCA acumulado, médias anuais de PMC/PMS e totais trimestrais de cartões, "
+    "prefira as tabelas `resumo_*`, que já trazem o valor pré-calculado."
+)
+SUMMARY_RULE_FEW_SHOT = "Prefira as tabelas `resumo_*` quando elas já trouxerem o valor pedido."
+
+def _add_rule(prefix: str, rule: str) -> str:
+    """Acrescenta `rule` numerada logo após a última regra do prefixo."""
+    last = list(re.finditer(r"^(\d+)\. .*$", prefix, re.M))[-1]
+    return f"{prefix[:last.end()]}\n{int(last.group(1)) + 1}. {rule}{prefix[last.end():]}"
+
+def format_examples(examples: list[tuple[str, str]]) -> str:
+    """Seção de exemplos (pergunta, SQL) já executados com sucesso."""
+    pares = "\n\n".join(f"Pergunta: {q}\nSQL: {sql}" for q, sql in examples)
+    return f"Exemplos de perguntas já respondidas:\n\n{pares}"
+
+def _table_section(table: str, desc: str) -> str:
+    cols_fmt = "\n".join(f"- {col} ({ctype})" for col, ctype in describe_table(table))
+    return f"Tabela: `{table}`\n📘 Descrição: {desc}\nColunas:\n{indent(cols_fmt, '  ')}"
+
+@lru_cache(maxsize=64)
+def _build_system_prompt_all(
+    tables: tuple[str, ...], db_version: str, aliases_version: str, few_shot: bool = False,
+    summaries: bool = False,
+) -> str:
+    aliases = load_table_aliases()
+    sections = [
+        _table_section(table, aliases.get(table, "Sem descrição disponível"))
+        for table in tables
+    ]
+    prefix = SQL_SYSTEM_PROMPT_FEW_SHOT_PREFIX if few_shot else SQL_SYSTEM_PROMPT_PREFIX
+    if summaries:
+        prefix = _add_rule(prefix, SUMMARY_RULE_FEW_SHOT if few_shot else SUMMARY_RULE)
+    return "\n\n".join([prefix, *sections, SQL_SYSTEM_PROMPT_SUFFIX])
+
+def make_system_prompt_all(
+    tables: list[str] | None = None, examples: list[tuple[str, str]] | None = None
+) -> str:
+    """Prompt de geração de SQL; `tables` restringe o esquema às tabelas informadas.
+
+    O resultado é memorizado e só é refeito quando o banco ou o YAML mudam.
+    As tabelas seguem sempre a ordem do banco, então o mesmo conjunto gera
+    sempre os mesmos bytes. Com `examples`, as regras genéricas dão lugar à
+    versão curta e os exemplos entram no fim, antes da instrução final.
+    A regra das tabelas `resumo_*` só aparece se o banco as tiver; ela depende
+    do banco inteiro, não das tabelas selecionadas, para o prefixo não mudar.
+    """
+    all_tables = list_tables()
+    summaries = any(t.startswith("resumo_") for t in all_tables)
+    if tables is not None:
+        wanted = set(tables)
+        all_tables = [t for t in all_tables if t in wanted]
+    prompt = _build_system_prompt_all(
+        tuple(all_tables), data_version(DB_PATH), data_version(TABLE_ALIASES_PATH), bool(examples), summaries
+    )
+    if not examples:
+        return prompt
+    body = prompt[: -len(SQL_SYSTEM_PROMPT_SUFFIX)]
+    return f"{body}{format_examples(examples)}\n\n{SQL_SYSTEM_PROMPT_SUFFIX}"
 
-    return prompt.strip()
+make_system_prompt_all.cache_clear = _build_system_prompt_all.cache_clear
 
 # Prompt fixo para interpretação
 INTERPRET_SYSTEM_PROMPT = "Você interpreta resultados numéricos e responde em linguagem natural clara e formal."
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import pickle
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from config.config import DB_MEMORY, RESULT_CACHE_MAX_BYTES
+from core import metrics
+from core.connection import get_replica, readonly_uri
+from core.utils import DB_PATH, data_version
+
+if TYPE_CHECKING:
+    from core.database import QueryResult
+
+logger = logging.getLogger(__name__)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_TOKEN = re.compile(
+    r"""
+    '(?:[^']|'')*'                              # texto
+    |"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]          # identificador entre aspas
+    |(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?(?!\w)  # número
+    |\w+
+    |<>|!=|==|<=|>=|\|\||\S
+    """,
+    re.X,
+)
+_NUMBER = re.compile(r"(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?")
+_PLAIN_IDENTIFIER = re.compile(r"^\w+$")
+_OPERATORS = {"==": "=", "!=": "<>"}
+# Palavras que podem vir logo após a tabela e, portanto, não são apelidos
+_CLAUSES = {
+    "where", "join", "inner", "left", "right", "full", "cross", "natural", "outer", "on", "using",
+    "group", "order", "limit", "union", "except", "intersect", "having", "window", "as",
+}
+
+
+def _fold(token: str) -> str:
+    # O SQLite só ignora a caixa em letras ASCII
+    return "".join(c.lower() if c.isascii() else c for c in token)
+
+
+def _canonical_token(token: str) -> str:
+    if token[0] == "'":
+        return token
+    if token[0] in "\"`[":
+        inner = token[1:-1]
+        return _fold(inner) if _PLAIN_IDENTIFIER.match(inner) else token
+    if _NUMBER.fullmatch(token):
+        return str(int(token)) if token.isdigit() else repr(float(token))
+    return _OPERATORS.get(token, _fold(token))
+
+
+def _rename_table_aliases(tokens: list[str]) -> list[str]:
+    """Troca os apelidos de tabela (`FROM t AS x`, `x.col`) por t1, t2... e tira o AS.
+
+    Apelidos que nunca aparecem qualificando uma coluna são removidos.
+    """
+    aliases: dict[str, str] = {}
+    definitions: set[int] = set()
+    out: list[str] = []
+    i = 0
+    while i < len(tokens):
+        out.append(tokens[i])
+        if tokens[i] in ("from", "join") and i + 1 < len(tokens) and tokens[i + 1] != "(":
+            out.append(tokens[i + 1])
+            j = i + 2
+            if j < len(tokens) and tokens[j] == "as":
+                j += 1
+            if j < len(tokens) and _PLAIN_IDENTIFIER.match(tokens[j]) and tokens[j] not in _CLAUSES:
+                aliases.setdefault(tokens[j], "")
+                definitions.add(len(out))
+                out.append(tokens[j])
+                i = j + 1
+                continue
+            i += 2
+            continue
+        i += 1
+    used = {t for k, t in enumerate(out[:-1]) if t in aliases and out[k + 1] == "." and k not in definitions}
+    renamed = {alias: f"t{n}" for n, alias in enumerate((a for a in aliases if a in used), 1)}
+    canonical = []
+    for k, t in enumerate(out):
+        if k in definitions:
+            if t in renamed:
+                canonical.append(renamed[t])
+        elif t in renamed and k + 1 < len(out) and out[k + 1] == ".":
+            canonical.append(renamed[t])
+        else:
+            canonical.append(t)
+    return canonical
+
+
+def canonical_sql(sql: str) -> str:
+    """Forma canônica da SQL: sem comentários nem `;` final, espaços e caixa
+    normalizados, números e identificadores entre aspas reescritos e apelidos
+    de tabela renomeados. Consultas que só diferem nisso têm a mesma forma."""
+    tokens = [_canonical_token(t) for t in _TOKEN.findall(_COMMENTS.sub(" ", sql))]
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(_rename_table_aliases(tokens))
+
+
+def make_key(sql: str) -> str:
+    return hashlib.sha256(canonical_sql(sql).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU em memória, limitado em bytes, dos resultados de consulta por SQL canônica.
+
+    Cada entrada guarda também a interpretação gerada para aquele resultado,
+    para que um resultado idêntico não volte ao modelo. Tudo é descartado
+    quando o banco muda: a versão combina mtime/tamanho do arquivo com o
+    `PRAGMA data_version` de uma conexão própria (que percebe commits ainda no
+    WAL) ou, com a réplica em memória, a geração da réplica.
+    """
+
+    def __init__(self, source_path: str | Path = DB_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.source_path = Path(source_path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # chave -> (resultado, bytes das linhas, interpretação, bytes totais)
+        self._entries: OrderedDict[str, tuple[QueryResult, int, str | None, int]] = OrderedDict()
+        self._bytes = 0
+        self._version: str | None = None
+        self._lock = threading.Lock()
+        self._probe: sqlite3.Connection | None = None
+        self._file_version: str | None = None
+
+    def _pragma_version(self, file_version: str) -> int:
+        if file_version != self._file_version and self._probe is not None:
+            # Arquivo trocado: a conexão antiga ainda enxergaria o anterior
+            self._probe.close()
+            self._probe = None
+        self._file_version = file_version
+        try:
+            if self._probe is None:
+                self._probe = sqlite3.connect(
+                    readonly_uri(self.source_path, immutable=False), uri=True, check_same_thread=False
+                )
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return -1
+
+    def _current_version(self) -> str:
+        if DB_MEMORY:
+            version = f"memoria:{get_replica(self.source_path).current()[0]}"
+        else:
+            file_version = data_version(self.source_path)
+            version = f"{file_version}:{self._pragma_version(file_version)}"
+        if version != self._version:
+            if self._version is not None and self._entries:
+                logger.info("[CACHE RESULTADOS] Banco de dados alterado; descartando resultados.")
+            self._version = version
+            self._entries.clear()
+            self._bytes = 0
+        return version
+
+    def get(self, sql: str) -> QueryResult | None:
+        key = make_key(sql)
+        with self._lock:
+            self._current_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.incr("cache_resultado_falha_total")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics.incr("cache_resultado_acerto_total")
+        return entry[0]
+
+    def set(self, sql: str, result: QueryResult):
+        size = len(pickle.dumps(result.rows, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        key = make_key(sql)
+        with self._lock:
+            self._current_version()
+            self._store(key, result, size, None)
+
+    def _store(self, key: str, result: QueryResult, size: int, interpretation: str | None):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[3]
+        total = size + len((interpretation or "").encode("utf-8"))
+        self._entries[key] = (result, size, interpretation, total)
+        self._bytes += total
+        while self._bytes > self.max_bytes:
+            _, (*_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def interpretation(self, sql: str) -> str | None:
+        """Interpretação já gerada para o resultado desta SQL, se houver."""
+        key = make_key(sql)
+        with self._lock:
+            self._current_version()
+            entry = self._entries.get(key)
+        return entry[2] if entry is not None else None
+
+    def set_interpretation(self, sql: str, text: str):
+        """Associa a interpretação ao resultado em cache (se ele ainda estiver lá)."""
+        key = make_key(sql)
+        with self._lock:
+            self._current_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._store(key, entry[0], entry[1], text)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entries), "bytes": self._bytes}
+
+
+_result_cache_inst: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache_inst
+    if _result_cache_inst is None:
+        _result_cache_inst = ResultCache()
+    return _result_cache_inst
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+import sqlite3
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+from config.config import SCHEMA_TOP_K, SCHEMA_MIN_SCORE
+from core.connection import get_connection
+from core.utils import DB_PATH, data_version, describe_table, list_tables
+
+logger = logging.getLogger(__name__)
+
+# Colunas de texto com até este número de valores distintos entram no índice
+MAX_CATEGORICAL_VALUES = 60
+
+# Tabelas com pontuação abaixo desta fração da melhor são descartadas
+RELATIVE_CUTOFF = 0.3
+
+_PERIOD_COLUMN = re.compile(r"^(per[ií]odo|trimestre)$", re.I)
+
+_STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "um", "uma", "para", "por", "com", "qual", "quais", "quanto",
+    "quantos", "quantas", "foi", "foram", "me", "mostre", "se", "que", "ao",
+    "nota", "use", "tabela", "tabelas", "dados", "sobre", "entre", "mais", "menos",
+}
+
+# Vocabulário do domínio que não aparece nos nomes das tabelas
+_FAMILY_TERMS = {
+    "ipca": "ipca inflacao precos consumidor",
+    "pmc": "pmc comercio varejo vendas receita",
+    "pms": "pms servicos volume",
+    "pnadc": "pnad emprego trabalho mercado",
+    "transacaoCartao": "cartao cartoes bandeira credito debito transacoes",
+    # Banco normalizado (core/etl.py)
+    "indicadores": "ipca inflacao precos pmc comercio varejo vendas pms servicos pnad emprego",
+    "dim_serie": "series catalogo pesquisas",
+    # Resumos pré-calculados (core/materialize.py)
+    "resumo_ipca": "ipca inflacao precos consumidor acumulado ano 12 meses",
+    "resumo_media": "pmc comercio varejo vendas pms servicos media anual ano",
+    "resumo_cartao": "cartao cartoes bandeira credito debito transacoes trimestre trimestral total",
+}
+
+
+def fold(text: str) -> str:
+    """Remove acentos e converte para minúsculas."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str, keep: frozenset[str] = frozenset()) -> list[str]:
+    """Palavras da busca, sem acentos e stopwords; as de `keep` ficam mesmo sendo stopwords."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [
+        t for t in re.findall(r"[a-z0-9]+", fold(text))
+        if (t in keep or t not in _STOPWORDS) and (len(t) > 1 or t.isdigit())
+    ]
+
+
+class TfidfIndex:
+    """Índice TF-IDF simples com similaridade do cosseno.
+
+    Com `unknown_terms=True`, termos da consulta ausentes de todos os
+    documentos entram na norma com o maior idf possível: uma palavra a mais na
+    consulta baixa a similaridade em vez de ser ignorada.
+    """
+
+    def __init__(self, docs: dict[str, str], unknown_terms: bool = False, tokenizer=tokenize):
+        self.names = list(docs)
+        self.tokenizer = tokenizer
+        counts = {name: Counter(tokenizer(text)) for name, text in docs.items()}
+        df = Counter(term for c in counts.values() for term in c)
+        n = len(docs)
+        self.idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+        self.unknown_idf = math.log(1 + n) + 1 if unknown_terms else None
+        self.vectors = {name: self._weigh(c) for name, c in counts.items()}
+
+    def _weigh(self, counts: Counter) -> dict[str, float]:
+        vec = {}
+        for term, tf in counts.items():
+            idf = self.idf.get(term, self.unknown_idf)
+            if idf is not None:
+                vec[term] = (1 + math.log(tf)) * idf
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {term: w / norm for term, w in vec.items()}
+
+    def rank(self, query: str) -> list[tuple[str, float]]:
+        q = self._weigh(Counter(self.tokenizer(query)))
+        scores = [
+            (name, sum(w * self.vectors[name].get(term, 0.0) for term, w in q.items()))
+            for name in self.names
+        ]
+        return sorted(scores, key=lambda s: (-s[1], s[0]))
+
+
+def _categorical_values(conn: sqlite3.Connection, table: str) -> list[str]:
+    values = []
+    for col, ctype in describe_table(table):
+        if ctype != "TEXT" or _PERIOD_COLUMN.match(col):
+            continue
+        rows = conn.execute(
+            f'SELECT DISTINCT "{col}" FROM "{table}" LIMIT {MAX_CATEGORICAL_VALUES + 1}'
+        ).fetchall()
+        if len(rows) <= MAX_CATEGORICAL_VALUES:
+            values.extend(str(r[0]) for r in rows if r[0] is not None)
+    return values
+
+
+def table_document(conn: sqlite3.Connection, table: str, description: str) -> str:
+    family = next((terms for prefix, terms in _FAMILY_TERMS.items() if table.startswith(prefix)), "")
+    columns = " ".join(col for col, _ in describe_table(table))
+    values = " ".join(_categorical_values(conn, table))
+    # Nome e descrição pesam mais que os valores das colunas
+    return " ".join([table] * 3 + [description] * 2 + [family, columns, values])
+
+
+@lru_cache(maxsize=4)
+def _build_index(version: str) -> TfidfIndex:
+    from core.prompts import load_table_aliases
+
+    aliases = load_table_aliases()
+    conn = get_connection(DB_PATH)
+    docs = {t: table_document(conn, t, aliases.get(t, "")) for t in list_tables()}
+    logger.info(f"[RETRIEVAL] Índice de esquema criado com {len(docs)} tabelas.")
+    return TfidfIndex(docs)
+
+
+def get_schema_index() -> TfidfIndex:
+    return _build_index(data_version(DB_PATH))
+
+
+def rank_tables(question: str) -> list[tuple[str, float]]:
+    return get_schema_index().rank(question)
+
+
+def select_tables(
+    question: str, k: int = SCHEMA_TOP_K, min_score: float = SCHEMA_MIN_SCORE
+) -> list[str] | None:
+    """Retorna as k tabelas mais relevantes, ou None para usar o esquema completo."""
+    if k <= 0:
+        return None
+    ranked = rank_tables(question)
+    if not ranked or ranked[0][1] < min_score:
+        logger.info("[RETRIEVAL] Confiança baixa; usando o esquema completo.")
+        return None
+    cutoff = ranked[0][1] * RELATIVE_CUTOFF
+    selected = [name for name, score in ranked[:k] if score >= cutoff]
+    logger.info(f"[RETRIEVAL] Tabelas selecionadas: {selected}")
+    return selected
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from config.config import TRACE_LOG
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    nome: str
+    inicio_ms: float
+    duracao_ms: float
+    atributos: dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    """Etapas de uma requisição ao motor, com duração e atributos de cada uma."""
+
+    def __init__(self, pergunta: str):
+        self.pergunta = pergunta
+        self.inicio = time.perf_counter()
+        self.spans: list[Span] = []
+        self.atributos: dict[str, Any] = {}
+        self.total_ms: float | None = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def etapas(self) -> dict[str, float]:
+        """Duração somada por etapa, na ordem em que apareceram."""
+        with self._lock:
+            spans = list(self.spans)
+        etapas: dict[str, float] = {}
+        for s in spans:
+            etapas[s.nome] = round(etapas.get(s.nome, 0.0) + s.duracao_ms, 3)
+        return etapas
+
+    def total(self, attr: str) -> float:
+        with self._lock:
+            return sum(s.atributos.get(attr, 0) for s in self.spans)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [
+                {"etapa": s.nome, "inicio_ms": round(s.inicio_ms, 3), "duracao_ms": round(s.duracao_ms, 3), **s.atributos}
+                for s in self.spans
+            ]
+        return {
+            "pergunta": self.pergunta,
+            **self.atributos,
+            "total_ms": round(self.total_ms, 3) if self.total_ms is not None else None,
+            "etapas": self.etapas(),
+            "tokens_prompt": self.total("tokens_prompt"),
+            "tokens_saida": self.total("tokens_saida"),
+            "spans": spans,
+        }
+
+
+_current: ContextVar[Trace | None] = ContextVar("hubia_trace", default=None)
+
+
+def start_trace(pergunta: str) -> Trace:
+    """Abre o rastreamento da requisição no contexto atual (tarefa ou thread)."""
+    trace = Trace(pergunta)
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(nome: str, trace: Trace | None = None, **atributos: Any) -> Iterator[dict[str, Any]]:
+    """Mede o bloco como a etapa `nome`; o dicionário entregue recebe atributos extras.
+
+    A duração vai para o histograma `etapa_ms` mesmo sem rastreamento ativo.
+    """
+    trace = trace or _current.get()
+    inicio = time.perf_counter()
+    try:
+        yield atributos
+    finally:
+        fim = time.perf_counter()
+        duracao = (fim - inicio) * 1000
+        metrics.observe("etapa_ms", duracao, etapa=nome)
+        if trace is not None:
+            trace.add(Span(nome, (inicio - trace.inicio) * 1000, duracao, atributos))
+
+
+def finish_trace(trace: Trace, **atributos: Any) -> Trace:
+    """Fecha a requisição: registra o total no histograma e emite a linha de log estruturada."""
+    trace.total_ms = (time.perf_counter() - trace.inicio) * 1000
+    trace.atributos.update(atributos)
+    metrics.observe("requisicao_ms", trace.total_ms, origem=atributos.get("origem", ""))
+    if TRACE_LOG:
+        resumo = trace.to_dict()
+        resumo.pop("spans")
+        logger.info(f"[REQUISIÇÃO] {json.dumps(resumo, ensure_ascii=False)}")
+    return trace
@@ -3,10 +3,13 @@ from __future__ import annotations
 import os
 import re
 import sqlite3
+import unicodedata
 from functools import lru_cache
 from pathlib import Path
 from typing import List, Tuple
 
+from core.connection import get_connection
+
 SQL_CODE_BLOCK = re.compile(r"```sql(.*?)```", re.S | re.I)
 
 @lru_cache(maxsize=128)
@@ -14,25 +17,76 @@ def strip_sql_markup(text: str) -> str:
     m = SQL_CODE_BLOCK.search(text)
     return (m.group(1) if m else text).strip()
 
+# A existência do arquivo só é conferida ao abrir a conexão (core/connection.py)
 DB_PATH = Path(os.getenv("HUBIA_DB", "fecomdb.db"))
-if not DB_PATH.exists():
-    raise FileNotFoundError(
-        f"Banco de dados não encontrado em: {DB_PATH.resolve()}\n"
-        f"Dica: defina a variável de ambiente HUBIA_DB com o caminho correto."
-    )
 
-@lru_cache(maxsize=32)
+def data_version(path: str | Path) -> str:
+    """Identifica a versão de um arquivo pelo mtime e tamanho."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "ausente"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa do número de tokens de um prompt (palavras e pontuação)."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def ascii_name(name: str) -> str:
+    """Nome sem acentos e em minúsculas, para comparar colunas e montar identificadores."""
+    name = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in name if not unicodedata.combining(c)).lower()
+
+def table_names(conn: sqlite3.Connection) -> list[str]:
+    """Tabelas da conexão, na ordem de criação (sem as internas do SQLite)."""
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    )]
+
+def column_names(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+# Os caches de esquema são indexados pelo caminho e pela versão do banco,
+# para que uma troca de arquivo ou alteração no esquema os invalide.
+@lru_cache(maxsize=128)
+def _describe_table(db_path: str, version: str, table: str) -> List[Tuple[str, str]]:
+    rows = get_connection(db_path).execute(f'PRAGMA table_info("{table}");').fetchall()
+    return [(r[1], r[2].upper()) for r in rows]
+
+# Relações listadas nesta tabela (criada por core/etl.py) ficam fora do
+# esquema exposto ao modelo, mas continuam válidas nas consultas.
+HIDDEN_RELATIONS_TABLE = "hubia_oculto"
+
+@lru_cache(maxsize=8)
+def _list_relations(db_path: str, version: str) -> List[str]:
+    rows = get_connection(db_path).execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+        "AND name NOT LIKE 'sqlite_%' AND name != ? ORDER BY rowid;",
+        (HIDDEN_RELATIONS_TABLE,),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+@lru_cache(maxsize=8)
+def _list_tables(db_path: str, version: str) -> List[str]:
+    conn = get_connection(db_path)
+    hidden = set()
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (HIDDEN_RELATIONS_TABLE,)).fetchone():
+        hidden = {r[0] for r in conn.execute(f'SELECT nome FROM "{HIDDEN_RELATIONS_TABLE}"')}
+    return [t for t in _list_relations(db_path, version) if t not in hidden]
+
 def describe_table(table: str) -> List[Tuple[str, str]]:
     if not re.fullmatch(r"[\w\d_]+", table):
         raise ValueError(f"Nome de tabela inválido: {table}")
-    with sqlite3.connect(str(DB_PATH)) as conn:
-        rows = conn.execute(f'PRAGMA table_info("{table}");').fetchall()
-    return [(r[1], r[2].upper()) for r in rows]
+    return _describe_table(str(DB_PATH), data_version(DB_PATH), table)
 
-@lru_cache(maxsize=8)
 def list_tables() -> List[str]:
-    with sqlite3.connect(str(DB_PATH)) as conn:
-        rows = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-        ).fetchall()
-    return [r[0] for r in rows]
+    """Tabelas e views expostas no prompt (sem as relações ocultas)."""
+    return _list_tables(str(DB_PATH), data_version(DB_PATH))
+
+def list_relations() -> List[str]:
+    """Todas as tabelas e views do banco, inclusive as ocultas."""
+    return _list_relations(str(DB_PATH), data_version(DB_PATH))
+
+describe_table.cache_clear = _describe_table.cache_clear
+list_tables.cache_clear = _list_tables.cache_clear
+list_relations.cache_clear = _list_relations.cache_clear
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from core.connection import get_connection
+from core.utils import DB_PATH, data_version
+
+# Ações do autorizador permitidas numa consulta somente leitura
+_ALLOWED = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+_ACTION_NAMES = {
+    sqlite3.SQLITE_INSERT: "INSERT",
+    sqlite3.SQLITE_UPDATE: "UPDATE",
+    sqlite3.SQLITE_DELETE: "DELETE",
+    sqlite3.SQLITE_CREATE_TABLE: "CREATE TABLE",
+    sqlite3.SQLITE_CREATE_TEMP_TABLE: "CREATE TEMP TABLE",
+    sqlite3.SQLITE_CREATE_INDEX: "CREATE INDEX",
+    sqlite3.SQLITE_CREATE_VIEW: "CREATE VIEW",
+    sqlite3.SQLITE_CREATE_TRIGGER: "CREATE TRIGGER",
+    sqlite3.SQLITE_DROP_TABLE: "DROP TABLE",
+    sqlite3.SQLITE_DROP_INDEX: "DROP INDEX",
+    sqlite3.SQLITE_DROP_VIEW: "DROP VIEW",
+    sqlite3.SQLITE_DROP_TRIGGER: "DROP TRIGGER",
+    sqlite3.SQLITE_ALTER_TABLE: "ALTER TABLE",
+    sqlite3.SQLITE_PRAGMA: "PRAGMA",
+    sqlite3.SQLITE_ATTACH: "ATTACH",
+    sqlite3.SQLITE_DETACH: "DETACH",
+    sqlite3.SQLITE_TRANSACTION: "TRANSACTION",
+    sqlite3.SQLITE_ANALYZE: "ANALYZE",
+    sqlite3.SQLITE_REINDEX: "REINDEX",
+}
+
+_NO_SUCH_COLUMN = re.compile(r"no such column: (\S+)")
+_NO_SUCH_TABLE = re.compile(r"no such table: (?:\w+\.)?(\S+)")
+
+
+def clean_query_output(sql: str) -> str:
+    lines = sql.strip().splitlines()
+    cleaned = [line for line in lines if not line.lower().startswith(("ai:", "resposta:", "sql:"))]
+    return "\n".join(cleaned).strip()
+
+
+def is_valid_sql_structure(sql: str) -> bool:
+    sql = sql.strip().lower()
+    return sql.startswith("select") or sql.startswith("with")
+
+
+@dataclass
+class ValidationResult:
+    """O que a consulta lê e, se a preparação falhou, por quê."""
+
+    tables: set[str] = field(default_factory=set)
+    columns: set[tuple[str, str]] = field(default_factory=set)
+    unknown_columns: list[str] = field(default_factory=list)
+    unknown_tables: list[str] = field(default_factory=list)
+    denied: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def unknown_names(self) -> list[str]:
+        """Identificadores desconhecidos, sem o qualificador de tabela."""
+        return [c.split(".")[-1] for c in self.unknown_columns] + self.unknown_tables
+
+
+@lru_cache(maxsize=8)
+def _views(db_path: str, version: str) -> frozenset[str]:
+    rows = get_connection(db_path).execute("SELECT name FROM sqlite_master WHERE type = 'view'")
+    return frozenset(r[0] for r in rows)
+
+
+def validate_sql(sql: str, conn: sqlite3.Connection | None = None, views: frozenset[str] | None = None) -> ValidationResult:
+    """Prepara a consulta no banco real e registra cada tabela e coluna lida.
+
+    A preparação (via EXPLAIN, sem executar) passa pelo autorizador do SQLite:
+    leituras são coletadas e qualquer escrita, PRAGMA ou ATTACH é negado.
+    Leituras feitas por dentro de views não contam como referências da consulta.
+    """
+    if conn is None:
+        conn = get_connection(DB_PATH)
+        views = _views(str(DB_PATH), data_version(DB_PATH))
+    views = views or frozenset()
+    result = ValidationResult()
+
+    def authorizer(action, arg1, arg2, dbname, source):
+        if action == sqlite3.SQLITE_READ:
+            if arg2 and not arg1.startswith("sqlite_") and source not in views:
+                result.tables.add(arg1)
+                result.columns.add((arg1, arg2))
+            return sqlite3.SQLITE_OK
+        if action in _ALLOWED:
+            return sqlite3.SQLITE_OK
+        result.denied.append(_ACTION_NAMES.get(action, f"ação {action}"))
+        return sqlite3.SQLITE_DENY
+
+    conn.set_authorizer(authorizer)
+    try:
+        conn.execute(f"EXPLAIN {sql.strip()}")
+    except sqlite3.Error as e:
+        result.error = str(e)
+        if m := _NO_SUCH_COLUMN.match(result.error):
+            result.unknown_columns.append(m.group(1))
+        elif m := _NO_SUCH_TABLE.match(result.error):
+            result.unknown_tables.append(m.group(1))
+    finally:
+        conn.set_authorizer(None)
+    return result
+
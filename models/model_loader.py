@@ -1,9 +1,195 @@
-from config.config import OLLAMA_MODEL
-import ollama  # ou qualquer lib de interface
+"""Modelo no Ollama: opções vindas da configuração, aquecimento e prontidão.
 
-def load_model():
+O cliente (`LazyLLM`) só é construído no primeiro uso. `ModelManager` carrega
+o modelo no Ollama antes da primeira pergunta e o mantém carregado enquanto
+o app está ocioso, além de informar à interface se ele já está pronto.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Any
+
+from config.config import (
+    MODEL_KEEP_ALIVE,
+    MODEL_NUM_CTX,
+    MODEL_NUM_PREDICT,
+    MODEL_NUM_THREAD,
+    MODEL_WARMUP_INTERVAL,
+    OLLAMA_HOST,
+    OLLAMA_MODEL,
+)
+from core.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# `estimate_tokens` conta palavras e pontuação; o tokenizador do modelo gera mais
+TOKENS_PER_ESTIMATE = 1.5
+# Folga para a pergunta e as dicas acrescentadas a ela
+QUESTION_MARGIN = 256
+DEFAULT_NUM_CTX = 4096
+
+# Estados de `ModelManager`
+COLD, LOADING, READY, FAILED = "frio", "carregando", "pronto", "erro"
+
+
+@lru_cache(maxsize=1)
+def context_size() -> int:
+    """`num_ctx` para o maior prompt de SQL (todas as tabelas) mais a saída máxima.
+
+    Um valor fixo por processo: mudar o `num_ctx` entre chamadas faz o Ollama
+    recarregar o modelo.
+    """
+    if MODEL_NUM_CTX > 0:
+        return MODEL_NUM_CTX
     try:
-        return ollama.Chat(model=OLLAMA_MODEL)
+        from core.prompts import make_system_prompt_all
+
+        prompt = estimate_tokens(make_system_prompt_all())
     except Exception as e:
-        print(f"Erro ao carregar modelo: {e}")
-        return None
+        logger.warning(f"[MODELO] Não foi possível medir o prompt ({e}); usando num_ctx={DEFAULT_NUM_CTX}.")
+        return DEFAULT_NUM_CTX
+    needed = prompt * TOKENS_PER_ESTIMATE + QUESTION_MARGIN + max(MODEL_NUM_PREDICT, 0)
+    return max(2048, math.ceil(needed / 1024) * 1024)
+
+
+def _keep_alive() -> int | str:
+    # Segundos vão como número; durações ("30m") como texto
+    value = MODEL_KEEP_ALIVE.strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def model_options(model: str = OLLAMA_MODEL) -> dict[str, Any]:
+    """Parâmetros do cliente do Ollama; zero em `num_thread`/`num_predict` deixa o padrão do servidor."""
+    options: dict[str, Any] = {"model": model, "keep_alive": _keep_alive(), "num_ctx": context_size()}
+    if MODEL_NUM_THREAD > 0:
+        options["num_thread"] = MODEL_NUM_THREAD
+    if MODEL_NUM_PREDICT > 0:
+        options["num_predict"] = MODEL_NUM_PREDICT
+    if OLLAMA_HOST:
+        options["base_url"] = OLLAMA_HOST
+    return options
+
+
+class LazyLLM:
+    """Cliente `OllamaLLM` criado no primeiro uso.
+
+    Importar quem o declara não carrega a LangChain nem o cliente HTTP; isso
+    só acontece na primeira chamada ao modelo.
+    """
+
+    def __init__(self, model: str = OLLAMA_MODEL):
+        self.model = model
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from langchain_ollama import OllamaLLM
+
+                    self._client = OllamaLLM(**model_options(self.model))
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+
+class ModelManager:
+    """Aquece o modelo no Ollama e acompanha se ele está pronto.
+
+    O aquecimento é uma geração com prompt vazio, que só carrega o modelo na
+    memória com o mesmo `num_ctx` das chamadas reais. `start()` aquece numa
+    thread de fundo e repete a cada `interval` segundos sem uso, renovando o
+    `keep_alive`. Cada chamada bem-sucedida ao modelo marca-o como pronto.
+    """
+
+    def __init__(self, model: str = OLLAMA_MODEL, interval: float = MODEL_WARMUP_INTERVAL):
+        self.model = model
+        self.interval = interval
+        self.state = COLD
+        self.error: str | None = None
+        self.load_ms: float | None = None
+        self.last_use = 0.0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def _generate_empty(self):
+        import ollama
+
+        options = model_options(self.model)
+        client = ollama.Client(host=options.pop("base_url", None))
+        client.generate(
+            model=options.pop("model"), prompt="", keep_alive=options.pop("keep_alive"), options=options,
+        )
+
+    def warm(self) -> bool:
+        """Carrega o modelo no Ollama; retorna se ele ficou pronto."""
+        with self._lock:
+            if self.state != READY:
+                self.state = LOADING
+        inicio = time.perf_counter()
+        try:
+            self._generate_empty()
+        except Exception as e:
+            with self._lock:
+                self.state, self.error = FAILED, str(e)
+            self._ready.clear()
+            logger.warning(f"[MODELO] Falha ao carregar {self.model}: {e}")
+            return False
+        self.load_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        self.mark_used()
+        logger.info(f"[MODELO] {self.model} pronto ({self.load_ms} ms).")
+        return True
+
+    def mark_used(self):
+        with self._lock:
+            self.state, self.error = READY, None
+            self.last_use = time.monotonic()
+        self._ready.set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def start(self):
+        """Inicia o aquecimento em segundo plano (chamadas repetidas não têm efeito)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"hubia-aquecimento-{self.model}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self.warm()
+        while self.interval > 0 and not self._stop.wait(self.interval):
+            if self.state != READY or time.monotonic() - self.last_use >= self.interval:
+                self.warm()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {"modelo": self.model, "estado": self.state, "carga_ms": self.load_ms, "erro": self.error}
+
+
+_managers: dict[str, ModelManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_model_manager(model: str = OLLAMA_MODEL) -> ModelManager:
+    with _managers_lock:
+        manager = _managers.get(model)
+        if manager is None:
+            manager = _managers[model] = ModelManager(model)
+        return manager
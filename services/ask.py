@@ -1,4 +1,142 @@
-from core.engine import auto_generate_and_run_query
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from core.cache import make_key
+from core.engine import auto_generate_and_run_query, auto_generate_and_run_query_async
+
 
 def process_query(pergunta: str) -> dict:
     return auto_generate_and_run_query(pergunta)
+
+
+def load_questions(path: str | Path) -> list[str]:
+    """Lê perguntas de um .txt (uma por linha, `#` comenta) ou de um .jsonl com o campo "pergunta"."""
+    path = Path(path)
+    questions = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            questions.append(json.loads(line)["pergunta"] if path.suffix == ".jsonl" else line)
+    return questions
+
+
+def load_completed(output_path: str | Path) -> set[str]:
+    """Chaves das perguntas já respondidas com sucesso em `output_path`.
+
+    Uma última linha incompleta (queda no meio da escrita) é descartada do arquivo.
+    """
+    output_path = Path(output_path)
+    if not output_path.exists():
+        return set()
+    valid, done = [], set()
+    for line in output_path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        valid.append(line)
+        if "erro" not in record:
+            done.add(make_key(record["pergunta"]))
+    output_path.write_text("".join(f"{line}\n" for line in valid), encoding="utf-8")
+    return done
+
+
+def _serializable(resultado):
+    if hasattr(resultado, "to_dict"):
+        return resultado.to_dict()
+    return resultado if isinstance(resultado, (str, int, float, list, dict)) or resultado is None else str(resultado)
+
+
+async def _answer(pergunta: str, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        inicio = time.perf_counter()
+        try:
+            resposta = await auto_generate_and_run_query_async(pergunta)
+            record = {
+                "pergunta": pergunta,
+                "sql": resposta["sql"],
+                "resultado": _serializable(resposta["resultado"]),
+                "interpretacao": resposta["interpretacao"],
+                "origem": resposta.get("origem"),
+            }
+            if resposta.get("telemetria") is not None:
+                record["etapas_ms"] = resposta["telemetria"].etapas()
+        except Exception as e:
+            record = {"pergunta": pergunta, "erro": str(e)}
+        record["duracao_s"] = round(time.perf_counter() - inicio, 3)
+        return record
+
+
+async def _run_batch(questions: list[str], output_path: Path, workers: int) -> Counter:
+    slots = asyncio.Semaphore(workers)
+    stats = Counter()
+    with output_path.open("a", encoding="utf-8") as out:
+        for task in asyncio.as_completed([_answer(q, slots) for q in questions]):
+            record = await task
+            # Cada resposta é gravada assim que fica pronta
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            stats["erros" if "erro" in record else "respondidas"] += 1
+            if "origem" in record:
+                stats[f"origem_{record['origem']}"] += 1
+    return stats
+
+
+def process_batch(input_path: str | Path, output_path: str | Path, workers: int = 4) -> dict:
+    """Responde um arquivo de perguntas e grava os resultados em JSONL.
+
+    Perguntas iguais após a normalização são respondidas uma vez só e as já
+    presentes em `output_path` são puladas, o que permite retomar um lote.
+    """
+    output_path = Path(output_path)
+    questions = load_questions(input_path)
+    done = load_completed(output_path)
+
+    pending, seen = [], set()
+    retomadas = duplicadas = 0
+    for q in questions:
+        key = make_key(q)
+        if key in done:
+            retomadas += 1
+        elif key in seen:
+            duplicadas += 1
+        else:
+            seen.add(key)
+            pending.append(q)
+
+    inicio = time.perf_counter()
+    stats = asyncio.run(_run_batch(pending, output_path, workers)) if pending else Counter()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "total": len(questions),
+        "retomadas": retomadas,
+        "duplicadas": duplicadas,
+        "processadas": len(pending),
+        **stats,
+        "duracao_s": round(duracao, 2),
+        "perguntas_por_s": round(len(pending) / duracao, 2) if duracao and pending else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Responde um lote de perguntas e grava os resultados em JSONL.")
+    parser.add_argument("entrada", help="arquivo .txt (uma pergunta por linha) ou .jsonl")
+    parser.add_argument("-o", "--saida", default="respostas.jsonl", help="arquivo JSONL de saída")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="perguntas processadas em paralelo")
+    args = parser.parse_args(argv)
+
+    resumo = process_batch(args.entrada, args.saida, args.workers)
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import json
+from unittest.mock import patch
+
+from services.ask import load_completed, process_batch
+
+
+async def fake_engine(pergunta):
+    if "erro" in pergunta:
+        raise RuntimeError("falhou")
+    return {"sql": "SELECT 1", "resultado": "[(1,)]", "interpretacao": f"Resposta: {pergunta}", "origem": "llm"}
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_process_batch_deduplica_e_grava_jsonl(tmp_path):
+    entrada = tmp_path / "perguntas.txt"
+    entrada.write_text("Qual a inflação em Recife?\n# comentário\nqual a IPCA em recife?\nCartões por bandeira\n", encoding="utf-8")
+    saida = tmp_path / "respostas.jsonl"
+
+    with patch("services.ask.auto_generate_and_run_query_async", side_effect=fake_engine) as engine:
+        resumo = process_batch(entrada, saida, workers=2)
+
+    assert engine.call_count == 2
+    assert resumo["total"] == 3
+    assert resumo["duplicadas"] == 1
+    assert resumo["respondidas"] == 2
+    registros = read_jsonl(saida)
+    assert {r["pergunta"] for r in registros} == {"Qual a inflação em Recife?", "Cartões por bandeira"}
+    assert all("duracao_s" in r for r in registros)
+
+
+def test_process_batch_retoma_e_refaz_erros(tmp_path):
+    entrada = tmp_path / "perguntas.jsonl"
+    entrada.write_text(
+        "\n".join(json.dumps({"pergunta": q}) for q in ["Pergunta A", "Pergunta B", "Pergunta com erro"]),
+        encoding="utf-8",
+    )
+    saida = tmp_path / "respostas.jsonl"
+    saida.write_text(
+        json.dumps({"pergunta": "Pergunta A", "sql": "SELECT 1"}) + "\n"
+        + json.dumps({"pergunta": "Pergunta com erro", "erro": "falhou"}) + "\n"
+        + '{"pergunta": "Pergunta B", "sq',
+        encoding="utf-8",
+    )
+
+    with patch("services.ask.auto_generate_and_run_query_async", side_effect=fake_engine) as engine:
+        resumo = process_batch(entrada, saida)
+
+    perguntas = sorted(c.args[0] for c in engine.call_args_list)
+    assert perguntas == ["Pergunta B", "Pergunta com erro"]
+    assert resumo["retomadas"] == 1
+    assert resumo["erros"] == 1
+    assert len(read_jsonl(saida)) == 4
+
+
+def test_load_completed_descarta_linha_incompleta(tmp_path):
+    saida = tmp_path / "respostas.jsonl"
+    saida.write_text(json.dumps({"pergunta": "A"}) + "\n{\"pergunta\": \"B", encoding="utf-8")
+    assert len(load_completed(saida)) == 1
+    assert saida.read_text(encoding="utf-8") == json.dumps({"pergunta": "A"}) + "\n"
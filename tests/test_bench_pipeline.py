@@ -0,0 +1,22 @@
+from benchmarks.bench_pipeline import compare, load_cases, run
+
+
+def test_conjunto_de_referencia_roda_sem_ollama():
+    casos = load_cases()
+    relatorio = run(casos, rounds=1, warmup=0, allocations=False)
+    assert sum(relatorio["origens"].values()) == len(casos)
+    assert relatorio["origens"]["llm"] == sum("sql" in c for c in casos)
+    assert {"prompt", "llm_sql", "validacao", "execucao", "narracao"} <= set(relatorio["etapas_ms"])
+    assert relatorio["ponta_a_ponta_ms"]["n"] == len(casos)
+
+
+def test_latencia_simulada_entra_na_etapa_do_modelo():
+    casos = [c for c in load_cases() if "sql" in c][:2]
+    relatorio = run(casos, rounds=1, warmup=0, allocations=False, base_ms=20)
+    assert relatorio["etapas_ms"]["llm_sql"]["p50"] >= 20
+
+
+def test_compare_aponta_regressoes_no_p95():
+    anterior = {"ponta_a_ponta_ms": {"p95": 10.0}, "etapas_ms": {"execucao": {"p95": 1.0}}}
+    atual = {"ponta_a_ponta_ms": {"p95": 10.5}, "etapas_ms": {"execucao": {"p95": 2.0}, "novo": {"p95": 1.0}}}
+    assert compare(atual, anterior, 0.2) == [{"etapa": "execucao", "p95_antes": 1.0, "p95_depois": 2.0, "razao": 2.0}]
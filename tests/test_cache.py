@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+from core.cache import AnswerCache, make_key
+
+RESPOSTA = {
+    "sql": "SELECT * FROM ipca_7060_recife",
+    "resultado": "[('Recife (PE)', 0.63)]",
+    "interpretacao": "O IPCA em Recife foi de 0,63%.",
+    "tabela": "Detectada automaticamente",
+}
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    path = tmp_path / "fonte.db"
+    path.write_bytes(b"v1")
+    return path
+
+
+def make_cache(tmp_path, source_db, **kwargs):
+    return AnswerCache(path=tmp_path / "cache.db", source_path=source_db, **kwargs)
+
+
+def test_make_key_usa_pergunta_normalizada():
+    assert make_key("Qual a inflação em Recife?") == make_key("qual a  IPCA em recife?")
+    assert make_key("IPCA em Recife") != make_key("IPCA no Brasil")
+
+
+def test_cache_hit_em_memoria(tmp_path, source_db):
+    cache = make_cache(tmp_path, source_db)
+    assert cache.get("IPCA em Recife") is None
+    cache.set("IPCA em Recife", RESPOSTA)
+    assert cache.get("IPCA em Recife") == RESPOSTA
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_compartilhado_em_disco(tmp_path, source_db):
+    make_cache(tmp_path, source_db).set("IPCA em Recife", RESPOSTA)
+    outro_worker = make_cache(tmp_path, source_db)
+    assert outro_worker.get("IPCA em Recife") == RESPOSTA
+
+
+def test_cache_expira_pelo_ttl(tmp_path, source_db):
+    cache = make_cache(tmp_path, source_db, ttl=0.01)
+    cache.set("IPCA em Recife", RESPOSTA)
+    time.sleep(0.02)
+    assert cache.get("IPCA em Recife") is None
+
+
+def test_cache_invalida_quando_banco_muda(tmp_path, source_db):
+    cache = make_cache(tmp_path, source_db)
+    cache.set("IPCA em Recife", RESPOSTA)
+    source_db.write_bytes(b"versao 2")
+    os.utime(source_db, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert cache.get("IPCA em Recife") is None
+    assert cache.stats()["entradas_disco"] == 0
+
+
+def test_cache_remove_entradas_antigas_pelo_tamanho(tmp_path, source_db):
+    cache = make_cache(tmp_path, source_db, max_bytes=700)
+    for i in range(5):
+        cache.set(f"pergunta {i}", {**RESPOSTA, "interpretacao": "x" * 200})
+    stats = cache.stats()
+    assert stats["bytes_disco"] <= 700
+    assert stats["entradas_disco"] < 5
+    assert cache.get("pergunta 4") is not None
+    assert cache.get("pergunta 0") is None
@@ -0,0 +1,88 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import llm_agent, metrics
+from core.examples import ExampleStore
+from core.llm_cache import LLMCache
+
+SQL = "SELECT Valor FROM ipca_7060_recife WHERE periodo = '2024-01-01'"
+
+
+def _llm(model: str, saida: str):
+    llm = MagicMock(model=model)
+    llm.invoke.return_value = saida
+    llm.ainvoke = AsyncMock(return_value=saida)
+    llm.stream.return_value = iter([saida])
+    return llm
+
+
+@pytest.fixture
+def modelos(tmp_path):
+    metrics.reset()
+    forte, rapido = _llm("phi4-mini", SQL), _llm("qwen2.5-coder:1.5b", SQL)
+    with patch.object(llm_agent, "_LLM", forte), patch.object(llm_agent, "_FAST_LLM", rapido), \
+         patch.object(llm_agent, "get_llm_cache", return_value=LLMCache(tmp_path / "llm.db", mode="off")), \
+         patch.object(llm_agent, "get_example_store", return_value=ExampleStore(tmp_path / "exemplos.db")):
+        yield forte, rapido
+    metrics.reset()
+
+
+def test_sql_valida_do_modelo_rapido_nao_escala(modelos):
+    forte, rapido = modelos
+
+    assert llm_agent.generate_sql_with_memory("IPCA em Recife em janeiro de 2024") == SQL
+    rapido.invoke.assert_called_once()
+    forte.invoke.assert_not_called()
+    assert metrics.get_counter("cascata_aceita_total") == 1
+
+
+@pytest.mark.parametrize("saida", [
+    "Não sei responder.",
+    "SELECT valor_inexistente FROM ipca_7060_recife",
+    "SELECT * FROM tabela_inexistente",
+])
+def test_sql_invalida_escala_para_o_modelo_principal(modelos, saida):
+    forte, rapido = modelos
+    rapido.ainvoke.return_value = saida
+
+    assert asyncio.run(llm_agent.agenerate_sql_with_memory("IPCA em Recife em janeiro de 2024")) == SQL
+    forte.ainvoke.assert_called_once()
+    assert forte.ainvoke.call_args.args == rapido.ainvoke.call_args.args
+    assert metrics.get_counter("cascata_escalada_total") == 1
+
+
+def test_sem_modelo_rapido_vai_direto_ao_principal(modelos):
+    forte, rapido = modelos
+    with patch.object(llm_agent, "_FAST_LLM", None):
+        llm_agent.generate_sql_with_memory("IPCA em Recife em janeiro de 2024")
+    rapido.invoke.assert_not_called()
+    forte.invoke.assert_called_once()
+
+
+def test_interpretacao_em_modelo_separado(modelos):
+    forte, _ = modelos
+    interpretador = _llm("llama3.2:3b", "O IPCA foi de 0,63%.")
+    with patch.object(llm_agent, "_INTERPRET_LLM", interpretador):
+        assert llm_agent.interpret(SQL, [(0.63,)]) == "O IPCA foi de 0,63%."
+        assert "".join(llm_agent.interpret_stream(SQL, [(0.63,)])) == "O IPCA foi de 0,63%."
+    forte.invoke.assert_not_called()
+    forte.stream.assert_not_called()
+
+
+def test_estatisticas_por_nivel(modelos):
+    _, rapido = modelos
+    metrics.observe("llm_ms", 900, etapa="llm_sql", modelo="phi4-mini")
+    llm_agent.generate_sql_with_memory("IPCA em Recife em janeiro de 2024")
+    rapido.invoke.return_value = "Não sei."
+    llm_agent.generate_sql_with_memory("IPCA em Recife em fevereiro de 2024")
+
+    stats = llm_agent.cascade_stats()
+    assert stats["taxa_escalada"] == 0.5
+    nivel = stats["niveis"]["rapido"]
+    assert (nivel["modelo"], nivel["chamadas"], nivel["aceitas"], nivel["escaladas"]) == ("qwen2.5-coder:1.5b", 2, 1, 1)
+    assert stats["niveis"]["forte"]["chamadas"] == 2
+    # Uma aceita economiza a diferença para o principal; a escalada custa a tentativa rápida
+    media_forte, media_rapido = stats["niveis"]["forte"]["media_ms"], nivel["media_ms"]
+    assert nivel["economia_ms"] == pytest.approx(media_forte - 2 * media_rapido, abs=0.01)
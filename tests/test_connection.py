@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.connection import (
+    MemoryReplica,
+    close_replicas,
+    close_thread_connections,
+    get_connection,
+    get_replica,
+    open_memory,
+    readonly_uri,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "teste.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE produtos (nome TEXT, preco REAL)")
+    conn.execute("INSERT INTO produtos VALUES ('café', 12.5)")
+    conn.commit()
+    conn.close()
+    yield path
+    close_thread_connections()
+    close_replicas()
+
+
+def test_readonly_uri():
+    assert readonly_uri("/tmp/a b.db", immutable=False) == "file:/tmp/a%20b.db?mode=ro"
+    assert readonly_uri("/tmp/a.db", immutable=True).endswith("?mode=ro&immutable=1")
+
+
+def test_conexao_reaproveitada_na_mesma_thread(db):
+    assert get_connection(db) is get_connection(db)
+
+
+def test_conexao_por_thread(db):
+    principal = get_connection(db)
+    outras = []
+    t = threading.Thread(target=lambda: outras.append(get_connection(db)))
+    t.start()
+    t.join()
+    assert outras[0] is not principal
+
+
+def test_conexao_somente_leitura_com_pragmas(db):
+    conn = get_connection(db)
+    assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM produtos")
+    assert conn.execute("SELECT COUNT(*) FROM produtos").fetchone()[0] == 1
+
+
+def test_conexao_reaberta_quando_arquivo_e_substituido(db, tmp_path):
+    antiga = get_connection(db)
+    novo = tmp_path / "novo.db"
+    conn = sqlite3.connect(novo)
+    conn.execute("CREATE TABLE clientes (nome TEXT)")
+    conn.commit()
+    conn.close()
+    os.replace(novo, db)
+
+    atual = get_connection(db)
+    assert atual is not antiga
+    tabelas = [r[0] for r in atual.execute("SELECT name FROM sqlite_master")]
+    assert tabelas == ["clientes"]
+
+
+def _substitui_banco(db, tmp_path, preco):
+    novo = tmp_path / "novo.db"
+    conn = sqlite3.connect(novo)
+    conn.execute("CREATE TABLE produtos (nome TEXT, preco REAL)")
+    conn.execute("INSERT INTO produtos VALUES ('café', ?)", (preco,))
+    conn.commit()
+    conn.close()
+    os.replace(novo, db)
+
+
+def test_replica_em_memoria_somente_leitura(db):
+    replica = MemoryReplica(db, interval=0)
+    conn = open_memory(replica.current()[1])
+    assert conn.execute("SELECT preco FROM produtos").fetchone()[0] == 12.5
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM produtos")
+    conn.close()
+    replica.close()
+
+
+def test_replica_recarregada_em_segundo_plano(db, tmp_path):
+    replica = MemoryReplica(db, interval=0.05)
+    _substitui_banco(db, tmp_path, 99.0)
+    prazo = time.monotonic() + 2
+    while replica.generation == 1 and time.monotonic() < prazo:
+        time.sleep(0.02)
+    assert replica.generation == 2
+    conn = open_memory(replica.current()[1])
+    assert conn.execute("SELECT preco FROM produtos").fetchone()[0] == 99.0
+    conn.close()
+    replica.close()
+
+
+def test_get_connection_usa_replica_e_acompanha_geracoes(db, tmp_path):
+    with patch("core.connection.DB_MEMORY", True):
+        conn = get_connection(db)
+        assert conn.execute("PRAGMA database_list").fetchone()[2] == ""
+        assert get_connection(db) is conn
+
+        _substitui_banco(db, tmp_path, 7.0)
+        get_replica(db).load()
+        atual = get_connection(db)
+        assert atual is not conn
+        assert atual.execute("SELECT preco FROM produtos").fetchone()[0] == 7.0
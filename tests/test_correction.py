@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from benchmarks.bench_correction import load_cases
+from core.correction import CorrectionIndex, correct_sql, evaluate, fold_key, get_correction_index
+
+INDEX = CorrectionIndex(
+    columns={
+        "pmc": {"localidade": "localidade", "periodo": "período", "valor": "valor"},
+        "pms": {"estado": "estado", "periodo": "periodo", "valor": "Valor"},
+    },
+    relations={"pmc": "pmc", "pms": "pms", "transacaocartao": "transacaoCartao"},
+)
+
+
+def test_fold_key():
+    assert fold_key("Período") == "periodo"
+    assert fold_key("nomeFunção") == "nomefuncao"
+
+
+def test_candidatos_restritos_as_tabelas_citadas():
+    sql, fixes = correct_sql("SELECT periodo FROM pmc", ["periodo"], INDEX)
+    assert sql == "SELECT período FROM pmc"
+    sql, _ = correct_sql("SELECT período FROM pms", ["período"], INDEX)
+    assert sql == "SELECT periodo FROM pms"
+
+
+def test_sinonimos_entre_familias():
+    sql, fixes = correct_sql("SELECT localidade, valor FROM pms", ["localidade"], INDEX)
+    assert fixes == {"localidade": "estado"}
+    assert sql == "SELECT estado, valor FROM pms"
+
+
+def test_literais_nao_sao_alterados():
+    sql, _ = correct_sql("SELECT valr FROM pmc WHERE localidade = 'valr'", ["valr"], INDEX)
+    assert sql == "SELECT valor FROM pmc WHERE localidade = 'valr'"
+
+
+def test_varias_substituicoes_numa_passada():
+    sql, fixes = correct_sql("SELECT localidad, valr FROM pmc WHERE localidad = 'RN'", ["localidad", "valr"], INDEX)
+    assert sql == "SELECT localidade, valor FROM pmc WHERE localidade = 'RN'"
+    assert len(fixes) == 2
+
+
+def test_corrige_nome_de_tabela():
+    sql, _ = correct_sql("SELECT * FROM transacaoCartoes", ["transacaoCartoes"], INDEX)
+    assert sql == "SELECT * FROM transacaoCartao"
+
+
+def test_sem_sugestao_mantem_sql():
+    assert correct_sql("SELECT xyzw FROM pmc", ["xyzw"], INDEX) == ("SELECT xyzw FROM pmc", {})
+
+
+def test_indice_criado_uma_vez_por_versao():
+    with patch("core.correction.data_version", return_value="v-teste"):
+        assert get_correction_index() is get_correction_index()
+
+
+def test_acuracia_no_conjunto_de_casos():
+    relatorio = evaluate(load_cases())
+    assert relatorio["casos"] >= 20
+    assert relatorio["acuracia"] >= 0.9
@@ -1,36 +1,41 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 from core import database
 
-##get_db()	Verifica que a instância é singleton e criada só 1x com from_uri
 import sys
 import os
 
 # Adicionar o diretório raiz ao sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def test_get_db_singleton():
-    with patch('core.database.SQLDatabase.from_uri') as mock_from_uri:
-        mock_instance = MagicMock()
-        mock_from_uri.return_value = mock_instance
-
-        # Força a variável global a None para simular primeiro uso
-        database._db_inst = None
-        db1 = database.get_db()
-        db2 = database.get_db()
-
-        assert db1 is db2
-        assert mock_from_uri.call_count == 1
-
-##run_query()	Garante que a query é executada usando o mock do get_db()
+##run_query()	Garante que a query é executada direto no SQLite e retorna um QueryResult
 def test_run_query():
-    mock_db = MagicMock()
-    mock_db.run.return_value = "resultado_fake"
-
-    with patch('core.database.get_db', return_value=mock_db):
-        result = database.run_query("SELECT * FROM teste")
-        assert result == "resultado_fake"
-        mock_db.run.assert_called_once_with("SELECT * FROM teste")
+    result = database.run_query(
+        "SELECT periodo, Valor FROM ipca_7060_recife WHERE Grupo = 'Índice Geral' ORDER BY periodo LIMIT 2"
+    )
+    assert isinstance(result, database.QueryResult)
+    assert result.columns == ["periodo", "Valor"]
+    assert result.types == ["TEXT", "REAL"]
+    assert result.rows == [("2024-01-01", 0.63), ("2024-02-01", 0.74)]
+    assert len(result) == 2 and bool(result)
+
+##QueryResult	Converte para DataFrame e gera texto limitado para o prompt
+def test_query_result_dataframe_e_texto():
+    result = database.QueryResult(["a", "b"], ["INTEGER", "TEXT"], [(i, f"x{i}") for i in range(50)])
+    df = result.to_dataframe()
+    assert list(df.columns) == ["a", "b"]
+    assert df.shape == (50, 2)
+
+    texto = result.to_prompt_text(max_rows=3)
+    assert texto.splitlines()[:2] == ["a | b", "0 | x0"]
+    assert texto.endswith("(50 linhas no total, 3 exibidas)")
+    assert len(result.to_prompt_text(max_chars=40)) < 100
+
+def test_query_result_vazio():
+    result = database.run_query("SELECT valor FROM pmc_8881_RNm1 WHERE localidade = 'Marte'")
+    assert result.columns == ["valor"]
+    assert result.types == ["NULL"]
+    assert not result
 
 ##list_tables()	Testa que está chamando o _list_tables() corretamente (mockado)
 def test_list_tables():
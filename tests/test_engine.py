@@ -31,70 +31,8 @@ def test_is_valid_sql_structure_false():
     assert is_valid_sql_structure("DELETE FROM usuarios") is False
     assert is_valid_sql_structure("insira dados aqui") is False
 
-# 🔎 Testes para extract_identifiers()
-from core.engine import extract_identifiers, extract_aliases
-
-def test_extract_identifiers_simples():
-    # Deve extrair corretamente os identificadores de uma query básica
-    sql = "SELECT nome, idade FROM pessoas WHERE idade > 18"
-    resultado = extract_identifiers(sql)
-    assert set(resultado) >= {"nome", "idade", "pessoas"}
-
-
-def test_extract_identifiers_ignora_literals_e_alias():
-    # Deve ignorar strings literais e aliases
-    sql = "SELECT nome AS n, idade FROM pessoas WHERE cidade = 'Recife'"
-    resultado = extract_identifiers(sql)
-    assert "Recife" not in resultado
-    assert "n" not in resultado
-    assert "nome" in resultado
-    assert "idade" in resultado
-    assert "pessoas" in resultado
-
-
-# 🔎 Testes para extract_aliases()
-def test_extract_aliases_simples():
-    # Deve extrair corretamente aliases definidos com AS
-    sql = "SELECT nome AS n, idade AS i FROM pessoas"
-    resultado = extract_aliases(sql)
-    assert resultado == {"n", "i"}
-
-
-def test_extract_aliases_case_insensitive():
-    # Deve reconhecer aliases mesmo com 'as' minúsculo
-    sql = "SELECT nome as NomeColuna FROM usuarios"
-    resultado = extract_aliases(sql)
-    assert "NomeColuna" in resultado
-
-
-# 🔎 Testes para validate_columns_in_query()
-from core.engine import validate_columns_in_query
 from unittest.mock import patch
 
-def test_validate_columns_all_valid():
-    # Tudo que está na SQL existe no banco → nenhuma coluna inválida
-    sql = "SELECT nome, idade FROM clientes"
-
-    with patch("core.engine.list_tables", return_value=["clientes"]), \
-         patch("core.engine.describe_table", return_value=[("nome", "TEXT"), ("idade", "INTEGER")]):
-        
-        col_invalidas, col_validas = validate_columns_in_query(sql)
-        assert col_invalidas == []
-        assert "nome" in col_validas
-        assert "clientes" in col_validas
-
-
-def test_validate_columns_com_invalida():
-    # A SQL inclui uma coluna que não existe → deve retornar como inválida
-    sql = "SELECT nome, fruta_exotica FROM clientes"
-
-    with patch("core.engine.list_tables", return_value=["clientes"]), \
-         patch("core.engine.describe_table", return_value=[("nome", "TEXT"), ("idade", "INTEGER")]):
-        
-        col_invalidas, col_validas = validate_columns_in_query(sql)
-        assert "fruta_exotica" in col_invalidas
-        assert "nome" in col_validas
-
 # 🔎 Teste para retrieve_last_sql_context()
 from core.engine import retrieve_last_sql_context
 
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from core.etl import build, period_key, series_layout, variant_code
+from core.utils import _list_relations, _list_tables
+
+
+@pytest.fixture
+def origem(tmp_path):
+    path = tmp_path / "origem.db"
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE pmc_8883_RNAtvAcM12 (atividade TEXT, localidade TEXT, "período" TEXT, valor FLOAT)')
+    conn.executemany("INSERT INTO pmc_8883_RNAtvAcM12 VALUES (?, ?, ?, ?)", [
+        ("Móveis", "Brasil", "2024-01", 1.5),
+        ("Móveis", "Ceará", "2024-02", -0.3),
+    ])
+    conn.execute(
+        "CREATE TABLE ipca_7060_recife (Grupo TEXT, Subgrupo TEXT, Item TEXT, Subitem TEXT, "
+        "Localidade TEXT, periodo TEXT, Valor FLOAT)"
+    )
+    conn.executemany("INSERT INTO ipca_7060_recife VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        ("Índice Geral", "Geral", "Geral", "Geral", "Recife (PE)", "2024-01-01", 0.63),
+        ("Alimentação e bebidas", "Geral", "Geral", "Geral", "Recife (PE)", "2024-02-01", 0.87),
+    ])
+    conn.execute("CREATE TABLE pms_8688_RNm1 (Categoria TEXT, Período TEXT, Valor FLOAT)")
+    conn.execute("INSERT INTO pms_8688_RNm1 VALUES ('Total', '2024-03-01', 0.4)")
+    conn.execute("CREATE TABLE transacaoCartao (trimestre DATE, nomeBandeira TEXT, qtdCartoesEmitidos INTEGER)")
+    conn.execute("INSERT INTO transacaoCartao VALUES ('2024-01-01', 'Elo', 10)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def normalizado(origem, tmp_path):
+    saida = tmp_path / "normalizado.db"
+    build(origem, saida)
+    return saida
+
+
+def test_period_key():
+    assert period_key("2024-03") == 202403
+    assert period_key("2024-03-01") == 202403
+    with pytest.raises(ValueError):
+        period_key("mar/2024")
+
+
+def test_variant_code():
+    assert variant_code("pmc", "RNAtvAcM12") == "acm12"
+    assert variant_code("pms", "RNLocm1") == "m1"
+    assert variant_code("pnadc", "ocupacaoTri") == "tri"
+    assert variant_code("ipca", "brasil") == "m1"
+    assert variant_code("ipca", "Ac12Brasil") == "ac12"
+
+
+def test_series_layout_ignora_tabelas_largas():
+    assert series_layout(["trimestre", "nomeBandeira", "qtdCartoesEmitidos"]) is None
+    layout = series_layout(["estado", "categoria", "periodo", "valor"])
+    assert (layout.location, layout.categories, layout.period) == ("estado", ["categoria"], "periodo")
+
+
+def test_build_resumo(origem, tmp_path):
+    resumo = build(origem, tmp_path / "saida.db")
+    assert resumo["copiadas"] == ["transacaoCartao"]
+    assert set(resumo["series"]) == {"pmc_8883_RNAtvAcM12", "ipca_7060_recife", "pms_8688_RNm1"}
+    assert resumo["fatos"] == 5
+
+
+def test_build_aceita_caminho_com_caracteres_especiais(origem, tmp_path):
+    pasta = tmp_path / "dados 100% #1?"
+    pasta.mkdir()
+    estranho = pasta / "origem.db"
+    estranho.write_bytes(origem.read_bytes())
+    assert build(estranho, pasta / "saida.db")["fatos"] == 5
+
+
+def test_views_reproduzem_tabelas_originais(origem, normalizado):
+    antes, depois = sqlite3.connect(origem), sqlite3.connect(normalizado)
+    for tabela in ("pmc_8883_RNAtvAcM12", "ipca_7060_recife", "pms_8688_RNm1", "transacaoCartao"):
+        cursor = depois.execute(f'SELECT * FROM "{tabela}"')
+        original = antes.execute(f'SELECT * FROM "{tabela}"')
+        assert [d[0] for d in cursor.description] == [d[0] for d in original.description]
+        assert sorted(cursor.fetchall()) == sorted(original.fetchall())
+
+
+def test_fatos_com_periodo_inteiro(normalizado):
+    conn = sqlite3.connect(normalizado)
+    rows = conn.execute(
+        "SELECT periodo, ano, mes, valor FROM indicadores WHERE serie = 'ipca_7060_recife' ORDER BY periodo"
+    ).fetchall()
+    assert rows == [(202401, 2024, 1, 0.63), (202402, 2024, 2, 0.87)]
+    plano = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT valor FROM fato_indicador WHERE periodo BETWEEN 202401 AND 202402"
+    ))
+    assert "USING INDEX" in plano
+
+
+def test_relacoes_de_apoio_ficam_fora_do_prompt(normalizado):
+    tabelas = _list_tables(str(normalizado), "v1")
+    assert tabelas == ["dim_serie", "transacaoCartao", "indicadores"]
+    relacoes = _list_relations(str(normalizado), "v1")
+    assert {"fato_indicador", "pms_8688_RNm1", "indicadores"} <= set(relacoes)
+    assert "hubia_oculto" not in relacoes
@@ -0,0 +1,94 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import core.prompts as prompts
+from core.cache import AnswerCache
+from core.engine import auto_generate_and_run_query
+from core.examples import ExampleStore, signature
+from core.result_cache import ResultCache
+
+SQL_CARTAO = "SELECT nomeBandeira, SUM(qtdCartoesEmitidos) FROM transacaoCartao GROUP BY nomeBandeira"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ExampleStore(tmp_path / "exemplos.db")
+
+
+def test_vizinhos_mais_proximos(store):
+    store.add("Emissão de cartões por bandeira", SQL_CARTAO, ["bandeira", "total"], 4)
+    store.add("IPCA em Recife em janeiro de 2024", "SELECT 1", ["valor"], 1)
+    vizinhos = store.nearest("Quantidade de cartões emitidos por bandeira")
+    assert vizinhos[0][0].sql == SQL_CARTAO
+    assert len(vizinhos) == 1
+
+
+def test_reuso_exige_os_mesmos_valores(store):
+    store.add("IPCA em Recife em janeiro de 2024", "SELECT 1", ["valor"], 1)
+    assert store.reusable("ipca em  recife em janeiro de 2024").sql == "SELECT 1"
+    assert store.reusable("IPCA em Recife em fevereiro de 2024") is None
+    assert store.stats() == {"exemplos": 1, "reusos": 1}
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Emissão de cartões de crédito por bandeira",
+    "Emissão de cartões de débito por bandeira em Natal",
+    "Emissão de cartões por bandeira exceto Visa",
+    "Emissão de cartões internacionais por bandeira",
+])
+def test_filtro_a_mais_nao_reaproveita(store, pergunta):
+    store.add("Emissão de cartões por bandeira", SQL_CARTAO, ["bandeira", "total"], 4)
+    store.add("IPCA em Recife em janeiro de 2024", "SELECT 1", ["valor"], 1)
+    assert store.reusable("emissão de  cartões por bandeira").sql == SQL_CARTAO
+    assert store.reusable(pergunta) is None
+
+
+def test_filtro_a_menos_nao_reaproveita(store):
+    store.add("Emissão de cartões de crédito por bandeira", SQL_CARTAO, ["bandeira", "total"], 4)
+    assert store.reusable("Emissão de cartões por bandeira") is None
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Qual bandeira tem menos cartões emitidos?",
+    "Qual bandeira não tem mais cartões emitidos?",
+])
+def test_comparacao_invertida_nao_reaproveita(store, pergunta):
+    sql = "SELECT nomeBandeira FROM transacaoCartao GROUP BY nomeBandeira ORDER BY SUM(qtdCartoesEmitidos) DESC LIMIT 1"
+    store.add("Qual bandeira tem mais cartões emitidos?", sql, ["nomeBandeira"], 1)
+    assert store.reusable("qual bandeira tem mais cartões emitidos?").sql == sql
+    assert store.reusable(pergunta) is None
+    assert signature(pergunta) != signature("Qual bandeira tem mais cartões emitidos?")
+
+
+def test_assinatura_inclui_numeros():
+    assert signature("Top 5 bandeiras de cartão") != signature("Top 10 bandeiras de cartão")
+
+
+def test_exemplos_visiveis_entre_instancias(tmp_path):
+    ExampleStore(tmp_path / "exemplos.db").add("Emissão de cartões por bandeira", SQL_CARTAO, [], 4)
+    assert ExampleStore(tmp_path / "exemplos.db").nearest("cartões por bandeira")
+
+
+def test_prompt_com_exemplos_troca_as_regras_longas():
+    prompt = prompts.make_system_prompt_all(["transacaoCartao"], [("Emissão por bandeira", SQL_CARTAO)])
+    assert prompt.startswith(prompts.SQL_SYSTEM_PROMPT_FEW_SHOT_PREFIX)
+    assert "Regras de geração" not in prompt
+    assert f"SQL: {SQL_CARTAO}" in prompt
+    assert prompt.endswith(prompts.SQL_SYSTEM_PROMPT_SUFFIX)
+
+
+def test_motor_grava_e_reaproveita_exemplo(tmp_path, store):
+    cache = AnswerCache(path=tmp_path / "cache.db", source_path=tmp_path / "fonte.db")
+    gen = AsyncMock(return_value="SELECT nomeBandeira, SUM(qtdCartoesEmitidos) AS total FROM transacaoCartao GROUP BY nomeBandeira")
+    with patch("core.engine.get_answer_cache", return_value=cache), \
+         patch("core.engine.get_result_cache", return_value=ResultCache()), \
+         patch("core.engine.get_example_store", return_value=store), \
+         patch("core.engine.agenerate_sql_with_memory", gen), \
+         patch("core.engine.ainterpret", AsyncMock(return_value="ok")):
+        primeira = auto_generate_and_run_query("Emissão de cartões por bandeira")
+        cache.clear()
+        segunda = auto_generate_and_run_query("emissão de cartões por bandeira?")
+    assert primeira["origem"] == "llm"
+    assert segunda["origem"] == "exemplo"
+    assert gen.call_count == 1
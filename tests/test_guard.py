@@ -0,0 +1,111 @@
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from core.connection import close_thread_connections, get_connection
+from core.guard import (
+    CancelToken,
+    QueryCancelled,
+    QueryRejected,
+    apply_row_cap,
+    guarded_execute,
+    inspect_plan,
+)
+
+RECURSAO_INFINITA = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n"
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "teste.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE vendas (mes TEXT, valor REAL)")
+    conn.executemany("INSERT INTO vendas VALUES (?, ?)", [(f"2024{i % 12:02d}", i) for i in range(3000)])
+    conn.commit()
+    conn.close()
+    yield str(path)
+    close_thread_connections()
+
+
+def _run(db, sql, **kwargs):
+    return guarded_execute(get_connection(db), sql, db, "v1", **kwargs)
+
+
+def test_apply_row_cap():
+    assert apply_row_cap("SELECT * FROM t;", 10) == "SELECT * FROM t\nLIMIT 11"
+    assert apply_row_cap("SELECT * FROM t LIMIT 5", 10) == "SELECT * FROM t LIMIT 5"
+    assert apply_row_cap("SELECT * FROM t LIMIT 500", 10) == "SELECT * FROM t LIMIT 11"
+    assert apply_row_cap("SELECT * FROM t LIMIT 500 OFFSET 20", 10) == "SELECT * FROM t LIMIT 11 OFFSET 20"
+    assert apply_row_cap("SELECT * FROM t LIMIT 5 OFFSET 20", 10) == "SELECT * FROM t LIMIT 5 OFFSET 20"
+    assert apply_row_cap("SELECT * FROM t LIMIT 20, 500", 10) == "SELECT * FROM t LIMIT 11 OFFSET 20"
+    assert apply_row_cap("SELECT * FROM t LIMIT 20, 5", 10) == "SELECT * FROM t LIMIT 20, 5"
+    assert apply_row_cap("SELECT * FROM t LIMIT 500 -- todas\n", 10) == "SELECT * FROM t LIMIT 11"
+    assert apply_row_cap("SELECT '--' AS x FROM t /* fim */", 10) == "SELECT '--' AS x FROM t\nLIMIT 11"
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM vendas LIMIT 2000 OFFSET 10",
+    "SELECT * FROM vendas LIMIT 10, 2000",
+    "SELECT * FROM vendas LIMIT 2000 -- comentário",
+    "SELECT * FROM vendas LIMIT 1000 + 1000",
+    "SELECT * FROM vendas ORDER BY valor LIMIT (SELECT 2000)",
+])
+def test_limite_existente_nao_quebra_a_consulta(db, sql):
+    result = _run(db, sql, max_rows=100)
+    assert len(result) == 100
+    assert result.truncated
+
+
+def test_resultado_truncado(db):
+    result = _run(db, "SELECT * FROM vendas", max_rows=100)
+    assert len(result) == 100
+    assert result.truncated
+    assert "truncado em 100 linhas" in result.to_prompt_text()
+
+
+def test_resultado_no_limite_nao_e_truncado(db):
+    result = _run(db, "SELECT * FROM vendas LIMIT 100", max_rows=100)
+    assert len(result) == 100
+    assert not result.truncated
+
+
+def test_tempo_limite(db):
+    with pytest.raises(QueryCancelled, match="tempo limite"):
+        _run(db, RECURSAO_INFINITA, timeout=0.2, max_rows=0)
+
+
+def test_cancelamento(db):
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(QueryCancelled, match="cancelada"):
+        _run(db, RECURSAO_INFINITA, timeout=0, cancel=token)
+
+
+def test_conexao_continua_utilizavel_apos_interrupcao(db):
+    with pytest.raises(QueryCancelled):
+        _run(db, RECURSAO_INFINITA, timeout=0.1)
+    assert _run(db, "SELECT count(*) FROM vendas").rows == [(3000,)]
+
+
+def test_plano_estima_varreduras_aninhadas(db):
+    report = inspect_plan(get_connection(db), "SELECT * FROM vendas a, vendas b", db, "v1")
+    assert report.nested_scans == [["a", "b"]]
+    assert report.cost >= 3000 * 3000
+
+
+def test_plano_com_uma_varredura_nao_e_arriscado(db):
+    report = inspect_plan(get_connection(db), "SELECT mes, sum(valor) FROM vendas GROUP BY mes", db, "v1")
+    assert report.nested_scans == []
+    assert not report.risky
+
+
+def test_plano_arriscado_rejeitado(db):
+    with patch("core.guard.PLAN_MAX_COST", 1000), pytest.raises(QueryRejected):
+        _run(db, "SELECT count(*) FROM vendas a, vendas b")
+
+
+def test_plano_arriscado_apenas_avisa(db):
+    with patch("core.guard.PLAN_MAX_COST", 1000), patch("core.guard.PLAN_POLICY", "avisar"):
+        result = _run(db, "SELECT count(*) FROM vendas a, vendas b WHERE a.valor < 10")
+    assert result.rows == [(30000,)]
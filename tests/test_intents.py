@@ -0,0 +1,106 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.cache import AnswerCache
+from core.database import run_query
+from core.engine import auto_generate_and_run_query
+from core.intents import match_intent, parse_slots
+
+
+def test_slots_de_periodo_e_localidade():
+    slots = parse_slots("Desocupação no RN no 2º trimestre de 2024")
+    assert (slots.indicador, slots.localidade, slots.ano, slots.trimestre) == (
+        "desocupacao", "Rio Grande do Norte", 2024, 2
+    )
+    slots = parse_slots("PMS em São Paulo em 04/2024")
+    assert (slots.indicador, slots.localidade, slots.mes, slots.ano) == ("pms", "São Paulo", 4, 2024)
+
+
+def test_para_sem_acento_nao_e_estado():
+    assert parse_slots("vendas para o Brasil em maio de 2024").localidade == "Brasil"
+    assert parse_slots("informalidade no Pará em 2024").localidade == "Pará"
+
+
+@pytest.mark.parametrize("pergunta, variante", [
+    ("IPCA acumulado em Recife em 2024", "ano"),
+    ("IPCA acumulado em 12 meses em Recife", "12m"),
+    ("variação da PMC no RN em 2024", "var_mensal"),
+    ("variação acumulada em 12 meses da PMS no RN", "var_12m"),
+    ("PMC no RN em março de 2024", "mensal"),
+])
+def test_variante_da_medida(pergunta, variante):
+    assert parse_slots(pergunta).variante == variante
+
+
+def test_ipca_acumulado_no_ano_retorna_ultimo_mes():
+    intent = match_intent("IPCA acumulado em Recife em 2024")
+    assert intent.tabela == "ipca_7060_AcBrasil"
+    assert intent.confianca == 1.0
+    assert run_query(intent.sql).rows == [("2024-12-01", 4.36)]
+
+
+def test_pms_no_rn_usa_tabela_sem_localidade():
+    intent = match_intent("variação da PMS no RN em março de 2024")
+    assert intent.tabela == "pms_8688_RNAcM1"
+    assert run_query(intent.sql).rows == [("2024-03-01", 2.5)]
+    assert match_intent("variação da PMS no Ceará em março de 2024").tabela == "pms_8693_RNAcLocm1"
+
+
+def test_trimestre_da_pnadc():
+    intent = match_intent("ocupação em Pernambuco no primeiro trimestre de 2024")
+    assert run_query(intent.sql).rows == [("2024-01-01", 54.3)]
+
+
+def test_sem_tabela_para_a_combinacao():
+    # O IPCA acumulado em 12 meses só existe para Recife
+    assert match_intent("IPCA acumulado em 12 meses no Brasil") is None
+    assert match_intent("Emissão de cartões por bandeira") is None
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Volume de serviços por categoria no RN em junho de 2024",
+    "Estados com maior desocupação no 4º trimestre de 2024",
+    "Comparar a PMS entre Ceará e Bahia em 2024",
+])
+def test_detalhamentos_ficam_com_o_llm(pergunta):
+    assert match_intent(pergunta) is None
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Qual a média do IPCA mensal em Recife em 2024?",
+    "Soma do IPCA mensal em Recife 2024",
+    "Total das vendas do varejo no RN em 2024",
+    "Máximo da desocupação em Pernambuco em 2024",
+    "Mínimo do IPCA mensal em Recife em 2024",
+    "Meses com IPCA acima de 0,5 em Recife em 2024",
+    "Quantos meses o IPCA ficou abaixo de zero em Recife em 2024?",
+])
+def test_agregacoes_ficam_com_o_llm(pergunta):
+    assert match_intent(pergunta) is None
+
+
+def test_palavras_nao_explicadas_reduzem_a_confianca():
+    intent = match_intent("IPCA de alimentação em Recife em 2024")
+    assert intent.confianca < 0.8
+
+
+def test_motor_responde_por_intencao_sem_llm(tmp_path):
+    cache = AnswerCache(path=tmp_path / "cache.db", source_path=tmp_path / "fonte.db")
+    gen = AsyncMock()
+    with patch("core.engine.get_answer_cache", return_value=cache), \
+         patch("core.engine.agenerate_sql_with_memory", gen):
+        resposta = auto_generate_and_run_query("Qual o IPCA em Recife em janeiro de 2024?")
+    assert resposta["origem"] == "intencao"
+    assert resposta["tabela"] == "ipca_7060_recife"
+    assert "0,63" in resposta["interpretacao"]
+    gen.assert_not_called()
+
+
+def test_reconhecimento_em_milissegundos():
+    match_intent("IPCA em Recife em janeiro de 2024")
+    start = time.perf_counter()
+    for _ in range(20):
+        match_intent("desocupação no Ceará no 2º trimestre de 2024")
+    assert (time.perf_counter() - start) / 20 < 0.01
@@ -0,0 +1,95 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import llm_agent
+from core.llm_cache import LLMCache, LLMCacheMiss, llm_options, make_key
+
+MENSAGENS = [{"role": "system", "content": "sistema"}, {"role": "user", "content": "pergunta"}]
+
+
+def test_chave_depende_de_modelo_opcoes_e_mensagens():
+    base = make_key("phi4-mini", {"temperature": 0}, MENSAGENS)
+    assert base == make_key("phi4-mini", {"temperature": 0}, [dict(m) for m in MENSAGENS])
+    assert base != make_key("llama3", {"temperature": 0}, MENSAGENS)
+    assert base != make_key("phi4-mini", {"temperature": 0.7}, MENSAGENS)
+    assert base != make_key("phi4-mini", {"temperature": 0}, MENSAGENS[:1])
+
+
+def test_opcoes_ignoram_campos_nao_serializaveis():
+    llm = MagicMock(temperature=0.0, seed=42)
+    assert llm_options(llm) == {"temperature": 0.0, "seed": 42}
+
+
+def test_modo_on_le_e_grava(tmp_path):
+    cache = LLMCache(tmp_path / "llm.db", mode="on")
+    assert cache.get("m", {}, MENSAGENS) is None
+    cache.set("m", {}, MENSAGENS, "SELECT 1")
+    assert cache.get("m", {}, MENSAGENS) == "SELECT 1"
+
+
+def test_modo_record_grava_sem_ler(tmp_path):
+    cache = LLMCache(tmp_path / "llm.db", mode="record")
+    cache.set("m", {}, MENSAGENS, "SELECT 1")
+    assert cache.get("m", {}, MENSAGENS) is None
+    assert LLMCache(tmp_path / "llm.db", mode="on").get("m", {}, MENSAGENS) == "SELECT 1"
+
+
+def test_modo_replay_e_somente_leitura(tmp_path):
+    LLMCache(tmp_path / "llm.db", mode="record").set("m", {}, MENSAGENS, "SELECT 1")
+    replay = LLMCache(tmp_path / "llm.db", mode="replay")
+    assert replay.get("m", {}, MENSAGENS) == "SELECT 1"
+    replay.set("m", {}, MENSAGENS[:1], "outra")
+    with pytest.raises(LLMCacheMiss):
+        replay.get("m", {}, MENSAGENS[:1])
+
+
+def test_replay_aceita_caminho_com_caracteres_especiais(tmp_path):
+    pasta = tmp_path / "cache 100% #1?"
+    pasta.mkdir()
+    LLMCache(pasta / "llm.db", mode="record").set("m", {}, MENSAGENS, "SELECT 1")
+    assert LLMCache(pasta / "llm.db", mode="replay").get("m", {}, MENSAGENS) == "SELECT 1"
+
+
+def test_replay_sem_arquivo(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LLMCache(tmp_path / "nao_existe.db", mode="replay")
+
+
+def test_despejo_por_tamanho(tmp_path):
+    cache = LLMCache(tmp_path / "llm.db", mode="on", max_bytes=25)
+    for i in range(3):
+        cache.set("m", {}, [{"role": "user", "content": str(i)}], "x" * 10)
+    assert cache.stats()["bytes"] <= 25
+    assert cache.get("m", {}, [{"role": "user", "content": "0"}]) is None
+    assert cache.get("m", {}, [{"role": "user", "content": "2"}]) == "x" * 10
+
+
+def _llm():
+    llm = MagicMock(model="phi4-mini", temperature=0.0)
+    llm.invoke.return_value = "SELECT 1"
+    llm.ainvoke = AsyncMock(return_value="SELECT 1")
+    llm.stream.return_value = iter(["Inter", "pretação"])
+    return llm
+
+
+def test_agente_reaproveita_respostas_entre_chamadas(tmp_path):
+    llm = _llm()
+    with patch.object(llm_agent, "_LLM", llm), \
+         patch.object(llm_agent, "get_llm_cache", return_value=LLMCache(tmp_path / "llm.db", mode="on")):
+        assert llm_agent.interpret("SELECT 1", [(1,)]) == "SELECT 1"
+        assert asyncio.run(llm_agent.ainterpret("SELECT 1", [(1,)])) == "SELECT 1"
+        assert "".join(llm_agent.interpret_stream("SELECT 1", [(1,)])) == "SELECT 1"
+    assert llm.invoke.call_count == 1
+    llm.ainvoke.assert_not_called()
+    llm.stream.assert_not_called()
+
+
+def test_streaming_grava_a_resposta_completa(tmp_path):
+    llm = _llm()
+    cache = LLMCache(tmp_path / "llm.db", mode="on")
+    with patch.object(llm_agent, "_LLM", llm), patch.object(llm_agent, "get_llm_cache", return_value=cache):
+        assert list(llm_agent.interpret_stream("SELECT 2", [(2,)])) == ["Inter", "pretação"]
+        assert llm_agent.interpret("SELECT 2", [(2,)]) == "Interpretação"
+    llm.invoke.assert_not_called()
@@ -0,0 +1,113 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from core.materialize import CONTROL_TABLE, refresh
+from core.utils import HIDDEN_RELATIONS_TABLE
+
+DB = Path(__file__).resolve().parent.parent / "fecomdb.db"
+
+
+@pytest.fixture
+def banco(tmp_path):
+    path = tmp_path / "banco.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE ipca_7060_brasil (Grupo TEXT, Subgrupo TEXT, Item TEXT, Subitem TEXT, "
+        "Localidade TEXT, periodo TEXT, Valor FLOAT)"
+    )
+    conn.executemany("INSERT INTO ipca_7060_brasil VALUES ('Índice Geral', 'Geral', 'Geral', 'Geral', 'Brasil', ?, ?)", [
+        (f"2023-{m:02d}-01", 1.0) for m in range(1, 13)
+    ] + [("2024-01-01", 0.5), ("2024-02-01", None)])
+    conn.execute('CREATE TABLE pmc_8883_RNAtvM1 (atividade TEXT, localidade TEXT, "período" TEXT, valor FLOAT)')
+    conn.executemany("INSERT INTO pmc_8883_RNAtvM1 VALUES ('Móveis', 'Brasil', ?, ?)", [
+        ("2024-01", 2.0), ("2024-02", 4.0),
+    ])
+    conn.execute(
+        "CREATE TABLE transacaoCartao (trimestre DATE, nomeBandeira TEXT, nomeFuncao TEXT, produto TEXT, "
+        "qtdCartoesEmitidos INTEGER, qtdCartoesAtivos INTEGER, qtdTransacoesNacionais INTEGER, "
+        "valorTransacoesNacionais FLOAT, qtdTransacoesInternacionais INTEGER, valorTransacoesInternacionais FLOAT)"
+    )
+    conn.executemany("INSERT INTO transacaoCartao VALUES ('2024-01-01', 'Elo', 'Crédito', ?, ?, 1, 1, 1.5, 0, 0)", [
+        ("Básico", 10), ("Gold", 5),
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_refresh_cria_resumos(banco):
+    report = refresh(banco)
+    assert report["resumo_ipca_acumulado_ano"]["ipca_7060_brasil"] == "completo"
+
+    anos = _rows(banco, "SELECT ano, acumulado, meses FROM resumo_ipca_acumulado_ano ORDER BY ano")
+    assert anos == [(2023, round((1.01 ** 12 - 1) * 100, 4), 12), (2024, 0.5, 1)]
+    doze = _rows(banco, "SELECT periodo, acumulado FROM resumo_ipca_12_meses ORDER BY periodo")
+    assert doze == [("2023-12-01", round((1.01 ** 12 - 1) * 100, 4)),
+                    ("2024-01-01", round((1.01 ** 11 * 1.005 - 1) * 100, 4))]
+    assert _rows(banco, "SELECT localidade, categoria, ano, media, meses FROM resumo_media_anual") == [
+        ("Brasil", "Móveis", 2024, 3.0, 2)
+    ]
+    assert _rows(banco, "SELECT periodo, nomeBandeira, qtdCartoesEmitidos FROM resumo_cartao_trimestral") == [
+        ("2024-01-01", "Elo", 15.0)
+    ]
+    oculto = _rows(banco, f"SELECT nome FROM {HIDDEN_RELATIONS_TABLE}")
+    assert (CONTROL_TABLE,) in oculto
+
+
+def test_refresh_incremental(banco):
+    refresh(banco)
+    assert set(refresh(banco)["resumo_ipca_acumulado_ano"].values()) == {"em dia"}
+
+    conn = sqlite3.connect(banco)
+    conn.execute("INSERT INTO ipca_7060_brasil VALUES ('Índice Geral', 'Geral', 'Geral', 'Geral', 'Brasil', '2024-03-01', 1.0)")
+    conn.execute("INSERT INTO transacaoCartao VALUES ('2024-04-01', 'Elo', 'Crédito', 'Gold', 7, 1, 1, 1.5, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    report = refresh(banco)
+    assert report["resumo_ipca_acumulado_ano"]["ipca_7060_brasil"] == "incremental desde 2024"
+    assert report["resumo_cartao_trimestral"]["transacaoCartao"] == "incremental desde 2024-01-01"
+    assert report["resumo_media_anual"]["pmc_8883_RNAtvM1"] == "em dia"
+    assert _rows(banco, "SELECT ano, acumulado, meses FROM resumo_ipca_acumulado_ano WHERE ano = 2024") == [
+        (2024, round((1.005 * 1.01 - 1) * 100, 4), 2)
+    ]
+    assert _rows(banco, "SELECT periodo, qtdCartoesEmitidos FROM resumo_cartao_trimestral ORDER BY periodo") == [
+        ("2024-01-01", 15.0), ("2024-04-01", 7.0)
+    ]
+
+
+def test_refresh_refaz_quando_historico_muda(banco):
+    refresh(banco)
+    conn = sqlite3.connect(banco)
+    conn.execute("DELETE FROM ipca_7060_brasil WHERE periodo = '2023-06-01'")
+    conn.commit()
+    conn.close()
+
+    report = refresh(banco)
+    assert report["resumo_ipca_acumulado_ano"]["ipca_7060_brasil"] == "completo"
+    assert _rows(banco, "SELECT meses FROM resumo_ipca_acumulado_ano WHERE ano = 2023") == [(11,)]
+    # A janela de 12 meses deixa de ser contígua
+    assert _rows(banco, "SELECT COUNT(*) FROM resumo_ipca_12_meses") == [(0,)]
+
+
+def test_resumo_confere_com_tabela_acumulada(tmp_path):
+    path = tmp_path / "fecomdb.db"
+    shutil.copy(DB, path)
+    refresh(path)
+    (resumo,) = _rows(path,
+        "SELECT acumulado FROM resumo_ipca_acumulado_ano WHERE fonte = 'ipca_7060_recife' "
+        "AND grupo = 'Índice Geral' AND ano = 2024")
+    (oficial,) = _rows(path,
+        "SELECT Valor FROM ipca_7060_AcBrasil WHERE Grupo = 'Índice Geral' ORDER BY periodo DESC LIMIT 1")
+    assert resumo[0] == pytest.approx(oficial[0], abs=0.01)
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from core import metrics
+
+
+@pytest.fixture(autouse=True)
+def limpo():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histograma_acumula_baldes():
+    for ms in (0.5, 3, 3, 70000):
+        metrics.observe("etapa_ms", ms, etapa="execucao")
+    hist = metrics.get_histogram("etapa_ms", etapa="execucao")
+    assert hist["contagem"] == 4
+    assert hist["baldes"]["1"] == 1
+    assert hist["baldes"]["5"] == 3
+    assert hist["baldes"]["60000"] == 3
+    assert hist["baldes"]["+Inf"] == 4
+    assert metrics.get_histogram("etapa_ms", etapa="prompt") is None
+
+
+def test_exportacao_prometheus():
+    metrics.incr("intencao_total", 2)
+    metrics.observe("etapa_ms", 4, etapa="prompt")
+    texto = metrics.export_prometheus()
+    assert "# TYPE hubia_intencao_total counter\nhubia_intencao_total 2" in texto
+    assert 'hubia_etapa_ms_bucket{etapa="prompt",le="5"} 1' in texto
+    assert 'hubia_etapa_ms_count{etapa="prompt"} 1' in texto
+    assert texto.count("# TYPE hubia_etapa_ms histogram") == 1
+
+
+def test_exportacao_json():
+    metrics.incr("guard_consultas_total")
+    metrics.observe("requisicao_ms", 12.5, origem="llm")
+    data = json.loads(metrics.export_json())
+    assert data["contadores"] == {"guard_consultas_total": 1}
+    assert data["histogramas"][0]["rotulos"] == {"origem": "llm"}
+    assert data["histogramas"][0]["soma"] == 12.5
@@ -0,0 +1,74 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.prompts import make_system_prompt_all
+from core.utils import estimate_tokens
+from models import model_loader
+from models.model_loader import ModelManager, context_size, model_options
+
+
+@pytest.fixture(autouse=True)
+def limpa_num_ctx():
+    context_size.cache_clear()
+    yield
+    context_size.cache_clear()
+
+
+def test_num_ctx_dimensionado_pelo_prompt():
+    num_ctx = context_size()
+    assert num_ctx % 1024 == 0
+    assert num_ctx >= estimate_tokens(make_system_prompt_all()) * model_loader.TOKENS_PER_ESTIMATE
+
+
+def test_opcoes_vem_da_configuracao():
+    with patch.object(model_loader, "MODEL_NUM_CTX", 8192), \
+         patch.object(model_loader, "MODEL_NUM_THREAD", 4), \
+         patch.object(model_loader, "MODEL_NUM_PREDICT", 0), \
+         patch.object(model_loader, "MODEL_KEEP_ALIVE", "-1"), \
+         patch.object(model_loader, "OLLAMA_HOST", "http://ollama:11434"):
+        opcoes = model_options("qwen2.5-coder:1.5b")
+    assert opcoes == {
+        "model": "qwen2.5-coder:1.5b", "keep_alive": -1, "num_ctx": 8192,
+        "num_thread": 4, "base_url": "http://ollama:11434",
+    }
+
+
+def test_aquecimento_carrega_modelo_com_prompt_vazio():
+    manager = ModelManager("phi4-mini", interval=0)
+    with patch("ollama.Client") as cliente:
+        assert manager.warm()
+    kwargs = cliente.return_value.generate.call_args.kwargs
+    assert kwargs["prompt"] == "" and kwargs["model"] == "phi4-mini"
+    assert kwargs["options"]["num_ctx"] == context_size()
+    assert manager.status()["estado"] == "pronto"
+
+
+def test_falha_no_aquecimento_fica_visivel():
+    manager = ModelManager("phi4-mini", interval=0)
+    with patch.object(manager, "_generate_empty", side_effect=ConnectionError("recusada")):
+        assert not manager.warm()
+    assert manager.status() == {"modelo": "phi4-mini", "estado": "erro", "carga_ms": None, "erro": "recusada"}
+    assert not manager.ready
+
+
+def test_start_aquece_em_segundo_plano():
+    manager = ModelManager("phi4-mini", interval=0)
+    with patch.object(manager, "_generate_empty") as gerar:
+        assert manager.status()["estado"] == "frio"
+        manager.start()
+        manager.start()
+        assert manager.wait_ready(timeout=2)
+    gerar.assert_called_once()
+
+
+def test_chamada_ao_modelo_marca_pronto():
+    from core import llm_agent
+
+    manager = ModelManager("phi4-mini", interval=0)
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value="SELECT 1")
+    with patch.object(llm_agent, "_LLM", llm), patch.object(llm_agent, "_MODEL", manager):
+        asyncio.run(llm_agent._ainvoke([{"role": "user", "content": "oi"}]))
+    assert manager.ready
@@ -0,0 +1,76 @@
+import pytest
+
+from core.narrator import describe_expression, format_number, narrate, result_columns
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (0.63, "0,63"),
+        (-0.5, "-0,5"),
+        (1234.5, "1.234,5"),
+        (570464259.0, "570.464.259"),
+        (243, "243"),
+        ("Recife (PE)", "Recife (PE)"),
+    ],
+)
+def test_format_number(value, expected):
+    assert format_number(value) == expected
+
+
+def test_describe_expression_agregacoes_e_alias():
+    assert describe_expression("AVG(Valor)") == "a média de Valor"
+    assert describe_expression("COUNT(*)") == "o número de registros"
+    assert describe_expression("SUM(t.valor) AS total_vendas") == "total_vendas"
+    assert describe_expression('"Período"') == "Período"
+
+
+def test_result_columns_select_asterisco_usa_esquema():
+    assert result_columns("SELECT * FROM pms_8688_RNm1 WHERE 1", 3) == ["Categoria", "Período", "Valor"]
+
+
+def test_narrate_escalar():
+    sql = "SELECT AVG(Valor) FROM ipca_7060_recife WHERE Grupo = 'Índice Geral'"
+    assert narrate(sql, "[(0.356,)]") == "A média de Valor é 0,36, considerando Grupo = Índice Geral."
+
+
+def test_narrate_agregacao_sem_dados():
+    sql = "SELECT AVG(Valor) FROM ipca_7060_recife WHERE Grupo = 'Inexistente'"
+    assert narrate(sql, [(None,)]) == "Não há dados para calcular a média de Valor, considerando Grupo = Inexistente."
+    sql = "SELECT MIN(Valor), MAX(Valor) FROM ipca_7060_recife WHERE Grupo = 'Inexistente'"
+    assert narrate(sql, [(None, None)]) == "A consulta não encontrou dados, considerando Grupo = Inexistente."
+    assert narrate("SELECT localidade, valor FROM pmc_8881_RNm1", [("Brasil", None)]) is None
+
+
+def test_narrate_vazio():
+    sql = "SELECT valor FROM pmc_8881_RNm1 WHERE localidade = 'Marte'"
+    assert narrate(sql, "") == "A consulta não retornou registros, considerando localidade = Marte."
+
+
+def test_narrate_registro_unico():
+    sql = "SELECT localidade, valor FROM pmc_8881_RNm1 WHERE periodo = '2024-01'"
+    texto = narrate(sql, [("Brasil", 2.2)])
+    assert texto == "A consulta retornou um único registro, considerando periodo = 2024-01: localidade: Brasil; valor: 2,2."
+
+
+def test_narrate_serie_temporal():
+    sql = "SELECT periodo, valor FROM pmc_8881_RNm1 WHERE localidade = 'Brasil'"
+    rows = [("2024-03", 1.0), ("2024-01", 2.2), ("2024-02", 0.9)]
+    texto = narrate(sql, rows)
+    assert texto.startswith("Entre 2024-01 e 2024-03, valor passou de 2,2 para 1, indicando queda")
+    assert "O maior valor foi 2,2 (2024-01) e o menor, 0,9 (2024-02), em 3 observações." in texto
+
+
+def test_narrate_resultados_complexos_retornam_none():
+    sql = "SELECT nomeBandeira, produto, SUM(qtdCartoesEmitidos) FROM transacaoCartao GROUP BY 1, 2"
+    rows = [("Elo", "Gold", 10), ("Visa", "Gold", 20)]
+    assert narrate(sql, rows) is None
+    assert narrate("SELECT periodo, valor FROM t", [("2024-01", 1.0)] * 30) is None
+    assert narrate("SELECT x FROM t", "resultado ilegível") is None
+
+
+def test_narrate_usa_colunas_do_query_result():
+    from core.database import QueryResult
+
+    result = QueryResult(["AVG(Valor)"], ["REAL"], [(0.356,)])
+    assert narrate("WITH x AS (SELECT 1) SELECT * FROM x", result) == "A média de Valor é 0,36."
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from core.optimizer import column_roles, compare_plans, optimize, plan_indexes
+
+
+@pytest.fixture
+def origem(tmp_path):
+    path = tmp_path / "origem.db"
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE pmc (atividade TEXT, localidade TEXT, "período" TEXT, valor FLOAT)')
+    conn.executemany(
+        "INSERT INTO pmc VALUES (?, ?, ?, ?)",
+        [(f"atv{i % 7}", f"UF{i % 3}", f"2024-{i % 12 + 1:02d}", i) for i in range(500)],
+    )
+    conn.execute("CREATE TABLE cartao (trimestre DATE, produto TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_column_roles():
+    roles = column_roles(["Grupo", "Subitem", "Localidade", "Período", "Valor"])
+    assert roles == {"categoria": ["Grupo", "Subitem"], "localidade": ["Localidade"], "periodo": ["Período"]}
+
+
+def test_plan_indexes_composto_com_dimensao_mais_seletiva(origem):
+    conn = sqlite3.connect(origem)
+    nomes = dict(plan_indexes(conn, "pmc"))
+    assert nomes["idx_pmc_atividade_localidade_periodo"] == ["atividade", "localidade", "período"]
+    assert nomes["idx_pmc_localidade"] == ["localidade"]
+    assert nomes["idx_pmc_periodo"] == ["período"]
+    assert plan_indexes(conn, "cartao") == [("idx_cartao_trimestre", ["trimestre"])]
+
+
+def test_optimize_cria_copia_indexada_e_analisada(origem, tmp_path):
+    saida = tmp_path / "otimizado.db"
+    criados = optimize(origem, saida)
+    assert set(criados) == {"pmc", "cartao"}
+
+    conn = sqlite3.connect(saida)
+    indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert indices == {n for ns in criados.values() for n in ns}
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    assert conn.execute("SELECT COUNT(*) FROM pmc").fetchone()[0] == 500
+    assert not (tmp_path / "otimizado.db.tmp").exists()
+
+    original = sqlite3.connect(origem)
+    assert original.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 0
+
+
+def test_optimize_aceita_caminho_com_caracteres_especiais(origem, tmp_path):
+    pasta = tmp_path / "dados 100% #1?"
+    pasta.mkdir()
+    estranho = pasta / "origem.db"
+    estranho.write_bytes(origem.read_bytes())
+    criados = optimize(estranho, pasta / "otimizado.db")
+    assert set(criados) == {"pmc", "cartao"}
+
+
+def test_optimize_recusa_sobrescrever_origem(origem):
+    with pytest.raises(ValueError):
+        optimize(origem, origem)
+
+
+def test_relatorio_troca_varreduras_por_indices(origem, tmp_path):
+    saida = tmp_path / "otimizado.db"
+    optimize(origem, saida)
+    linhas = compare_plans(origem, saida, runs=1)
+    assert linhas
+    assert all("SCAN" in r.plano_antes for r in linhas)
+    assert not any(r.plano_depois.startswith("SCAN") for r in linhas)
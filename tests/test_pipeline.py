@@ -0,0 +1,166 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core import metrics
+from core.cache import AnswerCache
+from core.engine import auto_generate_and_run_query, auto_generate_and_run_query_async
+from core.examples import ExampleStore
+from core.result_cache import ResultCache
+
+SQL = "SELECT Valor FROM ipca_7060_recife WHERE Grupo = 'Índice Geral' AND periodo = '2024-01-01'"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnswerCache(path=tmp_path / "cache.db", source_path=tmp_path / "fonte.db")
+    # Estes testes exercitam o caminho do LLM; o atalho por intenção fica desligado
+    with patch("core.engine.get_answer_cache", return_value=cache), \
+         patch("core.engine.get_example_store", return_value=ExampleStore(tmp_path / "exemplos.db")), \
+         patch("core.engine.get_result_cache", return_value=ResultCache()), \
+         patch("core.engine.INTENTS_ENABLED", False):
+        yield cache
+
+
+def test_pipeline_usa_cache_na_repeticao(cache):
+    with patch("core.engine.FAST_NARRATION", False), \
+         patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=SQL)) as gen, \
+         patch("core.engine.ainterpret", AsyncMock(return_value="O IPCA foi de 0,63%.")) as interp:
+        primeira = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024")
+        segunda = auto_generate_and_run_query("ipca em recife em janeiro de 2024")
+
+    assert primeira["origem"] == "llm"
+    assert segunda["origem"] == "cache"
+    assert segunda["interpretacao"] == primeira["interpretacao"]
+    assert gen.call_count == 1
+    assert interp.call_count == 1
+
+
+def test_pipeline_stream_entrega_tokens_e_grava_no_cache(cache):
+    with patch("core.engine.FAST_NARRATION", False), \
+         patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=SQL)), \
+         patch("core.engine.interpret_stream", return_value=iter(["O IPCA ", "foi ", "de 0,63%."])):
+        resposta = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024", stream=True)
+        assert cache.get("IPCA em Recife em janeiro de 2024") is None
+        assert list(resposta["interpretacao"]) == ["O IPCA ", "foi ", "de 0,63%."]
+
+    cached = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024", stream=True)
+    assert cached["origem"] == "cache"
+    assert "".join(cached["interpretacao"]) == "O IPCA foi de 0,63%."
+
+
+@patch("core.llm_agent._LLM")
+def test_interpret_stream_repassa_tokens_do_modelo(mock_llm):
+    from core.llm_agent import interpret_stream
+
+    mock_llm.stream.return_value = iter(["Resultado ", "claro."])
+
+    assert list(interpret_stream(SQL, [(0.63,)])) == ["Resultado ", "claro."]
+
+
+def test_pipeline_narra_resultado_pequeno_sem_llm(cache):
+    metrics.reset()
+    with patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=SQL)), \
+         patch("core.engine.ainterpret", AsyncMock()) as interp:
+        resposta = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024")
+
+    interp.assert_not_called()
+    assert resposta["interpretacao"].startswith("O valor de Valor é 0,63")
+    assert metrics.get_counter("narracao_regra_total") == 1
+    assert metrics.ratio("narracao_regra_total", "narracao_llm_total") == 1.0
+
+
+def test_pipeline_interpretar_pede_sempre_o_llm(cache):
+    with patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=SQL)), \
+         patch("core.engine.ainterpret", AsyncMock(return_value="O IPCA subiu 0,63%.")) as interp:
+        narrada = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024")
+        interpretada = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024", interpretar=True)
+
+    assert narrada["interpretacao"].startswith("O valor de Valor é 0,63")
+    interp.assert_called_once()
+    assert interpretada["interpretacao"] == "O IPCA subiu 0,63%."
+    assert interpretada["origem"] == "exemplo"
+
+
+def test_pipeline_resultado_complexo_usa_llm(cache):
+    metrics.reset()
+    sql = "SELECT nomeBandeira, SUM(qtdCartoesEmitidos) AS total FROM transacaoCartao GROUP BY nomeBandeira"
+    with patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=sql)), \
+         patch("core.engine.ainterpret", AsyncMock(return_value="A Elo lidera.")) as interp:
+        resposta = auto_generate_and_run_query("Emissão de cartões por bandeira")
+
+    interp.assert_called_once()
+    assert resposta["interpretacao"] == "A Elo lidera."
+    assert metrics.get_counter("narracao_llm_total") == 1
+
+
+def test_pipeline_async(cache):
+    with patch("core.engine.agenerate_sql_with_memory", AsyncMock(return_value=SQL)):
+        resposta = asyncio.run(auto_generate_and_run_query_async("IPCA em Recife em janeiro de 2024"))
+    assert resposta["sql"] == SQL
+    assert resposta["origem"] == "llm"
+
+
+def test_llm_concorrencia_limitada():
+    from core import llm_agent
+
+    ativos = pico = 0
+
+    class FakeLLM:
+        async def ainvoke(self, messages):
+            nonlocal ativos, pico
+            ativos += 1
+            pico = max(pico, ativos)
+            await asyncio.sleep(0.02)
+            ativos -= 1
+            return "SELECT 1"
+
+    async def varias_chamadas():
+        await asyncio.gather(*(llm_agent._ainvoke([]) for _ in range(6)))
+
+    with patch.object(llm_agent, "_LLM", FakeLLM()), \
+         patch.object(llm_agent, "_LLM_SLOTS", threading.BoundedSemaphore(2)):
+        asyncio.run(varias_chamadas())
+    assert pico == 2
+
+
+def test_pipeline_reusa_resultado_e_interpretacao_da_mesma_sql(cache):
+    metrics.reset()
+    sql = "SELECT nomeBandeira, SUM(qtdCartoesEmitidos) AS total FROM transacaoCartao GROUP BY nomeBandeira"
+    outra_forma = "select  NOMEBANDEIRA, sum(qtdCartoesEmitidos) as total from transacaoCartao c group by nomeBandeira;"
+    with patch("core.engine.agenerate_sql_with_memory", AsyncMock(side_effect=[sql, outra_forma])), \
+         patch("core.engine.execute_sql", wraps=__import__("core.engine").engine.execute_sql) as execucao, \
+         patch("core.engine.ainterpret", AsyncMock(return_value="A Elo lidera.")) as interp:
+        primeira = auto_generate_and_run_query("Emissão de cartões por bandeira")
+        segunda = auto_generate_and_run_query("Quantos cartões cada bandeira emitiu?")
+
+    assert execucao.call_count == 1
+    interp.assert_called_once()
+    assert segunda["interpretacao"] == primeira["interpretacao"]
+    assert segunda["resultado"].rows == primeira["resultado"].rows
+    assert metrics.get_counter("interpretacao_reuso_total") == 1
+
+
+def test_prompt_e_narracao_rodam_fora_do_event_loop(cache):
+    from core import llm_agent
+
+    threads = {}
+
+    def sql_messages(question):
+        threads["prompt"] = threading.current_thread().name
+        return question, [{"role": "user", "content": question}]
+
+    def narrate(sql, result):
+        threads["narracao"] = threading.current_thread().name
+        return "Narrado."
+
+    with patch.object(llm_agent, "_sql_messages", sql_messages), patch.object(llm_agent, "_FAST_LLM", None), \
+         patch.object(llm_agent, "_ainvoke", AsyncMock(return_value=SQL)), \
+         patch("core.engine.narrate", narrate):
+        resposta = auto_generate_and_run_query("IPCA em Recife em janeiro de 2024")
+
+    assert resposta["interpretacao"] == "Narrado."
+    assert threads["prompt"] != "hubia-engine"
+    assert threads["narracao"].startswith("hubia-db")
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from core.database import QueryResult
+from core.result_cache import ResultCache, canonical_sql, make_key
+
+
+@pytest.fixture
+def banco(tmp_path):
+    path = tmp_path / "fonte.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def resultado(*rows):
+    return QueryResult(["a"], ["INTEGER"], list(rows))
+
+
+def test_forma_canonica_ignora_espacos_caixa_e_ponto_e_virgula():
+    assert canonical_sql("SELECT  Valor\nFROM ipca_7060_recife;;") == "select valor from ipca_7060_recife"
+    assert make_key('SELECT "Valor" FROM T WHERE x == 1.50') == make_key("select valor from t where x = 1.5")
+
+
+def test_forma_canonica_renomeia_apelidos_de_tabela():
+    a = "SELECT r.Valor FROM ipca_7060_recife AS r WHERE r.Grupo = 'Geral'"
+    b = "SELECT x.Valor FROM ipca_7060_recife x WHERE x.Grupo = 'Geral'"
+    assert canonical_sql(a) == canonical_sql(b)
+
+
+def test_forma_canonica_preserva_literais_de_texto():
+    assert make_key("SELECT 1 FROM t WHERE g = 'Geral'") != make_key("SELECT 1 FROM t WHERE g = 'geral'")
+    assert make_key("SELECT 1") != make_key("SELECT 1.0")
+
+
+def test_forma_canonica_aceita_literais_hexadecimais(banco):
+    assert canonical_sql("SELECT a FROM t LIMIT 0X10") == "select a from t limit 0x10"
+    assert make_key("SELECT a FROM t LIMIT 0x10") != make_key("SELECT a FROM t LIMIT 10")
+    assert canonical_sql("SELECT 1e3, .5, 2.") == "select 1000.0 , 0.5 , 2.0"
+    assert ResultCache(source_path=banco).get("SELECT a FROM t LIMIT 0x10") is None
+
+
+def test_cache_reusa_resultado_e_interpretacao(banco):
+    cache = ResultCache(source_path=banco)
+    assert cache.get("SELECT a FROM t") is None
+    cache.set("SELECT a FROM t", resultado((1,)))
+    assert cache.get("select a from t;").rows == [(1,)]
+    assert cache.interpretation("SELECT a FROM t") is None
+    cache.set_interpretation("SELECT a FROM t", "Um valor.")
+    assert cache.interpretation("SELECT  A FROM T") == "Um valor."
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_limitado_em_bytes_descarta_o_menos_usado(banco):
+    cache = ResultCache(source_path=banco, max_bytes=150)
+    cache.set("SELECT 1", resultado(*[(i,) for i in range(10)]))
+    cache.set("SELECT 2", resultado(*[(i,) for i in range(10)]))
+    cache.get("SELECT 1")
+    cache.set("SELECT 3", resultado(*[(i,) for i in range(10)]))
+    assert cache.get("SELECT 2") is None
+    assert cache.get("SELECT 1") is not None
+    assert cache.stats()["bytes"] <= 150
+
+
+def test_cache_invalida_com_commit_no_banco(banco):
+    cache = ResultCache(source_path=banco)
+    cache.set("SELECT a FROM t", resultado((1,)))
+    conn = sqlite3.connect(banco)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("INSERT INTO t VALUES (2)")
+    conn.commit()
+    conn.close()
+    os.utime(banco, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert cache.get("SELECT a FROM t") is None
+
+
+def test_cache_percebe_commit_ainda_no_wal(banco):
+    conn = sqlite3.connect(banco)
+    conn.execute("PRAGMA journal_mode=WAL")
+    cache = ResultCache(source_path=banco)
+    cache.set("SELECT a FROM t", resultado((1,)))
+    stat = os.stat(banco)
+    conn.execute("INSERT INTO t VALUES (2)")
+    conn.commit()
+    os.utime(banco, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    try:
+        assert cache.get("SELECT a FROM t") is None
+    finally:
+        conn.close()
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import core.prompts as prompts
+from core.examples import ExampleStore
+from core.retrieval import TfidfIndex, rank_tables, select_tables, tokenize
+from core.utils import estimate_tokens
+
+
+def test_tokenize_remove_acentos_e_separa_camel_case():
+    assert tokenize("Desocupação no pnadc_4093_desocupacaoTri") == [
+        "desocupacao", "pnadc", "4093", "desocupacao", "tri"
+    ]
+
+
+def test_tfidf_index_ordena_por_similaridade():
+    index = TfidfIndex({
+        "ipca": "inflação preços consumidor",
+        "cartao": "cartão crédito débito bandeira",
+    })
+    ranked = index.rank("bandeira do cartão de crédito")
+    assert ranked[0][0] == "cartao"
+    assert ranked[1][1] == 0
+
+
+def test_rank_tables_prioriza_ipca_recife():
+    ranked = rank_tables("Qual o IPCA acumulado em Recife em 2024?")
+    assert ranked[0][0] == "ipca_7060_recife"
+
+
+def test_select_tables_usa_valores_categoricos():
+    tables = select_tables("Qual a bandeira de cartão com mais emissão?")
+    assert tables == ["transacaoCartao"]
+
+
+def test_select_tables_limita_top_k():
+    tables = select_tables("Variação do volume de serviços no RN", k=2)
+    assert len(tables) == 2
+    assert all(t.startswith("pms_") for t in tables)
+
+
+def test_select_tables_baixa_confianca_retorna_none():
+    assert select_tables("Olá, tudo bem?") is None
+
+
+def test_prompt_com_tabelas_selecionadas_e_menor():
+    completo = prompts.make_system_prompt_all()
+    reduzido = prompts.make_system_prompt_all(["ipca_7060_recife"])
+    assert "ipca_7060_recife" in reduzido
+    assert "transacaoCartao" not in reduzido
+    assert estimate_tokens(reduzido) < estimate_tokens(completo) / 2
+
+
+@patch("core.llm_agent._LLM")
+def test_generate_sql_with_memory_envia_esquema_reduzido(mock_llm, tmp_path):
+    from core.llm_agent import generate_sql_with_memory
+
+    mock_llm.invoke.return_value = "SELECT * FROM ipca_7060_recife;"
+    with patch("core.llm_agent.get_example_store", return_value=ExampleStore(tmp_path / "exemplos.db")):
+        generate_sql_with_memory("Qual o IPCA acumulado em Recife?")
+    system_prompt = mock_llm.invoke.call_args[0][0][0]["content"]
+    assert "ipca_7060_recife" in system_prompt
+    assert "transacaoCartao" not in system_prompt
@@ -0,0 +1,53 @@
+import ast
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.bench_startup import BUDGET_MS, HEAVY, MODULES, heavy_loaded, import_ms, import_profile
+from core.connection import get_connection
+from models.model_loader import LazyLLM
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_importacao_nao_carrega_bibliotecas_pesadas(module):
+    assert heavy_loaded(module) == []
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_importacao_dentro_do_orcamento(module):
+    assert import_ms(module) < BUDGET_MS
+
+
+def test_perfil_de_importacao():
+    records = import_profile("core.engine")
+    raiz = [r for r in records if r.nivel == 0 and r.modulo == "core.engine"]
+    assert raiz and raiz[0].acumulado_ms >= raiz[0].proprio_ms
+
+
+def test_app_nao_importa_bibliotecas_pesadas_no_topo():
+    modulos = set()
+    for node in ast.parse(APP.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            modulos |= {a.name.split(".")[0] for a in node.names}
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modulos.add(node.module.split(".")[0])
+    assert not modulos & {*HEAVY, "rapidfuzz", "core"}
+
+
+def test_cliente_do_modelo_criado_no_primeiro_uso():
+    with patch("langchain_ollama.OllamaLLM") as cliente:
+        llm = LazyLLM("phi4-mini")
+        cliente.assert_not_called()
+        llm.invoke("oi")
+        llm.invoke("de novo")
+    cliente.assert_called_once()
+    assert cliente.call_args.kwargs["model"] == "phi4-mini"
+    assert cliente.return_value.invoke.call_count == 2
+
+
+def test_banco_ausente_so_falha_ao_conectar(tmp_path):
+    with pytest.raises(FileNotFoundError, match="HUBIA_DB"):
+        get_connection(tmp_path / "ausente.db")
@@ -0,0 +1,85 @@
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import metrics
+from core.cache import AnswerCache
+from core.engine import auto_generate_and_run_query
+from core.examples import ExampleStore
+from core.result_cache import ResultCache
+from core.tracing import finish_trace, span, start_trace
+
+SQL = "SELECT nomeBandeira, SUM(qtdCartoesEmitidos) AS total FROM transacaoCartao GROUP BY nomeBandeira"
+
+
+@pytest.fixture
+def isolado(tmp_path):
+    cache = AnswerCache(path=tmp_path / "cache.db", source_path=tmp_path / "fonte.db")
+    with patch("core.engine.get_answer_cache", return_value=cache), \
+         patch("core.engine.get_result_cache", return_value=ResultCache()), \
+         patch("core.engine.get_example_store", return_value=ExampleStore(tmp_path / "exemplos.db")), \
+         patch("core.llm_agent.get_example_store", return_value=ExampleStore(tmp_path / "exemplos.db")):
+        yield cache
+
+
+def test_span_registra_duracao_e_atributos():
+    trace = start_trace("pergunta")
+    with span("execucao", linhas=0) as attrs:
+        attrs["linhas"] = 3
+    finish_trace(trace, origem="llm")
+    dados = trace.to_dict()
+    assert dados["spans"][0]["etapa"] == "execucao"
+    assert dados["spans"][0]["linhas"] == 3
+    assert dados["origem"] == "llm"
+    assert dados["total_ms"] >= dados["etapas"]["execucao"]
+
+
+def test_linha_de_log_por_requisicao(caplog):
+    trace = start_trace("IPCA em Recife")
+    with caplog.at_level(logging.INFO, logger="core.tracing"):
+        finish_trace(trace, origem="cache")
+    linha = caplog.records[-1].getMessage()
+    assert linha.startswith("[REQUISIÇÃO] ")
+    assert json.loads(linha.removeprefix("[REQUISIÇÃO] "))["origem"] == "cache"
+
+
+def test_motor_rastreia_caminho_do_llm(isolado):
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=SQL)
+    with patch("core.llm_agent._LLM", llm), patch("core.engine.FAST_NARRATION", False), \
+         patch("core.engine.INTENTS_ENABLED", False), \
+         patch("core.engine.ainterpret", AsyncMock(return_value="ok")):
+        resposta = auto_generate_and_run_query("Emissão de cartões por bandeira")
+    dados = resposta["telemetria"].to_dict()
+    assert list(dados["etapas"]) == ["cache", "intencao", "exemplo", "prompt", "llm_sql", "validacao", "execucao"]
+    llm_sql = next(s for s in dados["spans"] if s["etapa"] == "llm_sql")
+    assert llm_sql["tokens_prompt"] > 0 and llm_sql["tokens_saida"] > 0
+    assert dados["spans"][0]["acerto"] is False
+    assert metrics.get_histogram("etapa_ms", etapa="llm_sql")["contagem"] >= 1
+
+
+def test_streaming_fecha_o_rastreamento_no_fim(isolado):
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=SQL)
+    llm.stream.return_value = iter(["A ", "bandeira ", "lidera."])
+    with patch("core.llm_agent._LLM", llm), patch("core.engine.FAST_NARRATION", False), \
+         patch("core.engine.INTENTS_ENABLED", False):
+        resposta = auto_generate_and_run_query("Emissão de cartões por bandeira", stream=True)
+        trace = resposta["telemetria"]
+        assert trace.total_ms is None
+        assert "".join(resposta["interpretacao"]) == "A bandeira lidera."
+    dados = trace.to_dict()
+    assert dados["total_ms"] is not None
+    interp = next(s for s in dados["spans"] if s["etapa"] == "llm_interpretacao")
+    assert interp["tokens_saida"] == 3
+    assert "primeiro_token_ms" in interp
+
+
+def test_acerto_de_cache_no_rastreamento(isolado):
+    isolado.set("IPCA em Recife", {"sql": "SELECT 1", "resultado": [], "interpretacao": "x", "tabela": "t"})
+    resposta = auto_generate_and_run_query("IPCA em Recife")
+    dados = resposta["telemetria"].to_dict()
+    assert dados["origem"] == "cache"
+    assert dados["spans"][0]["acerto"] is True
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from core.engine import prepare_sql
+from core.validation import validate_sql
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE vendas (loja TEXT, mes TEXT, valor REAL)")
+    conn.execute("CREATE TABLE lojas (loja TEXT, uf TEXT)")
+    conn.execute("CREATE VIEW vendas_rn AS SELECT v.mes, v.valor FROM vendas v JOIN lojas l USING (loja) WHERE l.uf = 'RN'")
+    yield conn
+    conn.close()
+
+
+def test_coleta_tabelas_e_colunas_lidas(conn):
+    result = validate_sql("SELECT v.mes, SUM(valor) FROM vendas v WHERE loja = 'A' GROUP BY v.mes", conn)
+    assert result.ok
+    assert result.tables == {"vendas"}
+    assert result.columns == {("vendas", "mes"), ("vendas", "valor"), ("vendas", "loja")}
+
+
+def test_leituras_internas_de_views_nao_contam(conn):
+    result = validate_sql("SELECT valor FROM vendas_rn", conn, frozenset({"vendas_rn"}))
+    assert result.ok
+    assert result.tables == {"vendas_rn"}
+
+
+def test_colunas_curtas_tambem_sao_validadas(conn):
+    result = validate_sql("SELECT uf FROM vendas", conn)
+    assert result.unknown_columns == ["uf"]
+    assert result.error == "no such column: uf"
+
+
+def test_coluna_qualificada_desconhecida(conn):
+    result = validate_sql("SELECT v.preco FROM vendas v", conn)
+    assert result.unknown_columns == ["v.preco"]
+    assert result.unknown_names == ["preco"]
+
+
+def test_tabela_desconhecida(conn):
+    result = validate_sql("SELECT * FROM venda", conn)
+    assert result.unknown_tables == ["venda"]
+
+
+@pytest.mark.parametrize("sql, acao", [
+    ("DELETE FROM vendas", "DELETE"),
+    ("UPDATE vendas SET valor = 0", "UPDATE"),
+    ("PRAGMA table_info(vendas)", "PRAGMA"),
+    ("ATTACH 'outro.db' AS outro", "ATTACH"),
+])
+def test_somente_leitura(conn, sql, acao):
+    result = validate_sql(sql, conn)
+    assert not result.ok
+    assert acao in result.denied
+
+
+def test_varias_instrucoes_sao_recusadas(conn):
+    assert not validate_sql("SELECT 1; DELETE FROM vendas", conn).ok
+
+
+def test_validacao_nao_executa_a_consulta(conn):
+    conn.execute("INSERT INTO vendas VALUES ('A', '2024-01', 1)")
+    validate_sql("SELECT * FROM vendas", conn)
+    assert conn.execute("SELECT COUNT(*) FROM vendas").fetchone()[0] == 1
+
+
+def test_prepare_sql_corrige_um_erro_por_rodada():
+    sql = prepare_sql("SELECT localidad, valr FROM pmc_8881_RNm1")
+    assert sql == "SELECT localidade, valor FROM pmc_8881_RNm1"
+
+
+def test_prepare_sql_recusa_sql_invalida():
+    with pytest.raises(RuntimeError, match="inválida"):
+        prepare_sql("SELECT valor FROM pmc_8881_RNm1 WHERE")